@@ -0,0 +1,23 @@
+"""
+Acesso às rotas de administração (/admin): desligadas enquanto `admin_token`
+não estiver definido e, com ele, exigindo `Authorization: Bearer <token>`.
+"""
+
+import hmac
+import os
+from fastapi import Header, HTTPException
+
+ADMIN_TOKEN = os.getenv('admin_token', '')  # vazio desativa as rotas /admin
+
+
+def exige_admin(authorization: str = Header(None)):
+    """
+    Dependência do router de administração: 404 com as rotas desligadas e
+    401 sem o token correto (comparado em tempo constante).
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Rotas de administração desativadas (admin_token)")
+    esquema, _, token = (authorization or "").partition(" ")
+    if esquema.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Token de administração inválido",
+                            headers={"WWW-Authenticate": "Bearer"})
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: caminho síncrono (psycopg2 + threadpool) vs. assíncrono (psycopg 3 + asyncio).
+
+Simula `--concurrency` dashboards simultâneos chamando os serviços diretamente.
+O caminho síncrono roda em um threadpool limitado (`--threads`, 40 é o padrão do
+Starlette/AnyIO), reproduzindo o que acontece com rotas `def` no FastAPI.
+
+Uso (a partir de backend/):
+    python -m benchmarks.async_vs_sync --requests 200 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from connection import fecha_pool
+from connection_async import fecha_pool_async
+from services.dashboard_service import get_dashboard_overview, get_dashboard_overview_async
+from services.sales_dashboard import get_dashboard_sales, get_dashboard_sales_async
+from services.produtos_service import get_produtos_analitico, get_produtos_analitico_async
+from services.unidades_service import get_unidades_overview, get_unidades_overview_async
+
+ENDPOINTS = {
+    "overview": (get_dashboard_overview, get_dashboard_overview_async, {}),
+    "sales": (get_dashboard_sales, get_dashboard_sales_async, {}),
+    "produtos": (get_produtos_analitico, get_produtos_analitico_async, {}),
+    "unidades": (get_unidades_overview, get_unidades_overview_async, {"page": 1, "limit": 20}),
+}
+
+
+def _resumo(nome, latencias, duracao):
+    latencias = sorted(latencias)
+    percentis = statistics.quantiles(latencias, n=100) if len(latencias) > 1 else latencias * 99
+    return {
+        "modo": nome,
+        "requisicoes": len(latencias),
+        "throughput_rps": round(len(latencias) / duracao, 2),
+        "p50_ms": round(percentis[49] * 1000, 1),
+        "p95_ms": round(percentis[94] * 1000, 1),
+        "p99_ms": round(percentis[98] * 1000, 1),
+    }
+
+
+def roda_sync(funcao, kwargs, total, concorrencia, threads):
+    latencias = []
+
+    def uma_requisicao(_):
+        inicio = time.perf_counter()
+        funcao(**kwargs)
+        latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    # Os clientes concorrentes disputam o threadpool, como nas rotas `def`
+    with ThreadPoolExecutor(max_workers=min(concorrencia, threads)) as executor:
+        list(executor.map(uma_requisicao, range(total)))
+    duracao = time.perf_counter() - inicio
+    fecha_pool()
+    return _resumo("sync", latencias, duracao)
+
+
+async def roda_async(funcao, kwargs, total, concorrencia):
+    latencias = []
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async def uma_requisicao():
+        async with semaforo:
+            inicio = time.perf_counter()
+            await funcao(**kwargs)
+            latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(uma_requisicao() for _ in range(total)))
+    duracao = time.perf_counter() - inicio
+    await fecha_pool_async()
+    return _resumo("async", latencias, duracao)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara throughput concorrente sync vs async')
+    parser.add_argument('--endpoint', choices=ENDPOINTS, default='sales')
+    parser.add_argument('--requests', type=int, default=200, help='Total de requisições')
+    parser.add_argument('--concurrency', type=int, default=50, help='Clientes simultâneos')
+    parser.add_argument('--threads', type=int, default=40, help='Tamanho do threadpool no modo sync')
+    args = parser.parse_args()
+
+    funcao_sync, funcao_async, kwargs = ENDPOINTS[args.endpoint]
+
+    print(f"Endpoint: {args.endpoint} | {args.requests} requisições | concorrência {args.concurrency}")
+    resultados = [
+        roda_sync(funcao_sync, kwargs, args.requests, args.concurrency, args.threads),
+        asyncio.run(roda_async(funcao_async, kwargs, args.requests, args.concurrency)),
+    ]
+    for r in resultados:
+        print(f"  {r['modo']:>5}: {r['throughput_rps']:>8} req/s | "
+              f"p50 {r['p50_ms']} ms | p95 {r['p95_ms']} ms | p99 {r['p99_ms']} ms")
+
+    ganho = resultados[1]["throughput_rps"] / resultados[0]["throughput_rps"]
+    print(f"  async/sync: {ganho:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Teste de carga reproduzível da API.
+
+1. (opcional) `--semear ESCALA`: cria o schema em um banco vazio, gera os
+   dados com o generate_data.py (semente e data final fixas), aplica as
+   migrations e popula os rollups;
+2. (opcional) `--iniciar-api`: sobe o uvicorn em `--porta` com o ambiente atual;
+3. dispara uma mistura de requisições de `/dashboard/overview`,
+   `/dashboard/sales`, `/produtos/analitico`, `/units/overview` e
+   `/filtros/*` com filtros sorteados, em `--concurrency` clientes;
+4. mostra p50/p95/p99, throughput e tempo de banco (do `Server-Timing`)
+   das respostas com sucesso por endpoint e salva tudo em JSON (`--saida`);
+5. falha (código de saída 1) se alguma requisição tiver erro e, com
+   `--comparar base.json`, se o p95 de algum endpoint piorar ou o
+   throughput cair mais que `--tolerancia`.
+
+O banco é o das variáveis de ambiente do backend (host, database, ...).
+
+Uso (a partir de backend/):
+    python -m benchmarks.carga --semear pequena --iniciar-api --saida base.json
+    python -m benchmarks.carga --iniciar-api --saida atual.json --comparar base.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+BACKEND = Path(__file__).resolve().parent.parent
+RAIZ = BACKEND.parent
+sys.path.insert(0, str(BACKEND))
+
+from connection import _parametros_conexao, obter_conexao
+
+ESCALAS = {
+    "pequena": dict(months=1, stores=10, products=200, items=100, customers=2000),
+    "media": dict(months=6, stores=50, products=500, items=200, customers=10000),
+    "grande": dict(months=12, stores=100, products=800, items=300, customers=50000),
+}
+
+# Pesos padrão da mistura (proporção de cada endpoint no tráfego)
+MISTURA = {"overview": 30, "sales": 30, "produtos": 15, "unidades": 15, "filtros": 10}
+
+# Seções do Server-Timing que medem espera pelo banco
+SECOES_BANCO = ("total", "versao")
+
+
+def _dsn():
+    from psycopg2.extensions import make_dsn
+    return make_dsn(**{k: v for k, v in _parametros_conexao().items() if v})
+
+
+def semeia(escala, semente, data_final, workers):
+    """
+    Popula o banco atual do zero. Recusa bancos que já têm vendas, para
+    que duas execuções com a mesma escala e semente meçam os mesmos dados.
+    """
+    with obter_conexao() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('public.sales') IS NOT NULL")
+        if not cursor.fetchone()[0]:
+            print("Criando o schema (database-schema.sql)...")
+            cursor.execute((RAIZ / "database-schema.sql").read_text(encoding="utf-8"))
+            conn.commit()
+        else:
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM sales)")
+            if cursor.fetchone()[0]:
+                raise SystemExit("O banco já tem vendas: use um banco vazio para --semear")
+
+    parametros = ESCALAS[escala]
+    comando = [
+        sys.executable, str(RAIZ / "generate_data.py"), "--db-url", _dsn(),
+        "--seed", str(semente), "--end-date", data_final, "--workers", str(workers),
+    ]
+    for nome, valor in parametros.items():
+        comando += [f"--{nome}", str(valor)]
+    print(f"Gerando dados (escala {escala}, semente {semente}, até {data_final})...")
+    subprocess.run(comando, check=True)
+
+    from migrate import aplica_migrations
+    from rollups import atualiza_rollups
+    with obter_conexao() as conn:
+        aplicadas = aplica_migrations(conn)
+        print(f"✓ {len(aplicadas)} migration(s) aplicada(s)")
+        print(f"✓ Rollups: {atualiza_rollups(conn)}")
+
+
+def inicia_api(porta, timeout=60):
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(porta), "--log-level", "warning"],
+        cwd=BACKEND,
+    )
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise SystemExit("A API encerrou durante o startup")
+        try:
+            conexao = http.client.HTTPConnection("127.0.0.1", porta, timeout=2)
+            conexao.request("GET", "/")
+            if conexao.getresponse().status == 200:
+                return processo
+        except OSError:
+            time.sleep(0.5)
+    processo.terminate()
+    raise SystemExit(f"A API não respondeu em {timeout}s")
+
+
+def _catalogo():
+    """
+    Ids e período disponíveis no banco, usados para sortear os filtros.
+    """
+    with obter_conexao() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT MIN(created_at)::date, MAX(created_at)::date FROM sales")
+        inicio, fim = cursor.fetchone()
+        cursor.execute("SELECT id FROM stores ORDER BY id")
+        lojas = [r[0] for r in cursor.fetchall()]
+        cursor.execute("SELECT id FROM channels ORDER BY id")
+        canais = [r[0] for r in cursor.fetchall()]
+        cursor.execute("SELECT id FROM categories ORDER BY id")
+        categorias = [r[0] for r in cursor.fetchall()]
+    if inicio is None:
+        raise SystemExit("O banco não tem vendas: rode com --semear ESCALA")
+    return {"inicio": inicio, "fim": fim, "lojas": lojas, "canais": canais, "categorias": categorias}
+
+
+def _periodo(rng, catalogo, filtros):
+    # 20% sem período (todo o histórico); o resto, janelas de 1 a 90 dias
+    if rng.random() < 0.2:
+        return
+    dias = rng.choice((1, 7, 30, 90))
+    total = (catalogo["fim"] - catalogo["inicio"]).days
+    fim = catalogo["inicio"] + timedelta(days=rng.randint(min(dias, total), total))
+    filtros["start_date"] = (fim - timedelta(days=dias - 1)).isoformat()
+    filtros["end_date"] = fim.isoformat()
+
+
+def _talvez(rng, probabilidade, filtros, chave, valores):
+    if valores and rng.random() < probabilidade:
+        filtros[chave] = rng.choice(valores)
+
+
+def _horas(rng, filtros):
+    if rng.random() < 0.15:
+        inicio = rng.randint(0, 22)
+        filtros["start_hour"] = inicio
+        filtros["end_hour"] = rng.randint(inicio, 23)
+
+
+def sorteia_requisicao(rng, endpoint, catalogo):
+    """
+    (nome, caminho com query string) de uma requisição do endpoint.
+    """
+    filtros = {}
+    if endpoint == "filtros":
+        return "filtros", "/filtros/" + rng.choice(("lojas", "canais", "categorias"))
+    _periodo(rng, catalogo, filtros)
+    if endpoint == "overview":
+        _talvez(rng, 0.3, filtros, "store_id", catalogo["lojas"])
+        _talvez(rng, 0.3, filtros, "channel_id", catalogo["canais"])
+        caminho = "/dashboard/overview"
+    elif endpoint == "sales":
+        _talvez(rng, 0.3, filtros, "store_id", catalogo["lojas"])
+        _talvez(rng, 0.3, filtros, "channel_id", catalogo["canais"])
+        _talvez(rng, 0.15, filtros, "weekday", range(7))
+        _horas(rng, filtros)
+        filtros["page"] = rng.choice((1, 1, 1, 2, 5))
+        filtros["limit"] = rng.choice((20, 50))
+        caminho = "/dashboard/sales"
+    elif endpoint == "produtos":
+        _talvez(rng, 0.3, filtros, "store_id", catalogo["lojas"])
+        _talvez(rng, 0.2, filtros, "channel_id", catalogo["canais"])
+        _talvez(rng, 0.2, filtros, "category_id", catalogo["categorias"])
+        _talvez(rng, 0.15, filtros, "weekday", range(7))
+        _horas(rng, filtros)
+        filtros["page"] = rng.choice((1, 1, 2))
+        caminho = "/produtos/analitico"
+    else:
+        _talvez(rng, 0.2, filtros, "channel_id", catalogo["canais"])
+        _talvez(rng, 0.2, filtros, "status", ("ativa", "inativa"))
+        filtros["page"] = rng.choice((1, 1, 2))
+        caminho = "/units/overview"
+    return endpoint, f"{caminho}?{urlencode(filtros)}" if filtros else caminho
+
+
+def _tempo_banco(server_timing):
+    total = 0.0
+    for parte in (server_timing or "").split(","):
+        nome, _, duracao = parte.strip().partition(";dur=")
+        if nome in SECOES_BANCO and duracao:
+            total += float(duracao)
+    return total
+
+
+def roda_carga(url, plano, concorrencia):
+    """
+    Executa as requisições do plano (lista de (endpoint, caminho)) em
+    `concorrencia` clientes com conexão keep-alive. Retorna as medições e a
+    duração total.
+    """
+    partes = urlsplit(url)
+    fila = iter(plano)
+    trava = threading.Lock()
+    medicoes = []
+
+    def cliente():
+        conexao = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=120)
+        while True:
+            with trava:
+                proxima = next(fila, None)
+            if proxima is None:
+                break
+            endpoint, caminho = proxima
+            inicio = time.perf_counter()
+            try:
+                conexao.request("GET", caminho, headers={"Accept-Encoding": "gzip"})
+                resposta = conexao.getresponse()
+                resposta.read()
+                status, timing = resposta.status, resposta.getheader("server-timing")
+            except (OSError, http.client.HTTPException):
+                conexao.close()
+                conexao = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=120)
+                status, timing = 0, None
+            latencia = (time.perf_counter() - inicio) * 1000
+            with trava:
+                medicoes.append((endpoint, status, latencia, _tempo_banco(timing)))
+        conexao.close()
+
+    inicio = time.perf_counter()
+    clientes = [threading.Thread(target=cliente) for _ in range(concorrencia)]
+    for c in clientes:
+        c.start()
+    for c in clientes:
+        c.join()
+    return medicoes, time.perf_counter() - inicio
+
+
+def _percentis(valores):
+    # Sem respostas com sucesso não há latência a medir (e não 0 ms)
+    if not valores:
+        return None, None, None
+    valores = sorted(valores)
+    if len(valores) < 2:
+        valores = valores * 2
+    p = statistics.quantiles(valores, n=100, method="inclusive")
+    return round(p[49], 2), round(p[94], 2), round(p[98], 2)
+
+
+def resume(medicoes, duracao):
+    """
+    Métricas por endpoint e no geral. Latências e throughput contam só as
+    respostas com sucesso (2xx/3xx); as demais, como falhas de conexão
+    (status 0) e 5xx, entram em `erros`.
+    """
+    grupos = {}
+    for endpoint, status, latencia, banco in medicoes:
+        grupos.setdefault(endpoint, []).append((status, latencia, banco))
+    grupos["geral"] = [(s, l, b) for _, s, l, b in medicoes]
+
+    resultado = {}
+    for endpoint, linhas in grupos.items():
+        ok = [(l, b) for s, l, b in linhas if 200 <= s < 400]
+        p50, p95, p99 = _percentis([l for l, _ in ok])
+        banco50, banco95, _ = _percentis([b for _, b in ok])
+        resultado[endpoint] = {
+            "requisicoes": len(linhas),
+            "erros": len(linhas) - len(ok),
+            "throughput_rps": round(len(ok) / duracao, 2),
+            "p50_ms": p50,
+            "p95_ms": p95,
+            "p99_ms": p99,
+            "banco_p50_ms": banco50,
+            "banco_p95_ms": banco95,
+        }
+    return resultado
+
+
+def compara(atual, base, tolerancia):
+    """
+    Regressões do resultado atual em relação à base: p95 acima de
+    (1 + tolerância) vezes o da base ou throughput abaixo de (1 - tolerância).
+    Um endpoint que só teve erros não tem p95 e conta como regressão.
+    """
+    regressoes = []
+    for endpoint, metricas in atual["endpoints"].items():
+        anterior = base["endpoints"].get(endpoint)
+        if anterior is None:
+            continue
+        if metricas["p95_ms"] is None:
+            if anterior["p95_ms"] is not None:
+                regressoes.append(f"{endpoint}: p95 {anterior['p95_ms']} ms -> sem respostas com sucesso")
+        elif anterior["p95_ms"] is not None and metricas["p95_ms"] > anterior["p95_ms"] * (1 + tolerancia):
+            regressoes.append(f"{endpoint}: p95 {anterior['p95_ms']} -> {metricas['p95_ms']} ms")
+        if metricas["throughput_rps"] < anterior["throughput_rps"] * (1 - tolerancia):
+            regressoes.append(
+                f"{endpoint}: throughput {anterior['throughput_rps']} -> {metricas['throughput_rps']} req/s")
+        if metricas["erros"] > anterior["erros"]:
+            regressoes.append(f"{endpoint}: erros {anterior['erros']} -> {metricas['erros']}")
+    return regressoes
+
+
+def _mistura(texto):
+    pesos = dict(MISTURA)
+    for parte in filter(None, (texto or "").split(",")):
+        nome, _, peso = parte.partition("=")
+        if nome not in MISTURA:
+            raise SystemExit(f"Endpoint desconhecido na mistura: {nome} (use {', '.join(MISTURA)})")
+        pesos[nome] = float(peso)
+    return pesos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga reproduzível da API')
+    parser.add_argument('--url', default=None, help='API já no ar (padrão: http://127.0.0.1:PORTA)')
+    parser.add_argument('--porta', type=int, default=8000)
+    parser.add_argument('--iniciar-api', action='store_true', help='Sobe o uvicorn durante o teste')
+    parser.add_argument('--semear', choices=ESCALAS, default=None, help='Popula um banco vazio nesta escala')
+    parser.add_argument('--data-final', default='2025-06-30', help='Último dia de vendas ao semear')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processos do gerador')
+    parser.add_argument('--semente', type=int, default=42, help='Semente dos dados e das requisições')
+    parser.add_argument('--requests', type=int, default=500, help='Requisições medidas')
+    parser.add_argument('--aquecimento', type=int, default=50, help='Requisições descartadas antes da medição')
+    parser.add_argument('--concurrency', type=int, default=10, help='Clientes simultâneos')
+    parser.add_argument('--mistura', default=None, help='Pesos, ex.: overview=3,sales=3,produtos=1')
+    parser.add_argument('--saida', default=None, help='Arquivo JSON com os resultados')
+    parser.add_argument('--comparar', default=None, help='Resultado JSON de referência')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='Piora aceita na comparação (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    if args.semear:
+        semeia(args.semear, args.semente, args.data_final, args.workers)
+
+    pesos = _mistura(args.mistura)
+    catalogo = _catalogo()
+    rng = random.Random(args.semente)
+    endpoints = rng.choices(list(pesos), weights=list(pesos.values()), k=args.aquecimento + args.requests)
+    plano = [sorteia_requisicao(rng, endpoint, catalogo) for endpoint in endpoints]
+
+    url = args.url or f"http://127.0.0.1:{args.porta}"
+    api = inicia_api(args.porta) if args.iniciar_api else None
+    try:
+        if args.aquecimento:
+            roda_carga(url, plano[:args.aquecimento], args.concurrency)
+        medicoes, duracao = roda_carga(url, plano[args.aquecimento:], args.concurrency)
+    finally:
+        if api is not None:
+            api.terminate()
+            api.wait()
+
+    resultado = {
+        "momento": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "requests": args.requests, "aquecimento": args.aquecimento,
+            "concurrency": args.concurrency, "semente": args.semente, "mistura": pesos,
+            "escala": args.semear, "banco": _parametros_conexao()["database"],
+            "periodo": [catalogo["inicio"].isoformat(), catalogo["fim"].isoformat()],
+            "python": platform.python_version(),
+        },
+        "duracao_s": round(duracao, 2),
+        "endpoints": resume(medicoes, duracao),
+    }
+
+    print(f"{args.requests} requisições | concorrência {args.concurrency} | {duracao:.1f}s")
+    print(f"  {'endpoint':<10} {'req':>5} {'erros':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'banco p50':>10}")
+    for endpoint, m in resultado["endpoints"].items():
+        p50, p95, p99, banco = (
+            "-" if valor is None else valor for valor in (m['p50_ms'], m['p95_ms'], m['p99_ms'], m['banco_p50_ms']))
+        print(f"  {endpoint:<10} {m['requisicoes']:>5} {m['erros']:>5} {m['throughput_rps']:>8} "
+              f"{p50:>8} {p95:>8} {p99:>8} {banco:>10}")
+
+    if args.saida:
+        Path(args.saida).write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"✓ Resultados em {args.saida}")
+
+    falhou = False
+    if args.comparar:
+        base = json.loads(Path(args.comparar).read_text(encoding="utf-8"))
+        regressoes = compara(resultado, base, args.tolerancia)
+        if regressoes:
+            print(f"✗ Regressões acima de {args.tolerancia:.0%} em relação a {args.comparar}:")
+            for regressao in regressoes:
+                print(f"  - {regressao}")
+            falhou = True
+        else:
+            print(f"✓ Sem regressões acima de {args.tolerancia:.0%} em relação a {args.comparar}")
+
+    # Requisições com erro invalidam a medição, mesmo sem --comparar
+    erros = resultado["endpoints"]["geral"]["erros"]
+    if erros:
+        com_erros = [e for e, m in resultado["endpoints"].items() if m["erros"] and e != "geral"]
+        print(f"✗ {erros} de {args.requests} requisições falharam ({', '.join(com_erros)}): "
+              f"latências e throughput contam só as respostas com sucesso")
+        falhou = True
+    if falhou:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: compressão e GET condicional das rotas de dashboard.
+
+Contra uma API já no ar (`--url`), mede para cada rota:
+  - bytes transferidos sem compressão, com gzip e com brotli;
+  - tempo até o primeiro byte (TTFB) e tempo total de uma resposta 200
+    completa vs. uma revalidação com `If-None-Match` (304).
+
+Uso (a partir de backend/, com a API rodando):
+    python -m benchmarks.compressao_etag --url http://localhost:8000 --requests 50
+"""
+
+import argparse
+import http.client
+import statistics
+import time
+from urllib.parse import urlsplit
+
+ROTAS = {
+    "overview": "/dashboard/overview",
+    "sales": "/dashboard/sales",
+    "produtos": "/produtos/analitico",
+    "unidades": "/units/overview",
+}
+
+
+def requisita(url, caminho, headers):
+    """
+    (status, headers, bytes do corpo, TTFB em ms, total em ms). O TTFB é o
+    tempo até a linha de status e os headers chegarem.
+    """
+    partes = urlsplit(url)
+    conexao = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=60)
+    try:
+        inicio = time.perf_counter()
+        conexao.request("GET", caminho, headers=headers)
+        resposta = conexao.getresponse()
+        ttfb = (time.perf_counter() - inicio) * 1000
+        corpo = resposta.read()
+        total = (time.perf_counter() - inicio) * 1000
+        return resposta.status, dict(resposta.getheaders()), len(corpo), ttfb, total
+    finally:
+        conexao.close()
+
+
+def _mediana(valores):
+    return round(statistics.median(valores), 2)
+
+
+def mede_rota(url, caminho, total):
+    tamanhos = {}
+    for codificacao in ("identity", "gzip", "br"):
+        _, headers, tamanho, _, _ = requisita(url, caminho, {"Accept-Encoding": codificacao})
+        tamanhos[headers.get("content-encoding", "identity")] = tamanho
+
+    _, headers, _, _, _ = requisita(url, caminho, {"Accept-Encoding": "gzip"})
+    etag = headers.get("etag")
+
+    completas = [requisita(url, caminho, {"Accept-Encoding": "gzip"}) for _ in range(total)]
+    revalidacoes = []
+    if etag:
+        revalidacoes = [
+            requisita(url, caminho, {"Accept-Encoding": "gzip", "If-None-Match": etag})
+            for _ in range(total)
+        ]
+    return tamanhos, etag, completas, revalidacoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mede compressão e respostas 304 das rotas de dashboard')
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--rota', choices=ROTAS, action='append', help='Padrão: todas')
+    parser.add_argument('--requests', type=int, default=50, help='Requisições por modo')
+    args = parser.parse_args()
+
+    for nome in args.rota or ROTAS:
+        tamanhos, etag, completas, revalidacoes = mede_rota(args.url, ROTAS[nome], args.requests)
+        bruto = tamanhos.get("identity")
+        print(f"{nome} ({ROTAS[nome]})")
+        for codificacao, tamanho in tamanhos.items():
+            razao = f" ({tamanho / bruto:.0%} do original)" if bruto and codificacao != "identity" else ""
+            print(f"  {codificacao:>8}: {tamanho:>9} bytes{razao}")
+        if "br" not in tamanhos:
+            print("        br: indisponível (pacote brotli não instalado na API)")
+
+        print(f"  200 completo: TTFB p50 {_mediana([r[3] for r in completas])} ms | "
+              f"total p50 {_mediana([r[4] for r in completas])} ms | {completas[0][2]} bytes")
+        if not etag:
+            print("  304: a API não enviou ETag (etag=0?)")
+            continue
+        status = {r[0] for r in revalidacoes}
+        print(f"  304 If-None-Match: TTFB p50 {_mediana([r[3] for r in revalidacoes])} ms | "
+              f"total p50 {_mediana([r[4] for r in revalidacoes])} ms | status {sorted(status)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""
+Cache de respostas dos dashboards, indexado pelo conjunto normalizado de filtros.
+
+Backends:
+- "memoria" (padrão): LRU em processo, com TTL e limite de memória
+- "redis": qualquer servidor compatível com Redis (`cache_redis_url`);
+  a evicção fica por conta da política `maxmemory` do servidor
+
+Os valores são guardados serializados em JSON, o que permite medir o tamanho
+de cada entrada e evita que quem recebe o resultado altere o que está em cache.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from coalescencia import coalesce
+from consultas import registra_tempo
+from respostas import desserializa, serializa
+
+CACHE_BACKEND = os.getenv('cache_backend', 'memoria')  # memoria | redis | desativado
+CACHE_REDIS_URL = os.getenv('cache_redis_url', 'redis://localhost:6379/0')
+# TTL (s) de consultas que incluem o dia atual (ou sem data final)
+CACHE_TTL = float(os.getenv('cache_ttl', 60))
+# TTL (s) de períodos que terminam antes de hoje: dados históricos não mudam
+CACHE_TTL_HISTORICO = float(os.getenv('cache_ttl_historico', 86400))
+CACHE_MAX_ITENS = int(os.getenv('cache_max_itens', 1000))
+CACHE_MAX_MB = float(os.getenv('cache_max_mb', 64))
+
+
+def _normaliza(valor):
+    # Datas em formatos equivalentes ("2025-01-05", "2025-01-05T00:00") viram a mesma chave
+    if isinstance(valor, str):
+        try:
+            return date.fromisoformat(valor[:10]).isoformat()
+        except ValueError:
+            return valor.strip()
+    return valor
+
+
+def chave_cache(nome, **filtros):
+    """
+    Chave estável para um endpoint e seus filtros: a ordem dos argumentos
+    não importa e filtros ausentes (None) são ignorados.
+    """
+    normalizados = sorted(
+        (k, _normaliza(v)) for k, v in filtros.items() if v is not None
+    )
+    return nome + "?" + "&".join(f"{k}={v}" for k, v in normalizados)
+
+
+def ttl_para(end_date=None):
+    """
+    TTL longo quando o período termina antes de hoje.
+    """
+    if end_date:
+        try:
+            if date.fromisoformat(_normaliza(end_date)) < date.today():
+                return CACHE_TTL_HISTORICO
+        except ValueError:
+            pass
+    return CACHE_TTL
+
+
+class CacheMemoria:
+    """
+    LRU em processo, limitado por número de itens e por bytes.
+    """
+
+    def __init__(self, max_itens=CACHE_MAX_ITENS, max_bytes=int(CACHE_MAX_MB * 1024 * 1024)):
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self._itens = OrderedDict()  # chave -> (expira_em, valor serializado)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _remove(self, chave):
+        _, valor = self._itens.pop(chave)
+        self._bytes -= len(valor)
+
+    async def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                self._remove(chave)
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    async def guardar(self, chave, valor, ttl):
+        if len(valor) > self.max_bytes:
+            return
+        with self._lock:
+            if chave in self._itens:
+                self._remove(chave)
+            self._itens[chave] = (time.monotonic() + ttl, valor)
+            self._bytes += len(valor)
+            while len(self._itens) > self.max_itens or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._itens)))
+                self.evictions += 1
+
+    async def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "itens": len(self._itens),
+                "bytes": self._bytes,
+                "max_itens": self.max_itens,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+
+class CacheRedis:
+    """
+    Backend Redis (redis-py, opcional). Chaves com prefixo e expiração nativa.
+    """
+    PREFIXO = "dashboards:"
+
+    def __init__(self, url=CACHE_REDIS_URL):
+        import redis.asyncio as redis
+        self.url = url
+        self._cliente = redis.from_url(url)
+
+    async def obter(self, chave):
+        return await self._cliente.get(self.PREFIXO + chave)
+
+    async def guardar(self, chave, valor, ttl):
+        await self._cliente.set(self.PREFIXO + chave, valor, ex=int(ttl))
+
+    async def limpar(self):
+        async for chave in self._cliente.scan_iter(self.PREFIXO + "*"):
+            await self._cliente.delete(chave)
+
+    def estatisticas(self):
+        return {"url": self.url}
+
+
+def _cria_backend():
+    if CACHE_BACKEND == "redis":
+        return CacheRedis()
+    if CACHE_BACKEND == "desativado":
+        return None
+    return CacheMemoria()
+
+
+_backend = _cria_backend()
+_contadores = {"hits": 0, "misses": 0, "erros": 0}
+
+
+async def em_cache(nome, filtros, calcula):
+    """
+    Retorna o resultado em cache para (nome, filtros) ou executa `calcula()`
+    (corrotina sem argumentos) e guarda o resultado. Misses concorrentes da
+    mesma chave compartilham uma única execução (veja coalescencia.py).
+    Falhas do backend não derrubam a requisição: o resultado é calculado
+    normalmente. O hit/miss aparece no header Server-Timing (cache-hit / cache-miss).
+    """
+    chave = chave_cache(nome, **filtros)
+    if _backend is None:
+        return await coalesce(chave, calcula)
+
+    inicio = time.perf_counter()
+    try:
+        valor = await _backend.obter(chave)
+    except Exception:
+        _contadores["erros"] += 1
+        valor = None
+
+    if valor is not None:
+        _contadores["hits"] += 1
+        registra_tempo("cache-hit", (time.perf_counter() - inicio) * 1000)
+        return desserializa(valor)
+
+    _contadores["misses"] += 1
+    resultado = await coalesce(chave, calcula)
+    try:
+        await _backend.guardar(
+            chave, serializa(resultado), ttl_para(filtros.get("end_date"))
+        )
+    except Exception:
+        _contadores["erros"] += 1
+    registra_tempo("cache-miss", (time.perf_counter() - inicio) * 1000)
+    return resultado
+
+
+async def limpa_cache():
+    if _backend is not None:
+        await _backend.limpar()
+
+
+def estatisticas_cache():
+    """
+    Contadores de hit/miss e ocupação do backend.
+    """
+    consultas = _contadores["hits"] + _contadores["misses"]
+    return {
+        "backend": CACHE_BACKEND if _backend is not None else "desativado",
+        **_contadores,
+        "taxa_hit": round(_contadores["hits"] / consultas, 4) if consultas else 0.0,
+        "ttl": CACHE_TTL,
+        "ttl_historico": CACHE_TTL_HISTORICO,
+        **(_backend.estatisticas() if _backend is not None else {}),
+    }
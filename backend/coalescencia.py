@@ -0,0 +1,56 @@
+"""
+Coalescência de requisições (single-flight): requisições concorrentes com os
+mesmos parâmetros normalizados compartilham uma única execução em andamento.
+"""
+
+import asyncio
+import os
+import time
+from consultas import registra_tempo
+
+COALESCENCIA = os.getenv('coalescencia', '1') != '0'
+
+_em_andamento = {}  # chave -> asyncio.Task
+_contadores = {"execucoes": 0, "coalescidas": 0}
+
+
+async def coalesce(chave, calcula):
+    """
+    Executa `calcula()` (corrotina sem argumentos) uma única vez por chave
+    enquanto houver uma execução em andamento; as demais requisições aguardam
+    e recebem o mesmo resultado (ou a mesma exceção).
+
+    A execução compartilhada é protegida com `shield`: se o cliente que a
+    iniciou desconectar, as outras requisições continuam recebendo o resultado.
+    """
+    if not COALESCENCIA:
+        return await calcula()
+
+    tarefa = _em_andamento.get(chave)
+    if tarefa is not None:
+        _contadores["coalescidas"] += 1
+        inicio = time.perf_counter()
+        try:
+            return await asyncio.shield(tarefa)
+        finally:
+            registra_tempo("coalescida", (time.perf_counter() - inicio) * 1000)
+
+    _contadores["execucoes"] += 1
+    tarefa = asyncio.ensure_future(calcula())
+    _em_andamento[chave] = tarefa
+    tarefa.add_done_callback(lambda _: _em_andamento.pop(chave, None))
+    return await asyncio.shield(tarefa)
+
+
+def estatisticas_coalescencia():
+    """
+    Execuções reais, requisições que reaproveitaram uma execução em andamento
+    e chaves em andamento no momento.
+    """
+    total = _contadores["execucoes"] + _contadores["coalescidas"]
+    return {
+        "ativa": COALESCENCIA,
+        **_contadores,
+        "taxa_coalescencia": round(_contadores["coalescidas"] / total, 4) if total else 0.0,
+        "em_andamento": len(_em_andamento),
+    }
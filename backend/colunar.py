@@ -0,0 +1,568 @@
+"""
+Motor colunar em memória (opcional, `colunar=1`): cópia em arrays NumPy das
+colunas de `sales` e `product_sales` usadas pelos dashboards. Os agregados
+de `/dashboard/sales`, `/dashboard/overview` e `/units/overview` saem de
+group-bys vetorizados (`np.bincount`) sobre esses arrays, sem ir ao
+PostgreSQL; a lista de pedidos continua no banco.
+
+As funções `resultados_*` devolvem as mesmas linhas das consultas SQL
+equivalentes (mesmas seções, tipos e arredondamentos), então os serviços
+montam a resposta com o código de sempre:
+- valores em DECIMAL(10,2) são guardados em centavos (int64) e somados sem
+  perda; médias e taxas são arredondadas como o ROUND do PostgreSQL;
+- colunas FLOAT de `product_sales` são somadas em float64 e convertidas
+  com 15 dígitos, como o `::numeric` do PostgreSQL.
+
+Os dados são carregados no startup e atualizados a partir do último id
+carregado, só até um ponto seguro (como os rollups): ids confirmados fora
+de ordem não são pulados. Atualizações de linhas já carregadas (ex.: um
+cancelamento posterior) só entram com `recarrega_colunar()`.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from io import StringIO
+from connection import obter_conexao
+from consultas import registra_tempo
+from filtros_sql import _data
+from rollups import AINDA_ABERTAS_SQL, TRANSACOES_ABERTAS_SQL
+
+try:
+    import numpy as np
+except ImportError:  # sem o NumPy o motor fica desativado
+    np = None
+
+COLUNAR = os.getenv('colunar', '0') == '1' and np is not None
+# Intervalo (s) entre atualizações incrementais feitas pela API
+COLUNAR_INTERVALO = float(os.getenv('colunar_intervalo', 30))
+# Linhas lidas por COPY durante a carga
+COLUNAR_LOTE = int(os.getenv('colunar_lote', 1000000))
+# Segundos que a atualização espera as transações abertas no ponto seguro
+# terminarem; depois disso o ponto fica para a próxima atualização
+ESPERA_PONTO = 1.0
+
+_MICROS_HORA = 3_600_000_000
+_MICROS_DIA = 24 * _MICROS_HORA
+_EPOCA = datetime(1970, 1, 1)
+# TO_CHAR(..., 'Day'): nome em inglês completado com espaços até 9 caracteres
+_DIAS_SEMANA = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+# Tipos de cada coluna em memória; o SELECT de carga devolve só inteiros e
+# floats, na mesma ordem
+COLUNAS_VENDAS = {
+    "id": "int32",
+    "created_at": "int64",     # microssegundos desde 1970-01-01
+    "store_id": "int32",
+    "channel_id": "int32",
+    "cancelado": "bool",
+    "centavos": "int64",       # total_amount * 100
+}
+CARGA_VENDAS = """
+    SELECT id, (EXTRACT(EPOCH FROM created_at) * 1000000)::bigint, store_id, channel_id,
+           (sale_status_desc = 'CANCELLED')::int, (total_amount * 100)::bigint
+    FROM sales
+    WHERE id > {ultimo} AND id <= {limite} ORDER BY id LIMIT {lote}
+"""
+
+COLUNAS_ITENS = {
+    "id": "int32",
+    "venda": "int32",          # posição da venda nos arrays de `sales`
+    "product_id": "int32",
+    "quantity": "float64",
+    "total_price": "float64",
+}
+CARGA_ITENS = """
+    SELECT id, sale_id, product_id, quantity, total_price
+    FROM product_sales
+    WHERE id > {ultimo} AND id <= {limite} ORDER BY id LIMIT {lote}
+"""
+
+PONTO_SQL = "SELECT (SELECT COALESCE(MAX(id), 0) FROM sales), (SELECT COALESCE(MAX(id), 0) FROM product_sales)"
+
+_dados = None
+# Ponto seguro marcado e ainda não carregado: (venda, item, transações abertas)
+_ponto = None
+_carga_lock = threading.Lock()
+# Uma recarga completa por vez: outra pedida no meio dela é recusada
+_recarga_lock = threading.Lock()
+_stats = {"cargas": 0, "ultima_carga": None, "duracao_ms": 0.0}
+
+
+def disponivel():
+    return _dados is not None
+
+
+def versao_colunar():
+    """
+    Últimos ids de `sales` e `product_sales` carregados ("" sem o motor).
+    """
+    dados = _dados
+    if dados is None:
+        return ""
+    return "{}.{}".format(*dados["ultimos"])
+
+
+def _vazio(colunas):
+    return {nome: np.empty(0, dtype=tipo) for nome, tipo in colunas.items()}
+
+
+def _copy(cursor, sql):
+    # COPY em CSV só com números: np.loadtxt converte em C, sem criar tuplas
+    buffer = StringIO()
+    cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv)", buffer)
+    buffer.seek(0)
+    return np.loadtxt(buffer, delimiter=",", dtype=np.float64, ndmin=2)
+
+
+def _le_novas(cursor, sql, colunas, ultimo, limite):
+    """
+    Lê em lotes as linhas com id acima de `ultimo` e até `limite`.
+    Retorna um dicionário coluna -> array (na ordem de `colunas`).
+    """
+    lotes = []
+    while ultimo < limite:
+        lote = _copy(cursor, sql.format(ultimo=ultimo, limite=limite, lote=COLUNAR_LOTE))
+        if not len(lote):
+            break
+        lotes.append(lote)
+        ultimo = int(lote[-1, 0])
+        if len(lote) < COLUNAR_LOTE:
+            break
+    matriz = np.concatenate(lotes) if lotes else np.empty((0, len(colunas)))
+    return {nome: matriz[:, i] for i, nome in enumerate(colunas)}
+
+
+def _dimensoes(cursor):
+    cursor.execute("SELECT id, name, is_active FROM stores")
+    lojas = {r[0]: (r[1], r[2]) for r in cursor.fetchall()}
+    cursor.execute("SELECT id, name FROM channels")
+    canais = dict(cursor.fetchall())
+    cursor.execute("SELECT id, name FROM products")
+    produtos = dict(cursor.fetchall())
+    return lojas, canais, produtos
+
+
+def _ponto_seguro(conn, seguros):
+    """
+    Últimos ids (venda, item) que podem ser carregados, ou `seguros` (os
+    já carregados) se as transações abertas no ponto ainda não terminaram.
+
+    Mesma ideia do watermark dos rollups: o ponto guarda os maiores ids
+    visíveis e as transações abertas quando foi marcado, lidos nessa ordem;
+    quando elas terminam, nenhum id até o ponto pode mais aparecer. As
+    duas tabelas são marcadas juntas, então o item e a venda gravados na
+    mesma transação ficam do mesmo lado do ponto.
+    """
+    global _ponto
+    with conn.cursor() as cursor:
+        if _ponto is None:
+            cursor.execute(PONTO_SQL)
+            venda, item = cursor.fetchone()
+            cursor.execute(TRANSACOES_ABERTAS_SQL)
+            _ponto = (venda, item, cursor.fetchone()[0])
+        venda, item, transacoes = _ponto
+        limite = time.monotonic() + ESPERA_PONTO
+        while transacoes:
+            cursor.execute(AINDA_ABERTAS_SQL, (transacoes,))
+            if not cursor.fetchone()[0]:
+                break
+            if time.monotonic() >= limite:
+                conn.rollback()
+                return seguros
+            time.sleep(0.05)
+    conn.rollback()
+    _ponto = None
+    return max(venda, seguros[0]), max(item, seguros[1])
+
+
+def _posicoes(ids_vendas, vendas_dos_itens):
+    """
+    Posição da venda de cada item nos arrays de `sales` e máscara dos itens
+    cuja venda está carregada.
+    """
+    posicoes = np.searchsorted(ids_vendas, vendas_dos_itens)
+    encontrados = posicoes < len(ids_vendas)
+    encontrados[encontrados] = ids_vendas[posicoes[encontrados]] == vendas_dos_itens[encontrados]
+    return posicoes, encontrados
+
+
+def atualiza_colunar(conn, recarregar=False):
+    """
+    Acrescenta as vendas e itens novos (entre o último id carregado e o
+    ponto seguro) e relê lojas, canais e produtos. Vendas e itens são lidos
+    no mesmo snapshot; um item cuja venda não está nos arrays não é
+    atribuído a outra: fica guardado até a venda ser carregada.
+    Retorna o número de (vendas, itens) acrescentados.
+    """
+    global _dados
+    with _carga_lock:
+        inicio = time.perf_counter()
+        atual = None if recarregar else _dados
+        vendas = atual["vendas"] if atual else _vazio(COLUNAS_VENDAS)
+        itens = atual["itens"] if atual else _vazio(COLUNAS_ITENS)
+        sem_venda = atual["itens_sem_venda"] if atual else _vazio(COLUNAS_ITENS)
+        ultimos = atual["ultimos"] if atual else (0, 0)
+        # Mesmo na recarga, o limite nunca recua abaixo do que já foi carregado
+        limites = _ponto_seguro(conn, _dados["ultimos"] if _dados else (0, 0))
+
+        with conn.cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            novas_vendas = _le_novas(cursor, CARGA_VENDAS, COLUNAS_VENDAS, ultimos[0], limites[0])
+            novos_itens = _le_novas(cursor, CARGA_ITENS, COLUNAS_ITENS, ultimos[1], limites[1])
+            lojas, canais, produtos = _dimensoes(cursor)
+        conn.rollback()
+
+        vendas = {
+            nome: np.concatenate([vendas[nome], novas_vendas[nome].astype(tipo)])
+            for nome, tipo in COLUNAS_VENDAS.items()
+        }
+        # Ids de venda crescem a cada carga, então o array continua ordenado
+        # e a posição de cada venda sai de uma busca binária. Os itens que
+        # ficaram sem venda na carga anterior são tentados de novo
+        novos_itens = {
+            nome: np.concatenate([sem_venda[nome], novos_itens[nome].astype(tipo)])
+            for nome, tipo in COLUNAS_ITENS.items()
+        }
+        posicoes, encontrados = _posicoes(vendas["id"], novos_itens["venda"])
+        sem_venda = _selecao(novos_itens, ~encontrados)
+        novos_itens = _selecao(novos_itens, encontrados)
+        novos_itens["venda"] = posicoes[encontrados].astype(COLUNAS_ITENS["venda"])
+        itens = {nome: np.concatenate([itens[nome], novos_itens[nome]]) for nome in COLUNAS_ITENS}
+
+        _dados = {"vendas": vendas, "itens": itens, "lojas": lojas, "canais": canais, "produtos": produtos,
+                  "itens_sem_venda": sem_venda, "ultimos": limites}
+        _stats["cargas"] += 1
+        _stats["ultima_carga"] = datetime.now().isoformat(timespec="seconds")
+        _stats["duracao_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        return len(novas_vendas["id"]), len(novos_itens["id"])
+
+
+def atualiza_colunar_pool(recarregar=False):
+    with obter_conexao() as conn:
+        return atualiza_colunar(conn, recarregar)
+
+
+def recarrega_colunar(esperar=True):
+    """
+    Descarta os arrays e carrega tudo de novo (após cargas retroativas).
+    Com `esperar=False`, retorna None sem recarregar se outra recarga já
+    estiver em andamento.
+    """
+    if not _recarga_lock.acquire(blocking=esperar):
+        return None
+    try:
+        return atualiza_colunar_pool(recarregar=True)
+    finally:
+        _recarga_lock.release()
+
+
+def desativa_colunar():
+    """
+    Descarta os arrays: os dashboards voltam a consultar o banco.
+    """
+    global _dados
+    with _carga_lock:
+        _dados = None
+
+
+def _bytes(colunas):
+    return sum(array.nbytes for array in colunas.values())
+
+
+def estatisticas_colunar():
+    """
+    Linhas e memória ocupada pelos arrays, por tabela e por milhão de linhas.
+    """
+    dados = _dados
+    if dados is None:
+        return {"ativo": False, "recarregando": _recarga_lock.locked(), **_stats}
+    tabelas = {}
+    for (nome, tabela), ultimo in zip((("sales", "vendas"), ("product_sales", "itens")), dados["ultimos"]):
+        linhas = len(dados[tabela]["id"])
+        memoria = _bytes(dados[tabela])
+        tabelas[nome] = {
+            "linhas": linhas,
+            "mb": round(memoria / 2**20, 2),
+            "mb_por_milhao": round(memoria / 2**20 / linhas * 1e6, 2) if linhas else None,
+            "ultimo_id": int(ultimo),
+        }
+    tabelas["product_sales"]["sem_venda"] = len(dados["itens_sem_venda"]["id"])
+    return {"ativo": True, "recarregando": _recarga_lock.locked(), "tabelas": tabelas, **_stats}
+
+
+# ---------------------------------------------------------------------------
+# Filtros e agregações
+# ---------------------------------------------------------------------------
+
+def _micros(dia):
+    return (dia - date(1970, 1, 1)).days * _MICROS_DIA
+
+
+def _dia_semana(created_at):
+    # 1970-01-01 foi uma quinta-feira (DOW 4)
+    return (created_at // _MICROS_DIA + 4) % 7
+
+
+def _filtra(vendas, start_date=None, end_date=None, store_id=None, channel_id=None,
+            weekday=None, start_hour=None, end_hour=None):
+    """
+    Máscara das vendas que passam pelos filtros, com a mesma semântica de
+    `filtros_vendas` (hora final inclusiva, como em /dashboard/sales).
+    """
+    created_at = vendas["created_at"]
+    mascara = np.ones(len(created_at), dtype=bool)
+    if start_date:
+        mascara &= created_at >= _micros(_data(start_date))
+    if end_date:
+        mascara &= created_at < _micros(_data(end_date) + timedelta(days=1))
+    if store_id:
+        mascara &= vendas["store_id"] == int(store_id)
+    if channel_id:
+        mascara &= vendas["channel_id"] == int(channel_id)
+    if weekday is not None:
+        mascara &= _dia_semana(created_at) == int(weekday)
+    if start_hour is not None or end_hour is not None:
+        hora = created_at // _MICROS_HORA % 24
+        if start_hour is not None:
+            mascara &= hora >= int(start_hour)
+        if end_hour is not None:
+            mascara &= hora <= int(end_hour)
+    return mascara
+
+
+def _soma_por(chave, *pesos):
+    """
+    Group-by vetorizado sobre uma chave inteira: retorna (chaves presentes,
+    contagem, somas de cada peso). As somas vêm em float64, exatas para
+    inteiros abaixo de 2**53.
+    """
+    if not len(chave):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), [np.empty(0) for _ in pesos]
+    base = int(chave.min())
+    indice = chave - base
+    contagem = np.bincount(indice)
+    presentes = np.flatnonzero(contagem)
+    somas = [np.bincount(indice, weights=peso)[presentes] for peso in pesos]
+    return presentes + base, contagem[presentes], somas
+
+
+def _agrega_vendas(chave, vendas):
+    """
+    chave -> [pedidos, centavos, cancelados] das vendas (já filtradas).
+    """
+    chaves, pedidos, (centavos, cancelados) = _soma_por(chave, vendas["centavos"], vendas["cancelado"])
+    return {
+        int(k): [int(p), int(round(c)), int(round(x))]
+        for k, p, c, x in zip(chaves, pedidos, centavos, cancelados)
+    }
+
+
+def _totais(vendas):
+    return [len(vendas["id"]), int(vendas["centavos"].sum()), int(vendas["cancelado"].sum())]
+
+
+def _por_nome(agregados, nomes):
+    # GROUP BY sobre o nome (loja/canal): ids com o mesmo nome se somam
+    por_nome = {}
+    for chave, valores in agregados.items():
+        acumulado = por_nome.setdefault(nomes.get(chave), [0] * len(valores))
+        for i, valor in enumerate(valores):
+            acumulado[i] += valor
+    return por_nome
+
+
+def _arredonda(valor):
+    return valor.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def _reais(centavos):
+    return Decimal(int(centavos)).scaleb(-2)
+
+
+def _media(centavos, pedidos):
+    # ROUND(SUM / COUNT, 2), ou 0 quando não há pedidos
+    return _arredonda(Decimal(int(centavos)) / (100 * pedidos)) if pedidos else Decimal(0)
+
+
+def _metricas(pedidos, centavos, cancelados):
+    """
+    (total_pedidos, faturamento, ticket_medio, taxa_cancelamento), como nas
+    consultas de agregados.
+    """
+    taxa = _arredonda(Decimal(cancelados * 100) / pedidos) if pedidos else Decimal(0)
+    return (pedidos, _reais(centavos), _media(centavos, pedidos), taxa)
+
+
+def _dia(dias):
+    return date(1970, 1, 1) + timedelta(days=dias)
+
+
+def _instante(micros):
+    return _EPOCA + timedelta(microseconds=int(micros))
+
+
+def _numeric(valor):
+    # float8 -> numeric do PostgreSQL: 15 dígitos significativos
+    return Decimal(f"{valor:.15g}")
+
+
+def _selecao(colunas, mascara):
+    return {nome: array[mascara] for nome, array in colunas.items()}
+
+
+def _medido(nome, funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    registra_tempo(nome, (time.perf_counter() - inicio) * 1000)
+    return resultado
+
+
+# ---------------------------------------------------------------------------
+# Respostas por dashboard
+# ---------------------------------------------------------------------------
+
+def resultados_sales(start_date=None, end_date=None, store_id=None, channel_id=None,
+                     weekday=None, start_hour=None, end_hour=None, total_exato=False):
+    """
+    "agregados" (e "contagem", com `total_exato`) de /dashboard/sales.
+    Retorna {} quando o motor não está carregado.
+    """
+    dados = _dados
+    if dados is None:
+        return {}
+
+    def calcula():
+        vendas = _selecao(dados["vendas"], _filtra(
+            dados["vendas"], start_date, end_date, store_id, channel_id, weekday, start_hour, end_hour
+        ))
+        created_at = vendas["created_at"]
+        total = _totais(vendas)
+        linhas = [("total", None, None, None, None, None, *_metricas(*total))]
+        for dia, valores in _agrega_vendas(created_at // _MICROS_DIA, vendas).items():
+            linhas.append(("dia", _dia(dia), None, None, None, None, *_metricas(*valores)))
+        canais = _por_nome(_agrega_vendas(vendas["channel_id"], vendas), dados["canais"])
+        for canal, valores in canais.items():
+            linhas.append(("canal", None, canal, None, None, None, *_metricas(*valores)))
+        for dow, valores in _agrega_vendas(_dia_semana(created_at), vendas).items():
+            linhas.append(("semana", None, None, f"{_DIAS_SEMANA[dow]:<9}", dow + 1, None, *_metricas(*valores)))
+        for hora, valores in _agrega_vendas(created_at // _MICROS_HORA, vendas).items():
+            linhas.append(("hora", None, None, None, None, _instante(hora * _MICROS_HORA), *_metricas(*valores)))
+
+        resultados = {"agregados": linhas}
+        if total_exato:
+            resultados["contagem"] = (total[0],)
+        return resultados
+
+    return _medido("colunar", calcula)
+
+
+def resultados_overview(start_date=None, end_date=None, store_id=None, channel_id=None):
+    """
+    "agregados" e "top_produtos" de /dashboard/overview.
+    """
+    dados = _dados
+    if dados is None:
+        return {}
+
+    def calcula():
+        mascara = _filtra(dados["vendas"], start_date, end_date, store_id, channel_id)
+        vendas = _selecao(dados["vendas"], mascara)
+        created_at = vendas["created_at"]
+        total = _totais(vendas)
+        linhas = [("total", None, None, *_metricas(*total))]
+        for dia, valores in _agrega_vendas(created_at // _MICROS_DIA, vendas).items():
+            linhas.append(("dia", _dia(dia), None, *_metricas(*valores)))
+        lojas = {id_loja: nome for id_loja, (nome, _) in dados["lojas"].items()}
+        for loja, valores in _por_nome(_agrega_vendas(vendas["store_id"], vendas), lojas).items():
+            linhas.append(("loja", None, loja, *_metricas(*valores)))
+
+        # Itens das vendas filtradas, agrupados por produto e depois por nome
+        itens = _selecao(dados["itens"], mascara[dados["itens"]["venda"]])
+        produtos, _, (quantidade, receita) = _soma_por(
+            itens["product_id"], itens["quantity"], itens["total_price"]
+        )
+        por_nome = _por_nome(
+            {int(p): [q, r] for p, q, r in zip(produtos, quantidade, receita)}, dados["produtos"]
+        )
+        top = sorted(por_nome.items(), key=lambda item: item[1][1], reverse=True)[:5]
+        top_produtos = [(nome, int(round(q)), _numeric(r)) for nome, (q, r) in top]
+        return {"agregados": linhas, "top_produtos": top_produtos}
+
+    return _medido("colunar", calcula)
+
+
+def resultados_unidades(page, limit, start_date=None, end_date=None, status=None, channel_id=None):
+    """
+    "kpis", "contagem" e "unidades" de /units/overview.
+    """
+    dados = _dados
+    if dados is None:
+        return {}
+
+    def calcula():
+        lojas = dados["lojas"]
+        if status:
+            ativa = status.lower() == "ativa"
+            lojas = {id_loja: loja for id_loja, loja in lojas.items() if loja[1] == ativa}
+
+        vendas = _selecao(dados["vendas"], _filtra(
+            dados["vendas"], start_date, end_date, channel_id=channel_id
+        ))
+        por_loja = _agrega_vendas(vendas["store_id"], vendas)
+        ultima = {}
+        if len(vendas["store_id"]):
+            ids = vendas["store_id"]
+            maximos = np.full(int(ids.max()) + 1, np.iinfo(np.int64).min)
+            np.maximum.at(maximos, ids, vendas["created_at"])
+            ultima = {loja: maximos[loja] for loja in por_loja}
+
+        # LEFT JOIN de stores com sales: com filtro sobre as vendas (data,
+        # canal), lojas sem vendas no filtro somem do resultado
+        filtra_vendas = bool(start_date or end_date or channel_id)
+        linhas = []
+        for id_loja, (nome, ativa) in lojas.items():
+            pedidos, centavos, _ = por_loja.get(id_loja, [0, 0, 0])
+            if filtra_vendas and not pedidos:
+                continue
+            linhas.append((
+                id_loja, nome, "Ativa" if ativa else "Inativa",
+                _reais(centavos), _media(centavos, pedidos), pedidos,
+                _instante(ultima[id_loja]) if pedidos else None,
+            ))
+
+        pedidos = sum(linha[5] for linha in linhas)
+        centavos = sum(por_loja[linha[0]][1] for linha in linhas if linha[5])
+        kpis = (
+            len(linhas), _reais(centavos), _media(centavos, pedidos),
+            sum(1 for linha in linhas if linha[2] == "Ativa"),
+        )
+        linhas.sort(key=lambda linha: (-linha[3], linha[0]))
+        offset = (page - 1) * limit
+        return {
+            "kpis": kpis,
+            "contagem": (len(dados["lojas"]),),
+            "unidades": linhas[offset:offset + limit],
+        }
+
+    return _medido("colunar", calcula)
+
+
+async def resultados_async(funcao, *args, **kwargs):
+    """
+    Executa uma das funções `resultados_*` em uma thread (os group-bys
+    liberam o GIL na maior parte do tempo), sem bloquear o event loop.
+    """
+    if _dados is None:
+        return {}
+    return await asyncio.to_thread(funcao, *args, **kwargs)
+
+
+def pendentes(consultas, resultados):
+    """
+    Consultas que o motor colunar não respondeu e ainda vão ao banco.
+    """
+    return [consulta for consulta in consultas if consulta.nome not in resultados]
@@ -0,0 +1,122 @@
+"""
+Compressão das respostas (middleware ASGI): brotli quando o cliente aceita
+e o pacote `brotli` está instalado (opcional), gzip caso contrário.
+Respostas menores que `compressao_minimo` bytes, já codificadas ou
+parciais saem sem compressão. Respostas em streaming são comprimidas
+pedaço a pedaço.
+"""
+
+import os
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # sem o brotli, só gzip
+    brotli = None
+
+COMPRESSAO = os.getenv('compressao', '1') != '0'
+COMPRESSAO_MINIMO = int(os.getenv('compressao_minimo', 1024))
+# Níveis rápidos: o ganho de tamanho dos níveis máximos não paga a CPU por requisição
+COMPRESSAO_NIVEL_GZIP = int(os.getenv('compressao_nivel_gzip', 6))
+COMPRESSAO_NIVEL_BROTLI = int(os.getenv('compressao_nivel_brotli', 4))
+
+_SEM_COMPRESSAO = ("image/", "video/", "audio/", "application/gzip", "application/zip",
+                  "application/vnd.apache.parquet", "text/event-stream")
+
+
+def _aceitas(accept_encoding):
+    # Codificações aceitas, ignorando as marcadas com q=0
+    aceitas = set()
+    for parte in accept_encoding.lower().split(","):
+        nome, _, parametros = parte.strip().partition(";")
+        if parametros.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            aceitas.add(nome.strip())
+    return aceitas
+
+
+def escolhe_codificacao(accept_encoding):
+    aceitas = _aceitas(accept_encoding or "")
+    if brotli is not None and "br" in aceitas:
+        return "br"
+    if "gzip" in aceitas:
+        return "gzip"
+    return None
+
+
+def _compressor(codificacao):
+    """
+    Função comprime(pedaço, ultimo) de um fluxo na codificação pedida. Cada
+    pedaço é descarregado (flush), para que o streaming chegue ao cliente
+    à medida que é gerado.
+    """
+    if codificacao == "br":
+        compressor = brotli.Compressor(quality=COMPRESSAO_NIVEL_BROTLI)
+        return lambda pedaco, ultimo: compressor.process(pedaco) + (
+            compressor.finish() if ultimo else compressor.flush()
+        )
+    compressor = zlib.compressobj(COMPRESSAO_NIVEL_GZIP, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return lambda pedaco, ultimo: compressor.compress(pedaco) + compressor.flush(
+        zlib.Z_FINISH if ultimo else zlib.Z_SYNC_FLUSH
+    )
+
+
+class CompressaoMiddleware:
+    def __init__(self, app, minimo=COMPRESSAO_MINIMO):
+        self.app = app
+        self.minimo = minimo
+
+    async def __call__(self, scope, receive, send):
+        codificacao = None
+        if scope["type"] == "http":
+            codificacao = escolhe_codificacao(Headers(scope=scope).get("accept-encoding"))
+        if codificacao is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        comprimir = None
+        comprime = None
+
+        async def envia(mensagem):
+            nonlocal inicio, comprimir, comprime
+            if mensagem["type"] == "http.response.start":
+                # Segura o início até saber, pelo primeiro pedaço, se vale comprimir
+                inicio = mensagem
+                headers = Headers(raw=mensagem["headers"])
+                tipo = headers.get("content-type", "")
+                comprimir = (
+                    mensagem["status"] not in (204, 206, 304)
+                    and "content-encoding" not in headers
+                    and not tipo.startswith(_SEM_COMPRESSAO)
+                )
+                if not comprimir:
+                    await send(inicio)
+                return
+            if mensagem["type"] != "http.response.body" or not comprimir:
+                await send(mensagem)
+                return
+
+            corpo = mensagem.get("body", b"")
+            mais = mensagem.get("more_body", False)
+            if comprime is None:
+                headers = MutableHeaders(raw=inicio["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                if not mais and len(corpo) < self.minimo:
+                    comprimir = False
+                    await send(inicio)
+                    await send(mensagem)
+                    return
+                comprime = _compressor(codificacao)
+                headers["Content-Encoding"] = codificacao
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                corpo = comprime(corpo, not mais)
+                if not mais:
+                    headers["Content-Length"] = str(len(corpo))
+                await send(inicio)
+            else:
+                corpo = comprime(corpo, not mais)
+            await send({"type": "http.response.body", "body": corpo, "more_body": mais})
+
+        await self.app(scope, receive, envia)
@@ -0,0 +1,86 @@
+"""
+GET condicional (ETag / If-None-Match) das rotas de dashboard.
+
+O ETag combina o endpoint, os filtros normalizados (mesma chave do cache
+de respostas), o formato e a versão dos dados: maior id e maior created_at
+de `sales`, mais os watermarks dos rollups e do motor colunar quando eles
+respondem e a última retenção (meses descartados não mudam esses ids). Com um `If-None-Match` igual ao ETag atual, a rota devolve 304
+sem executar as consultas; só a leitura da versão vai ao banco.
+
+A versão é lida antes das consultas e guardada junto com o resultado no
+cache de respostas, então o ETag de um corpo vindo do cache é o da versão
+em que ele foi calculado: um corpo desatualizado nunca recebe o ETag da
+versão atual.
+"""
+
+import hashlib
+import os
+import time
+from starlette.responses import Response
+from cache import chave_cache, em_cache
+from colunar import versao_colunar
+from consultas import registra_tempo, server_timing
+from particoes import versao_retencao
+from respostas import resposta
+from rollups import disponiveis as rollups_disponiveis
+
+ETAG = os.getenv('etag', '1') != '0'
+
+VERSAO_SQL = "SELECT MAX(id), MAX(created_at) FROM sales"
+VERSAO_ROLLUPS_SQL = """
+    SELECT MAX(s.id), MAX(s.created_at),
+           (SELECT string_agg(ultimo_id::text, '.' ORDER BY tabela) FROM rollup_watermarks)
+    FROM sales s
+"""
+
+
+async def versao_dados():
+    """
+    Versão atual dos dados que alimentam os dashboards.
+    """
+    from connection_async import obter_conexao_async
+
+    inicio = time.perf_counter()
+    async with obter_conexao_async() as conn:
+        cursor = await conn.execute(VERSAO_ROLLUPS_SQL if rollups_disponiveis() else VERSAO_SQL)
+        versao = ".".join(str(valor) for valor in await cursor.fetchone())
+    registra_tempo("versao", (time.perf_counter() - inicio) * 1000)
+    return f"{versao}.{versao_colunar()}.{versao_retencao()}"
+
+
+def etag(nome, filtros, formato, versao):
+    # Fraco (W/): o mesmo ETag vale para as versões comprimida e sem compressão
+    chave = f"{chave_cache(nome, **filtros)}|{formato}|{versao}"
+    return 'W/"' + hashlib.sha1(chave.encode()).hexdigest()[:20] + '"'
+
+
+def _coincide(if_none_match, atual):
+    if not if_none_match:
+        return False
+    candidatos = {valor.strip() for valor in if_none_match.split(",")}
+    # A comparação de If-None-Match é fraca: W/"x" e "x" são equivalentes
+    return "*" in candidatos or atual in candidatos or atual[2:] in candidatos
+
+
+async def responde_dashboard(request, nome, filtros, calcula, tempos, formato="json"):
+    """
+    Resposta de uma rota de dashboard com cache, ETag e 304. `calcula` é a
+    corrotina sem argumentos que monta o resultado.
+    """
+    versao = await versao_dados() if ETAG else None
+    atual = etag(nome, filtros, formato, versao)
+    if ETAG and _coincide(request.headers.get("if-none-match"), atual):
+        return Response(status_code=304, headers={
+            "ETag": atual, "Cache-Control": "no-cache", "Server-Timing": server_timing(tempos),
+        })
+
+    async def calcula_versionado():
+        return {"versao": versao, "dados": await calcula()}
+
+    resultado = await em_cache(nome, filtros, calcula_versionado)
+    resposta_json = resposta(resultado["dados"], tempos, formato)
+    if ETAG:
+        resposta_json.headers["ETag"] = etag(nome, filtros, formato, resultado["versao"])
+        # O navegador guarda a resposta, mas revalida a cada uso
+        resposta_json.headers["Cache-Control"] = "no-cache"
+    return resposta_json
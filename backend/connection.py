@@ -1,28 +1,186 @@
 import psycopg2
 import os
+import threading
+import time
+from contextlib import contextmanager
 from dotenv import load_dotenv
 from psycopg2 import Error
+from psycopg2.extensions import connection as _ConexaoPsycopg
+from psycopg2.pool import ThreadedConnectionPool
+from metricas import observa_aquisicao
 
 load_dotenv()
 
 password = os.getenv('password')
 
+# Configuração do pool (variáveis de ambiente, com padrões seguros)
+POOL_MIN = int(os.getenv('pool_min', 2))
+POOL_MAX = int(os.getenv('pool_max', 20))
+POOL_TIMEOUT = float(os.getenv('pool_timeout', 10))
+# Conexões ociosas há mais tempo que isso são validadas com SELECT 1 antes do uso
+POOL_HEALTH_CHECK_IDLE = float(os.getenv('pool_health_check_idle', 30))
+
+
+def _parametros_conexao():
+    return dict(
+        host=os.getenv('host'),
+        port=os.getenv('port'),
+        database=os.getenv('database'),
+        user=os.getenv('user'),
+        password=os.getenv('password')
+    )
+
+
 def conecta():
     try:
-        conn = psycopg2.connect(
-            host=os.getenv('host'),
-            port=os.getenv('port'),
-            database=os.getenv('database'),
-            user=os.getenv('user'),
-            password=os.getenv('password')
-        )
+        conn = psycopg2.connect(**_parametros_conexao())
         print("Conectado com sucesso!")
         return conn
-    
+
     except Error as e:
         print(f"Erro ao conectar com o banco de dados! {e}")
 
 def encerra_conexao(conn):
     if conn:
         conn.close()
-    print("Conexão encerrada")
\ No newline at end of file
+    print("Conexão encerrada")
+
+
+class _Conexao(_ConexaoPsycopg):
+    # Momento (time.monotonic) da última devolução ao pool; None se nunca foi usada
+    ultimo_uso = None
+
+
+# Pool de conexões
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(POOL_MAX)
+_stats_lock = threading.Lock()
+_stats = {
+    "em_uso": 0,
+    "aguardando": 0,
+    "aquisicoes": 0,
+    "timeouts": 0,
+    "descartadas": 0,
+    "tempo_aquisicao_total_ms": 0.0,
+    "tempo_aquisicao_max_ms": 0.0,
+}
+
+
+def inicia_pool():
+    """
+    Cria o pool de conexões (idempotente). Chamado no startup da API,
+    mas também sob demanda na primeira aquisição.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadedConnectionPool(
+                POOL_MIN, POOL_MAX, connection_factory=_Conexao, **_parametros_conexao())
+            # O psycopg2 fecha as conexões devolvidas quando já há `minconn`
+            # ociosas; só POOL_MIN são abertas no início, mas todas as abertas
+            # (até POOL_MAX) ficam no pool para a próxima aquisição
+            _pool.minconn = POOL_MAX
+    return _pool
+
+
+def fecha_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+def _conexao_saudavel(conn):
+    if conn.closed:
+        return False
+    # Conexão recém-aberta não precisa de validação
+    if conn.ultimo_uso is None or time.monotonic() - conn.ultimo_uso < POOL_HEALTH_CHECK_IDLE:
+        return True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except Error:
+        return False
+
+
+def _atualiza_stats(**deltas):
+    with _stats_lock:
+        for chave, valor in deltas.items():
+            _stats[chave] += valor
+
+
+@contextmanager
+def obter_conexao():
+    """
+    Empresta uma conexão do pool e a devolve ao final do bloco.
+    Em caso de exceção a transação é desfeita antes da devolução.
+    Se todas as conexões estiverem em uso, aguarda até POOL_TIMEOUT segundos.
+    """
+    pool = inicia_pool()
+    inicio = time.perf_counter()
+
+    _atualiza_stats(aguardando=1)
+    try:
+        adquirido = _slots.acquire(timeout=POOL_TIMEOUT)
+    finally:
+        _atualiza_stats(aguardando=-1)
+    if not adquirido:
+        _atualiza_stats(timeouts=1)
+        raise TimeoutError(f"Nenhuma conexão disponível no pool após {POOL_TIMEOUT}s")
+
+    try:
+        conn = pool.getconn()
+        while not _conexao_saudavel(conn):
+            pool.putconn(conn, close=True)
+            _atualiza_stats(descartadas=1)
+            conn = pool.getconn()
+    except Exception:
+        _slots.release()
+        raise
+
+    espera_ms = (time.perf_counter() - inicio) * 1000
+    observa_aquisicao("sync", espera_ms / 1000)
+    with _stats_lock:
+        _stats["em_uso"] += 1
+        _stats["aquisicoes"] += 1
+        _stats["tempo_aquisicao_total_ms"] += espera_ms
+        _stats["tempo_aquisicao_max_ms"] = max(_stats["tempo_aquisicao_max_ms"], espera_ms)
+
+    try:
+        yield conn
+        if not conn.closed:
+            conn.rollback()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        conn.ultimo_uso = time.monotonic()
+        pool.putconn(conn, close=bool(conn.closed))
+        _atualiza_stats(em_uso=-1)
+        _slots.release()
+
+
+def get_conexao():
+    """
+    Dependência FastAPI: `conn = Depends(get_conexao)`.
+    """
+    with obter_conexao() as conn:
+        yield conn
+
+
+def estatisticas_pool():
+    with _stats_lock:
+        stats = dict(_stats)
+    aquisicoes = stats["aquisicoes"]
+    stats["tempo_aquisicao_medio_ms"] = round(
+        stats["tempo_aquisicao_total_ms"] / aquisicoes, 3) if aquisicoes else 0.0
+    stats["tempo_aquisicao_total_ms"] = round(stats["tempo_aquisicao_total_ms"], 3)
+    stats["tempo_aquisicao_max_ms"] = round(stats["tempo_aquisicao_max_ms"], 3)
+    stats["minimo"] = POOL_MIN
+    stats["maximo"] = POOL_MAX
+    return stats
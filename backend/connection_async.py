@@ -0,0 +1,98 @@
+import time
+from contextlib import asynccontextmanager
+from psycopg import AsyncConnection
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
+from metricas import observa_aquisicao
+from connection import (
+    _parametros_conexao, POOL_MIN, POOL_MAX, POOL_TIMEOUT, POOL_HEALTH_CHECK_IDLE
+)
+
+# Pool assíncrono (psycopg 3), com a mesma configuração do pool síncrono
+_pool = None
+
+
+class _ConexaoAsync(AsyncConnection):
+    # Momento (time.monotonic) da última devolução ao pool; None se nunca foi usada
+    ultimo_uso = None
+
+
+async def _verifica_conexao(conn):
+    """
+    Validação na aquisição: só conexões ociosas há mais de
+    POOL_HEALTH_CHECK_IDLE segundos fazem a ida e volta ao servidor.
+    """
+    if conn.ultimo_uso is None or time.monotonic() - conn.ultimo_uso < POOL_HEALTH_CHECK_IDLE:
+        return
+    await AsyncConnectionPool.check_connection(conn)
+
+
+async def inicia_pool_async():
+    """
+    Cria e abre o pool assíncrono (idempotente).
+    """
+    global _pool
+    if _pool is None:
+        parametros = _parametros_conexao()
+        parametros["dbname"] = parametros.pop("database")
+        _pool = AsyncConnectionPool(
+            make_conninfo(**{k: v for k, v in parametros.items() if v is not None}),
+            min_size=POOL_MIN,
+            max_size=POOL_MAX,
+            timeout=POOL_TIMEOUT,
+            connection_class=_ConexaoAsync,
+            check=_verifica_conexao,
+            open=False,
+        )
+        await _pool.open()
+    return _pool
+
+
+async def fecha_pool_async():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+@asynccontextmanager
+async def obter_conexao_async():
+    """
+    Empresta uma conexão assíncrona do pool e a devolve ao final do bloco.
+    """
+    pool = await inicia_pool_async()
+    inicio = time.perf_counter()
+    async with pool.connection() as conn:
+        observa_aquisicao("async", time.perf_counter() - inicio)
+        try:
+            yield conn
+        finally:
+            conn.ultimo_uso = time.monotonic()
+
+
+async def get_conexao_async():
+    """
+    Dependência FastAPI: `conn = Depends(get_conexao_async)`.
+    """
+    async with obter_conexao_async() as conn:
+        yield conn
+
+
+def estatisticas_pool_async():
+    if _pool is None:
+        return {}
+    stats = _pool.get_stats()
+    aquisicoes = stats.get("requests_num", 0)
+    return {
+        "tamanho": stats.get("pool_size", 0),
+        "disponiveis": stats.get("pool_available", 0),
+        "em_uso": stats.get("pool_size", 0) - stats.get("pool_available", 0),
+        "aguardando": stats.get("requests_waiting", 0),
+        "aquisicoes": aquisicoes,
+        "timeouts": stats.get("requests_errors", 0),
+        "tempo_aquisicao_total_ms": stats.get("requests_wait_ms", 0),
+        "tempo_aquisicao_medio_ms": round(
+            stats.get("requests_wait_ms", 0) / aquisicoes, 3) if aquisicoes else 0.0,
+        "minimo": POOL_MIN,
+        "maximo": POOL_MAX,
+    }
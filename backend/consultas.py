@@ -0,0 +1,176 @@
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import NamedTuple
+from connection import obter_conexao
+from consultas_lentas import registra as registra_consulta_lenta
+from metricas import observa_consulta, rota_atual
+
+# Executa as seções de um dashboard em conexões separadas do pool, em paralelo
+CONSULTAS_PARALELAS = os.getenv('consultas_paralelas', '1') != '0'
+
+# Tempos por seção (ms) da requisição atual, preenchidos quando há medição ativa
+_tempos_secoes = ContextVar("tempos_secoes", default=None)
+
+
+class Consulta(NamedTuple):
+    """
+    Uma consulta nomeada de um serviço. `modo` indica se o resultado
+    é uma única linha ("one") ou a lista completa ("all").
+    """
+    nome: str
+    sql: str
+    params: tuple = ()
+    modo: str = "all"
+
+
+@contextmanager
+def mede_secoes():
+    """
+    Ativa a medição de tempo por seção para as consultas executadas no bloco.
+    Produz um dicionário nome -> duração em ms.
+    """
+    tempos = {}
+    token = _tempos_secoes.set(tempos)
+    try:
+        yield tempos
+    finally:
+        _tempos_secoes.reset(token)
+
+
+def server_timing(tempos):
+    """
+    Formata os tempos no padrão do header `Server-Timing`.
+    """
+    return ", ".join(f"{nome};dur={ms:.1f}" for nome, ms in tempos.items())
+
+
+def registra_tempo(nome, ms):
+    """
+    Registra um tempo avulso (ex.: consulta ao cache) na medição ativa.
+    """
+    tempos = _tempos_secoes.get()
+    if tempos is not None:
+        tempos[nome] = ms
+
+
+def _registra_tempos(tempos_consultas, inicio):
+    tempos = _tempos_secoes.get()
+    if tempos is not None:
+        tempos.update(tempos_consultas)
+        tempos["total"] = (time.perf_counter() - inicio) * 1000
+
+
+def separa_secoes(linhas):
+    """
+    Separa o resultado de uma consulta com GROUPING SETS pela primeira
+    coluna (`secao`). Retorna um dicionário secao -> linhas sem essa coluna.
+    """
+    secoes = {}
+    for linha in linhas:
+        secoes.setdefault(linha[0], []).append(linha[1:])
+    return secoes
+
+
+def _linhas(resultado, consulta):
+    if consulta.modo == "one":
+        return int(resultado is not None)
+    return len(resultado)
+
+
+def _observa(consulta, inicio, resultado):
+    # Ponto único por onde passam as consultas dos serviços: métricas e log de lentas
+    segundos = time.perf_counter() - inicio
+    linhas = _linhas(resultado, consulta)
+    observa_consulta(consulta.nome, segundos, linhas)
+    registra_consulta_lenta(consulta, segundos, linhas, rota_atual())
+
+
+def _busca(cursor, consulta):
+    inicio = time.perf_counter()
+    cursor.execute(consulta.sql, consulta.params)
+    resultado = cursor.fetchone() if consulta.modo == "one" else cursor.fetchall()
+    _observa(consulta, inicio, resultado)
+    return resultado
+
+
+def _executa_uma(consulta):
+    inicio = time.perf_counter()
+    with obter_conexao() as conn, conn.cursor() as cursor:
+        resultado = _busca(cursor, consulta)
+    return resultado, (time.perf_counter() - inicio) * 1000
+
+
+def executa_consultas(consultas, paralelo=CONSULTAS_PARALELAS):
+    """
+    Executa as consultas no pool síncrono. Com `paralelo`, cada consulta usa
+    sua própria conexão e o tempo total fica próximo ao da seção mais lenta.
+    Retorna um dicionário nome -> resultado.
+    """
+    if not consultas:
+        return {}
+    inicio = time.perf_counter()
+    if paralelo and len(consultas) > 1:
+        with ThreadPoolExecutor(max_workers=len(consultas)) as executor:
+            # Cada thread roda em uma cópia do contexto da requisição (métricas)
+            execucoes = [futuro.result() for futuro in [
+                executor.submit(contextvars.copy_context().run, _executa_uma, consulta)
+                for consulta in consultas
+            ]]
+    else:
+        execucoes = []
+        with obter_conexao() as conn, conn.cursor() as cursor:
+            for consulta in consultas:
+                inicio_consulta = time.perf_counter()
+                resultado = _busca(cursor, consulta)
+                execucoes.append((resultado, (time.perf_counter() - inicio_consulta) * 1000))
+
+    _registra_tempos({c.nome: ms for c, (_, ms) in zip(consultas, execucoes)}, inicio)
+    return {c.nome: resultado for c, (resultado, _) in zip(consultas, execucoes)}
+
+
+async def _busca_async(cursor, consulta):
+    inicio = time.perf_counter()
+    await cursor.execute(consulta.sql, consulta.params)
+    if consulta.modo == "one":
+        resultado = await cursor.fetchone()
+    else:
+        resultado = await cursor.fetchall()
+    _observa(consulta, inicio, resultado)
+    return resultado
+
+
+async def _executa_uma_async(consulta, conn=None):
+    from connection_async import obter_conexao_async
+
+    inicio = time.perf_counter()
+    if conn is None:
+        async with obter_conexao_async() as conn, conn.cursor() as cursor:
+            resultado = await _busca_async(cursor, consulta)
+    else:
+        async with conn.cursor() as cursor:
+            resultado = await _busca_async(cursor, consulta)
+    return resultado, (time.perf_counter() - inicio) * 1000
+
+
+async def executa_consultas_async(consultas, paralelo=CONSULTAS_PARALELAS):
+    """
+    Versão assíncrona de executa_consultas, usando o pool do psycopg 3.
+    """
+    from connection_async import obter_conexao_async
+
+    if not consultas:
+        return {}
+    inicio = time.perf_counter()
+    if paralelo and len(consultas) > 1:
+        execucoes = await asyncio.gather(*(_executa_uma_async(c) for c in consultas))
+    else:
+        async with obter_conexao_async() as conn:
+            execucoes = [await _executa_uma_async(c, conn) for c in consultas]
+
+    _registra_tempos({c.nome: ms for c, (_, ms) in zip(consultas, execucoes)}, inicio)
+    return {c.nome: resultado for c, (resultado, _) in zip(consultas, execucoes)}
@@ -0,0 +1,181 @@
+"""
+Log de consultas lentas da camada de serviços.
+
+Toda consulta que passa por `consultas.executa_consultas(_async)` e demora
+mais que `consultas_lentas_ms` gera uma linha JSON em um arquivo rotativo,
+com o SQL normalizado, a forma (hash do SQL: cada combinação de filtros dos
+serviços gera uma forma diferente), os parâmetros, a duração, as linhas
+retornadas e a rota. Uma fração das entradas (`consultas_lentas_amostragem`)
+recebe o plano de `EXPLAIN (ANALYZE, BUFFERS)`, capturado em segundo plano
+por uma única thread com conexão própria, sem atrasar a requisição. Se um
+plano ainda está sendo capturado, as entradas seguintes saem sem plano.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+CONSULTAS_LENTAS_MS = float(os.getenv('consultas_lentas_ms', 500))  # 0 desativa
+CONSULTAS_LENTAS_AMOSTRAGEM = float(os.getenv('consultas_lentas_amostragem', 0.2))
+CONSULTAS_LENTAS_ARQUIVO = os.getenv(
+    'consultas_lentas_arquivo', str(Path(__file__).resolve().parent / "logs" / "consultas_lentas.jsonl"))
+CONSULTAS_LENTAS_MAX_MB = float(os.getenv('consultas_lentas_max_mb', 10))
+CONSULTAS_LENTAS_ARQUIVOS = int(os.getenv('consultas_lentas_arquivos', 3))  # arquivos rotacionados mantidos
+
+# O EXPLAIN ANALYZE executa a consulta de novo; limita quanto tempo ele pode levar
+TIMEOUT_EXPLAIN_MS = 30000
+
+_logger = None
+_logger_lock = threading.Lock()
+_explain = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+_explain_pendente = threading.Event()
+
+
+def normaliza_sql(sql):
+    return " ".join(sql.split())
+
+
+def forma(sql_normalizado):
+    return hashlib.sha1(sql_normalizado.encode()).hexdigest()[:12]
+
+
+def _log():
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            Path(CONSULTAS_LENTAS_ARQUIVO).parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(
+                CONSULTAS_LENTAS_ARQUIVO,
+                maxBytes=int(CONSULTAS_LENTAS_MAX_MB * 1024 * 1024),
+                backupCount=CONSULTAS_LENTAS_ARQUIVOS,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _logger = logging.getLogger("godlevel.consultas_lentas")
+            _logger.setLevel(logging.INFO)
+            _logger.propagate = False
+            _logger.addHandler(handler)
+    return _logger
+
+
+def _escreve(entrada):
+    _log().info(json.dumps(entrada, default=str, ensure_ascii=False))
+
+
+def _plano(sql, params):
+    from connection import obter_conexao
+
+    with obter_conexao() as conn, conn.cursor() as cursor:
+        cursor.execute(f"SET LOCAL statement_timeout = {TIMEOUT_EXPLAIN_MS}")
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+        return cursor.fetchone()[0][0]
+
+
+def _escreve_com_plano(entrada, sql, params):
+    try:
+        entrada["plano"] = _plano(sql, params)
+    except Exception as e:
+        entrada["erro_plano"] = str(e).strip()
+    finally:
+        _explain_pendente.clear()
+    _escreve(entrada)
+
+
+def registra(consulta, segundos, linhas, rota):
+    """
+    Registra a consulta se ela passou do limite. Chamado depois de cada
+    consulta dos serviços; abaixo do limite, custa uma comparação.
+    """
+    ms = segundos * 1000
+    if CONSULTAS_LENTAS_MS <= 0 or ms < CONSULTAS_LENTAS_MS:
+        return
+    sql = normaliza_sql(consulta.sql)
+    entrada = {
+        "momento": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "rota": rota,
+        "secao": consulta.nome,
+        "forma": forma(sql),
+        "duracao_ms": round(ms, 1),
+        "linhas": linhas,
+        "sql": sql,
+        "params": list(consulta.params),
+    }
+    try:
+        amostrada = random.random() < CONSULTAS_LENTAS_AMOSTRAGEM
+        if amostrada and not _explain_pendente.is_set():
+            _explain_pendente.set()
+            _explain.submit(_escreve_com_plano, entrada, consulta.sql, consulta.params)
+        else:
+            _escreve(entrada)
+    except Exception as e:
+        # O log nunca derruba a requisição
+        print(f"⚠️  Falha ao registrar consulta lenta: {e}")
+
+
+def _arquivos():
+    # Do mais recente para o mais antigo: consultas_lentas.jsonl, .1, .2, ...
+    base = Path(CONSULTAS_LENTAS_ARQUIVO)
+    return [base] + [base.with_name(f"{base.name}.{i}") for i in range(1, CONSULTAS_LENTAS_ARQUIVOS + 1)]
+
+
+def le_entradas(limite=100, rota=None, secao=None, forma=None, desde=None):
+    """
+    Entradas mais recentes do log (da mais nova para a mais antiga), com
+    filtros opcionais por rota, seção, forma e momento mínimo (ISO 8601).
+    """
+    entradas = []
+    for arquivo in _arquivos():
+        if not arquivo.exists():
+            continue
+        # Dentro de um arquivo as linhas estão em ordem cronológica
+        recentes = deque(maxlen=limite)
+        with open(arquivo, encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    entrada = json.loads(linha)
+                except ValueError:
+                    continue  # linha truncada por uma escrita interrompida
+                if ((rota and entrada.get("rota") != rota)
+                        or (secao and entrada.get("secao") != secao)
+                        or (forma and entrada.get("forma") != forma)
+                        or (desde and entrada.get("momento", "") < desde)):
+                    continue
+                recentes.append(entrada)
+        entradas += reversed(recentes)
+        if len(entradas) >= limite:
+            break
+    return entradas[:limite]
+
+
+def resumo(entradas):
+    """
+    Agrupa as entradas por rota, seção e forma: quantas vezes cada forma
+    de consulta passou do limite, com duração mediana e máxima.
+    """
+    grupos = {}
+    for entrada in entradas:
+        chave = (entrada.get("rota"), entrada.get("secao"), entrada.get("forma"))
+        grupos.setdefault(chave, []).append(entrada)
+    linhas = []
+    for (rota, secao, forma_sql), grupo in grupos.items():
+        duracoes = sorted(e["duracao_ms"] for e in grupo)
+        linhas.append({
+            "rota": rota,
+            "secao": secao,
+            "forma": forma_sql,
+            "ocorrencias": len(grupo),
+            "duracao_mediana_ms": duracoes[len(duracoes) // 2],
+            "duracao_max_ms": duracoes[-1],
+            "ultima": max(e["momento"] for e in grupo),
+            "exemplo_params": grupo[0]["params"],
+            "com_plano": sum("plano" in e for e in grupo),
+        })
+    return sorted(linhas, key=lambda linha: linha["ocorrencias"] * linha["duracao_mediana_ms"], reverse=True)
@@ -0,0 +1,123 @@
+"""
+Exportação em streaming da lista de pedidos de /dashboard/sales, em CSV ou
+Parquet (requer `pip install pyarrow`).
+
+Os pedidos são lidos por um cursor no servidor (DECLARE/FETCH) em lotes de
+`exportacao_lote` linhas, e cada lote vira um pedaço da resposta antes de o
+próximo ser lido: a memória fica em um lote, qualquer que seja o total. Se
+o cliente desconecta, o Starlette cancela o gerador, o cursor é fechado e a
+conexão volta ao pool.
+"""
+
+import csv
+import io
+import os
+from connection_async import obter_conexao_async
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # sem o pyarrow, só CSV
+    pa = None
+
+EXPORTACAO_LOTE = int(os.getenv('exportacao_lote', 10000))
+
+FORMATOS_EXPORTACAO = "^(csv|parquet)$"
+TIPOS = {"csv": "text/csv; charset=utf-8", "parquet": "application/vnd.apache.parquet"}
+COLUNAS = ("id", "data", "cliente", "loja", "canal", "valor", "status")
+
+
+def parquet_disponivel():
+    return pa is not None
+
+
+async def lotes_pedidos(consulta, lote=EXPORTACAO_LOTE):
+    """
+    Lotes de linhas (id, created_at, cliente, loja, canal, valor, status)
+    de `consulta` (ver `consulta_exportacao_pedidos`), do pedido mais
+    recente ao mais antigo.
+    """
+    async with obter_conexao_async() as conn:
+        # Cursor nomeado = cursor no servidor; só o lote atual vem para a API
+        async with conn.cursor(name="exportacao_pedidos") as cursor:
+            await cursor.execute(consulta.sql, consulta.params)
+            while linhas := await cursor.fetchmany(lote):
+                yield linhas
+
+
+def _data(created_at):
+    # Mesmo formato da lista paginada: sem frações de segundo
+    return created_at.isoformat(sep=" ", timespec="seconds") if created_at else ""
+
+
+async def csv_pedidos(consulta):
+    saida = io.StringIO()
+    escritor = csv.writer(saida, lineterminator="\n")
+    escritor.writerow(COLUNAS)
+    async for linhas in lotes_pedidos(consulta):
+        escritor.writerows((i, _data(d), cl, lj, cn, v, st) for i, d, cl, lj, cn, v, st in linhas)
+        yield saida.getvalue().encode()
+        saida.seek(0)
+        saida.truncate()
+    # Sem pedidos, só o cabeçalho
+    if saida.tell():
+        yield saida.getvalue().encode()
+
+
+class _Saida(io.RawIOBase):
+    """
+    Destino do ParquetWriter que guarda os bytes escritos até serem
+    retirados com `retira()`.
+    """
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def retira(self):
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def _esquema():
+    return pa.schema([
+        ("id", pa.int64()),
+        ("data", pa.timestamp("us")),
+        ("cliente", pa.string()),
+        ("loja", pa.string()),
+        ("canal", pa.string()),
+        ("valor", pa.decimal128(12, 2)),
+        ("status", pa.string()),
+    ])
+
+
+async def parquet_pedidos(consulta):
+    """
+    Parquet com um row group por lote: cada lote é escrito e enviado antes
+    do próximo; o rodapé com os metadados sai no final.
+    """
+    esquema = _esquema()
+    saida = _Saida()
+    escritor = pq.ParquetWriter(saida, esquema, compression="zstd")
+    try:
+        async for linhas in lotes_pedidos(consulta):
+            colunas = list(zip(*linhas))
+            escritor.write_table(pa.Table.from_arrays(
+                [pa.array(coluna, tipo) for coluna, tipo in zip(colunas, esquema.types)], schema=esquema
+            ))
+            yield saida.retira()
+    finally:
+        escritor.close()
+    yield saida.retira()
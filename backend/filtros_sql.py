@@ -0,0 +1,87 @@
+"""
+Filtros SQL compartilhados pelos serviços de dashboard.
+
+Todos os predicados são "sargáveis" (podem usar índice):
+- datas viram intervalos semiabertos sobre a coluna original
+  (`coluna >= início AND coluna < fim + 1 dia`), em vez de `::date`,
+  `DATE()` ou `BETWEEN ... 23:59:59`, que perdiam o último segundo do dia;
+- dia da semana e hora usam exatamente as expressões
+  `EXTRACT(DOW/HOUR FROM coluna)` indexadas pela migration 003;
+- com as tabelas particionadas (migration 004), o intervalo de datas também
+  é aplicado à coluna de partição de `product_sales` (`data_particao`).
+
+Sargável quer dizer que o índice pode ser usado, não que será: o planejador
+escolhe pela fração de vendas que o filtro mantém. Com loja ou período
+seletivo, `sales` é lida por índice ou pela poda de partições; canal, dia
+da semana e hora sozinhos mantêm uma fração grande das vendas, e aí o Seq
+Scan é mais barato. `planos.py` e `tests/test_planos.py` verificam isso em
+todas as combinações de filtros das rotas.
+"""
+
+from datetime import date, timedelta
+
+
+def _data(valor):
+    # Aceita "AAAA-MM-DD" (e também datetime ISO, do qual usa só a data)
+    return date.fromisoformat(str(valor)[:10])
+
+
+def filtros_vendas(data="s.created_at", start_date=None, end_date=None,
+                   store_id=None, channel_id=None, weekday=None,
+                   start_hour=None, end_hour=None, hora_final_inclusiva=True,
+                   data_particao=None):
+    """
+    Monta os filtros comuns dos dashboards sobre a coluna de data `data`
+    (de `sales` ou de um rollup, ambos com alias `s`).
+
+    `data_particao` (ex.: "ps.sale_created_at") recebe o mesmo intervalo de
+    datas: o planejador não deduz limites de uma coluna para a outra pela
+    junção, e sem eles varreria todas as partições de `product_sales`.
+
+    `hora_final_inclusiva` preserva a semântica de cada rota:
+    `/dashboard/sales` usa hora <= end_hour e `/produtos/analitico`, hora < end_hour.
+    Retorna (lista de predicados, lista de parâmetros).
+    """
+    filtros = []
+    params = []
+
+    colunas_data = [data, data_particao] if data_particao else [data]
+
+    if start_date:
+        for coluna in colunas_data:
+            filtros.append(f"{coluna} >= %s")
+            params.append(_data(start_date))
+
+    if end_date:
+        for coluna in colunas_data:
+            filtros.append(f"{coluna} < %s")
+            params.append(_data(end_date) + timedelta(days=1))
+
+    if store_id:
+        filtros.append("s.store_id = %s")
+        params.append(store_id)
+
+    if channel_id:
+        filtros.append("s.channel_id = %s")
+        params.append(channel_id)
+
+    if weekday is not None:
+        filtros.append(f"EXTRACT(DOW FROM {data}) = %s")
+        params.append(weekday)
+
+    if start_hour is not None:
+        filtros.append(f"EXTRACT(HOUR FROM {data}) >= %s")
+        params.append(start_hour)
+
+    if end_hour is not None:
+        filtros.append(f"EXTRACT(HOUR FROM {data}) {'<=' if hora_final_inclusiva else '<'} %s")
+        params.append(end_hour)
+
+    return filtros, params
+
+
+def where(filtros):
+    """
+    Cláusula WHERE para uma lista de predicados ("" quando vazia).
+    """
+    return "WHERE " + " AND ".join(filtros) if filtros else ""
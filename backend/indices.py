@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Índices dos dashboards: consultor que repete o catálogo de consultas dos
+serviços com EXPLAIN (ANALYZE, BUFFERS) e aponta varreduras sequenciais e
+índices faltando, e o índice BRIN opcional em sales(created_at).
+
+Os índices em si ficam nas migrations (002 a 005). O consultor usa as
+mesmas funções `_consultas_*` das rotas, com filtros tirados dos próprios
+dados (últimos 30 dias, primeira loja/canal/categoria), então reflete a
+fonte atual de cada consulta: rollups quando disponíveis, tabelas brutas
+com `rollups=0`.
+
+Uso (a partir de backend/):
+    python indices.py                 # relatório do catálogo de consultas
+    python indices.py --planos        # ... com o plano de cada consulta
+    python indices.py --brin          # cria o índice BRIN em sales(created_at)
+    python indices.py --remover-brin
+"""
+
+import argparse
+import json
+import re
+from datetime import datetime, timedelta
+from connection import obter_conexao
+from particoes import detecta_particoes
+from rollups import detecta_rollups
+from services.dashboard_service import _consultas_dashboard_overview
+from services.produtos_service import _consultas_produtos, _consultas_produtos_analitico
+from services.sales_dashboard import _consultas_dashboard_sales, codifica_cursor
+from services.unidades_service import _consultas_unidades_overview
+
+# Varreduras sequenciais em tabelas menores que isso (lojas, canais,
+# categorias...) são esperadas e não entram no relatório
+LINHAS_MINIMAS = 10000
+# Filtros que descartam menos que essa fração das linhas lidas não se
+# beneficiam de índice
+FRACAO_SELETIVA = 0.5
+
+# BRIN guarda só o mínimo/máximo de cada faixa de páginas: é minúsculo e
+# barato de manter quando created_at cresce junto com a ordem física das
+# linhas (carga só de inserção), e inútil quando essa correlação se perde
+BRIN_SQL = "CREATE INDEX IF NOT EXISTS idx_sales_created_at_brin ON sales USING brin (created_at) WITH (pages_per_range = 32)"
+REMOVE_BRIN_SQL = "DROP INDEX IF EXISTS idx_sales_created_at_brin"
+
+
+def _parametros(conn):
+    """
+    Filtros representativos: os 30 dias até a última venda e os primeiros
+    ids de loja, canal e categoria.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT MAX(created_at),
+                   (SELECT MIN(id) FROM stores),
+                   (SELECT MIN(id) FROM channels),
+                   (SELECT MIN(id) FROM categories)
+            FROM sales
+        """)
+        ultima, loja, canal, categoria = cursor.fetchone()
+    ultima = ultima or datetime.now()
+    fim = ultima.date().isoformat()
+    inicio = (ultima - timedelta(days=29)).date().isoformat()
+    return {
+        "periodo": {"start_date": inicio, "end_date": fim},
+        "loja": loja,
+        "canal": canal,
+        "categoria": categoria,
+        "cursor": codifica_cursor(ultima - timedelta(days=15), 0),
+    }
+
+
+def catalogo(p):
+    """
+    (nome, consultas) de cada combinação de filtros das rotas.
+    """
+    periodo = p["periodo"]
+    return [
+        ("overview", _consultas_dashboard_overview(**periodo)),
+        ("overview loja", _consultas_dashboard_overview(**periodo, store_id=p["loja"])),
+        ("overview canal", _consultas_dashboard_overview(**periodo, channel_id=p["canal"])),
+        ("sales", _consultas_dashboard_sales(**periodo, total_exato=True)),
+        ("sales loja", _consultas_dashboard_sales(**periodo, store_id=p["loja"])),
+        ("sales dia/hora", _consultas_dashboard_sales(**periodo, weekday=5, start_hour=18, end_hour=22)),
+        ("sales cursor", _consultas_dashboard_sales(**periodo, cursor=p["cursor"])),
+        ("sales página 50", _consultas_dashboard_sales(**periodo, page=50)),
+        ("produtos", _consultas_produtos(1, 20, p["categoria"])),
+        ("produtos analítico", _consultas_produtos_analitico(**periodo)),
+        ("produtos analítico categoria", _consultas_produtos_analitico(**periodo, category_id=p["categoria"])),
+        ("produtos analítico hora", _consultas_produtos_analitico(**periodo, start_hour=11, end_hour=14)),
+        ("unidades", _consultas_unidades_overview(1, 20, **periodo)),
+        ("unidades canal", _consultas_unidades_overview(1, 20, **periodo, channel_id=p["canal"])),
+    ]
+
+
+def _nos(plano):
+    yield plano
+    for filho in plano.get("Plans", []):
+        yield from _nos(filho)
+
+
+def explica(cursor, consulta):
+    """
+    Executa a consulta sob EXPLAIN (ANALYZE, BUFFERS) e retorna o plano
+    (dicionário do FORMAT JSON).
+    """
+    cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + consulta.sql, consulta.params or None)
+    resultado = cursor.fetchone()[0]
+    if isinstance(resultado, str):
+        resultado = json.loads(resultado)
+    return resultado[0]
+
+
+def varreduras_sequenciais(plano, tamanhos):
+    """
+    Nós Seq Scan sobre tabelas (ou partições) com pelo menos LINHAS_MINIMAS
+    linhas: (relação, linhas lidas, linhas descartadas pelo filtro, filtro).
+    """
+    varreduras = []
+    for no in _nos(plano["Plan"]):
+        if no["Node Type"] != "Seq Scan" or tamanhos.get(no["Relation Name"], 0) < LINHAS_MINIMAS:
+            continue
+        loops = no.get("Actual Loops", 1)
+        descartadas = no.get("Rows Removed by Filter", 0) * loops
+        lidas = no.get("Actual Rows", 0) * loops + descartadas
+        varreduras.append((no["Relation Name"], int(lidas), int(descartadas), no.get("Filter")))
+    return varreduras
+
+
+def _catalogo_tabelas(conn):
+    """
+    Linhas estimadas de cada tabela, tabela-pai de cada partição, colunas e
+    primeira chave de cada índice.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname, GREATEST(c.reltuples, 0)::bigint, pai.relname
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace AND n.nspname = 'public'
+            LEFT JOIN pg_inherits i ON i.inhrelid = c.oid
+            LEFT JOIN pg_class pai ON pai.oid = i.inhparent
+            WHERE c.relkind IN ('r', 'p')
+        """)
+        linhas = cursor.fetchall()
+        cursor.execute("""
+            SELECT table_name, column_name FROM information_schema.columns
+            WHERE table_schema = 'public'
+        """)
+        colunas = {}
+        for tabela, coluna in cursor.fetchall():
+            colunas.setdefault(tabela, []).append(coluna)
+        cursor.execute("""
+            SELECT t.relname, pg_get_indexdef(i.indexrelid, 1, true)
+            FROM pg_index i
+            JOIN pg_class t ON t.oid = i.indrelid
+            JOIN pg_namespace n ON n.oid = t.relnamespace AND n.nspname = 'public'
+        """)
+        chaves = {}
+        for tabela, chave in cursor.fetchall():
+            chaves.setdefault(tabela, set()).add(chave)
+    tamanhos = {tabela: tuplas for tabela, tuplas, _ in linhas}
+    pais = {tabela: pai for tabela, _, pai in linhas if pai}
+    return tamanhos, pais, colunas, chaves
+
+
+def sugestao(relacao, lidas, descartadas, filtro, pais, colunas, chaves):
+    """
+    Diagnóstico de uma varredura sequencial. Sem filtro, ou com um filtro
+    que mantém a maior parte das linhas (ex.: um período que cobre a
+    partição inteira), a varredura é o plano certo. Caso contrário, sugere
+    um índice nas colunas da tabela citadas no filtro, se nenhum índice
+    começar por alguma delas.
+    Retorna (texto, falta_indice).
+    """
+    if not filtro:
+        return "esperada: sem filtro", False
+    if descartadas < lidas * FRACAO_SELETIVA:
+        return f"esperada: o filtro mantém {1 - descartadas / max(lidas, 1):.0%} das linhas", False
+    tabela = pais.get(relacao, relacao)
+    citadas = [c for c in colunas.get(tabela, []) if re.search(rf"\b{c}\b", filtro)]
+    existentes = chaves.get(relacao, set()) | chaves.get(tabela, set())
+    # Prefere um índice na coluna em si a um de expressão sobre ela
+    for chave in sorted(existentes, key=lambda chave: chave not in citadas):
+        if any(re.search(rf"\b{c}\b", chave) for c in citadas):
+            return f"índice em {chave} existe, mas não foi usado", False
+    if not citadas:
+        return None, False
+    return f"CREATE INDEX ON {tabela} ({', '.join(citadas)})", True
+
+
+def fks_sem_indice(conn, tamanhos):
+    """
+    Chaves estrangeiras cuja primeira coluna não inicia nenhum índice, em
+    tabelas grandes: junções por elas e o ON DELETE CASCADE varrem a tabela.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.conrelid::regclass::text, a.attname, c.confrelid::regclass::text
+            FROM pg_constraint c
+            JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+            WHERE c.contype = 'f' AND c.conparentid = 0
+              AND NOT EXISTS (
+                  SELECT 1 FROM pg_index i
+                  WHERE i.indrelid = c.conrelid AND i.indkey[0] = c.conkey[1]
+              )
+            ORDER BY 1, 2
+        """)
+        return [fk for fk in cursor.fetchall() if tamanhos.get(fk[0], 0) >= LINHAS_MINIMAS]
+
+
+def relatorio(conn, planos=False):
+    """
+    Roda o catálogo e imprime tempo, buffers (lidos do cache/disco) e as
+    varreduras sequenciais de cada consulta, seguidos das FKs sem índice.
+    Retorna o número de varreduras sequenciais sem índice utilizável.
+    """
+    tamanhos, pais, colunas, chaves = _catalogo_tabelas(conn)
+    faltando = 0
+    sugestoes = set()
+    with conn.cursor() as cursor:
+        for nome, consultas in catalogo(_parametros(conn)):
+            for consulta in consultas:
+                plano = explica(cursor, consulta)
+                raiz = plano["Plan"]
+                print(f"{nome + ' / ' + consulta.nome:<44} {plano['Execution Time']:>9.1f} ms  "
+                      f"buffers {raiz.get('Shared Hit Blocks', 0):>8} cache {raiz.get('Shared Read Blocks', 0):>7} disco")
+                for relacao, lidas, descartadas, filtro in varreduras_sequenciais(plano, tamanhos):
+                    texto, falta_indice = sugestao(relacao, lidas, descartadas, filtro, pais, colunas, chaves)
+                    print(f"    Seq Scan {relacao} ({lidas:,} linhas lidas)"
+                          + (f"  filtro: {filtro}" if filtro else ""))
+                    if texto:
+                        print(f"      → {texto}")
+                    if falta_indice:
+                        faltando += 1
+                        sugestoes.add(texto)
+                if planos:
+                    print(json.dumps(raiz, indent=2, ensure_ascii=False))
+            # EXPLAIN ANALYZE executa a consulta; nada a gravar
+            conn.rollback()
+
+    fks = fks_sem_indice(conn, tamanhos)
+    if fks:
+        print("\nFKs sem índice (tabelas com mais de {:,} linhas):".format(LINHAS_MINIMAS))
+        for tabela, coluna, referencia in fks:
+            print(f"    {tabela}.{coluna} → {referencia}")
+    if sugestoes:
+        print("\nÍndices sugeridos:")
+        for texto in sorted(sugestoes):
+            print(f"    {texto};")
+    return faltando
+
+
+def correlacao_created_at(conn):
+    """
+    Correlação (-1 a 1) entre created_at e a ordem física das linhas de
+    `sales` (ou de suas partições), segundo o último ANALYZE.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT AVG(correlation) FROM pg_stats
+            WHERE attname = 'created_at' AND NOT inherited
+              AND (tablename = 'sales' OR tablename ~ '^sales_p[0-9]{4}_[0-9]{2}$')
+        """)
+        return cursor.fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Consultor de índices dos dashboards')
+    parser.add_argument('--planos', action='store_true', help='Imprime o plano (JSON) de cada consulta')
+    parser.add_argument('--brin', action='store_true',
+                        help='Cria o índice BRIN em sales(created_at) (tabelas só de inserção)')
+    parser.add_argument('--remover-brin', action='store_true', help='Remove o índice BRIN')
+    args = parser.parse_args()
+
+    with obter_conexao() as conn:
+        if args.brin or args.remover_brin:
+            with conn.cursor() as cursor:
+                cursor.execute(REMOVE_BRIN_SQL if args.remover_brin else BRIN_SQL)
+            conn.commit()
+            correlacao = correlacao_created_at(conn)
+            print(f"✓ Índice BRIN {'removido' if args.remover_brin else 'criado'}"
+                  + (f" (correlação de created_at: {correlacao:.2f})" if correlacao is not None else ""))
+            return
+
+        detecta_particoes()
+        detecta_rollups()
+        faltando = relatorio(conn, args.planos)
+        print(f"\n{'✓ Nenhuma varredura sequencial sem índice' if not faltando else f'⚠️  {faltando} varredura(s) sequencial(is) sem índice'}")
+
+
+if __name__ == '__main__':
+    main()
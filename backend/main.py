@@ -1,33 +1,146 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from cache import limpa_cache
+from colunar import (
+    COLUNAR, COLUNAR_INTERVALO, atualiza_colunar_pool, desativa_colunar, disponivel as colunar_disponivel,
+    estatisticas_colunar, recarrega_colunar,
+)
+from compressao import COMPRESSAO, CompressaoMiddleware
+from connection import fecha_pool
+from connection_async import inicia_pool_async, fecha_pool_async
+from metricas import METRICAS, MetricasMiddleware
+from particoes import RETENCAO_INTERVALO, detecta_particoes_async, le_retencao_async, marca_retencao, versao_retencao
+from respostas import RespostaJSON
+from rollups import ROLLUPS_INTERVALO, atualiza_rollups_pool, detecta_rollups_async
 from routes.dashboard_routes import router as dashboard_router
 from routes.sales_routes import router as sales_router
 from routes.filtros_routes import router as filtros_router
 from routes.produtos_routes import router as produtos_router
 from routes.unidades_routes import router as unidades_router
+from routes.admin_routes import router as admin_router
+from routes.metricas_routes import router as metricas_router
+
+
+async def _atualiza_rollups_periodicamente():
+    # Mantém pequena a parte não agregada que as consultas leem das tabelas
+    # brutas (rollups_intervalo > 0); usa o pool síncrono em uma thread
+    while True:
+        await asyncio.sleep(ROLLUPS_INTERVALO)
+        try:
+            await asyncio.to_thread(atualiza_rollups_pool)
+        except Exception as e:
+            print(f"⚠️  Falha ao atualizar rollups: {e}")
+
+
+async def _atualiza_colunar_periodicamente():
+    # Acrescenta as vendas novas ao motor colunar (colunar=1)
+    while True:
+        await asyncio.sleep(COLUNAR_INTERVALO)
+        try:
+            await asyncio.to_thread(atualiza_colunar_pool)
+        except Exception as e:
+            print(f"⚠️  Falha ao atualizar o motor colunar: {e}")
+
+
+async def _verifica_retencao_periodicamente():
+    # Meses descartados (particoes.py --descartar-antes) continuariam no
+    # motor colunar e no cache de respostas. A nova retenção só entra no
+    # ETag depois dos dois, para que um corpo antigo não receba o ETag novo
+    while True:
+        await asyncio.sleep(RETENCAO_INTERVALO)
+        try:
+            atual = await le_retencao_async()
+        except Exception as e:
+            print(f"⚠️  Falha ao verificar a retenção: {e}")
+            continue
+        if atual == versao_retencao():
+            continue
+        if colunar_disponivel():
+            try:
+                await asyncio.to_thread(recarrega_colunar)
+            except Exception as e:
+                desativa_colunar()
+                print(f"⚠️  Motor colunar desativado: a recarga após a retenção falhou ({e})")
+        await limpa_cache()
+        marca_retencao(atual)
+        print(f"✓ Retenção de {atual} aplicada: cache esvaziado"
+              + (" e motor colunar recarregado" if colunar_disponivel() else ""))
+
+
+async def _carrega_colunar():
+    # Sem a carga, os dashboards seguem consultando o banco
+    try:
+        await asyncio.to_thread(atualiza_colunar_pool)
+    except Exception as e:
+        print(f"⚠️  Motor colunar desativado: {e}")
+        return False
+    for tabela, info in estatisticas_colunar()["tabelas"].items():
+        print(f"✓ Motor colunar: {tabela} {info['linhas']:,} linhas, {info['mb']} MB "
+              f"({info['mb_por_milhao']} MB por milhão)")
+    return True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Abre o pool assíncrono no startup e fecha os pools no shutdown
+    # (o pool síncrono é criado sob demanda por scripts e jobs)
+    await inicia_pool_async()
+    jobs = []
+    if await detecta_particoes_async():
+        marca_retencao(await le_retencao_async())
+        if RETENCAO_INTERVALO > 0:
+            jobs.append(asyncio.create_task(_verifica_retencao_periodicamente()))
+    if await detecta_rollups_async() and ROLLUPS_INTERVALO > 0:
+        jobs.append(asyncio.create_task(_atualiza_rollups_periodicamente()))
+    if COLUNAR and await _carrega_colunar() and COLUNAR_INTERVALO > 0:
+        jobs.append(asyncio.create_task(_atualiza_colunar_periodicamente()))
+    yield
+    for job in jobs:
+        job.cancel()
+        with suppress(asyncio.CancelledError):
+            await job
+    await fecha_pool_async()
+    fecha_pool()
 
 
 app = FastAPI(
     title="Restaurant Analytics API",
     description="Backend para dashboards de performance de restaurantes",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=RespostaJSON
 )
 
-# Habilitar CORS (para permitir o frontend acessar a API)
+# Habilitar CORS (para permitir o frontend acessar a API). Sem cookies:
+# as rotas /admin usam o token no cabeçalho Authorization
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
+    allow_origins=os.getenv('cors_origens', '*').split(','),
+    allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag"],
 )
 
+# Compressão gzip/brotli acima de `compressao_minimo` bytes
+if COMPRESSAO:
+    app.add_middleware(CompressaoMiddleware)
+
+# Latência por rota para o /metrics (por fora, inclui a compressão)
+if METRICAS:
+    app.add_middleware(MetricasMiddleware)
+
 # Registrar as rotas
 app.include_router(dashboard_router)
 app.include_router(sales_router)
 app.include_router(filtros_router)
 app.include_router(produtos_router)
 app.include_router(unidades_router)
+app.include_router(admin_router)
+app.include_router(metricas_router)
 
 @app.get("/")
 def root():
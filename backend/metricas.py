@@ -0,0 +1,191 @@
+"""
+Métricas no formato de texto do Prometheus, expostas em `GET /metrics`.
+
+- `godlevel_http_requisicao_segundos`: latência por rota (template), método e status;
+- `godlevel_consulta_segundos` / `godlevel_consulta_linhas`: duração e linhas
+  retornadas de cada consulta dos serviços, por rota e seção (`Consulta.nome`);
+- `godlevel_conexao_aquisicao_segundos`: espera por uma conexão, por pool;
+- contadores do cache de respostas, da coalescência e dos pools, lidos no
+  momento da coleta.
+
+Os histogramas ficam na memória do processo; com vários workers, cada um
+expõe os seus e o Prometheus agrega.
+"""
+
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+METRICAS = os.getenv('metricas', '1') != '0'
+
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_LINHAS = (1, 10, 100, 1000, 10000, 100000)
+
+_LE_INF = 'le="+Inf"'
+
+# Escopo ASGI da requisição atual, para rotular as consultas com a rota
+_escopo_atual = ContextVar("escopo_atual", default=None)
+
+
+def _escapa(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(nomes, valores, extra=""):
+    pares = [f'{nome}="{_escapa(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Histograma:
+    def __init__(self, nome, ajuda, rotulos, buckets=BUCKETS_SEGUNDOS):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observa(self, valor, *rotulos):
+        with self._lock:
+            serie = self._series.get(rotulos)
+            if serie is None:
+                # Contagens por bucket (não cumulativas), soma e total
+                serie = self._series[rotulos] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+                    break
+            serie[1] += valor
+            serie[2] += 1
+
+    def exposicao(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        with self._lock:
+            series = [(rotulos, list(contagens), soma, total)
+                      for rotulos, (contagens, soma, total) in sorted(self._series.items())]
+        for rotulos, contagens, soma, total in series:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, contagens):
+                acumulado += contagem
+                le = f'le="{_numero(limite)}"'
+                linhas.append(f"{self.nome}_bucket{_rotulos(self.rotulos, rotulos, le)} {acumulado}")
+            linhas.append(f"{self.nome}_bucket{_rotulos(self.rotulos, rotulos, _LE_INF)} {total}")
+            linhas.append(f"{self.nome}_sum{_rotulos(self.rotulos, rotulos)} {soma!r}")
+            linhas.append(f"{self.nome}_count{_rotulos(self.rotulos, rotulos)} {total}")
+        return linhas
+
+
+requisicoes = Histograma(
+    "godlevel_http_requisicao_segundos", "Latência das requisições HTTP", ("rota", "metodo", "status"))
+consultas = Histograma(
+    "godlevel_consulta_segundos", "Duração das consultas dos serviços (execução e leitura)", ("rota", "secao"))
+linhas_consultas = Histograma(
+    "godlevel_consulta_linhas", "Linhas retornadas pelas consultas dos serviços", ("rota", "secao"), BUCKETS_LINHAS)
+aquisicoes = Histograma(
+    "godlevel_conexao_aquisicao_segundos", "Espera por uma conexão do pool", ("pool",))
+
+
+def _rota(escopo):
+    """
+    Template da rota (ex.: /dashboard/sales), para não criar uma série por
+    URL. O roteador grava a rota no escopo antes de chamar o endpoint;
+    requisições sem rota correspondente ficam em "desconhecida".
+    """
+    return getattr(escopo.get("route"), "path", None) or "desconhecida"
+
+
+def rota_atual():
+    escopo = _escopo_atual.get()
+    return _rota(escopo) if escopo is not None else "fora_de_requisicao"
+
+
+def observa_consulta(secao, segundos, linhas):
+    if METRICAS:
+        rota = rota_atual()
+        consultas.observa(segundos, rota, secao)
+        linhas_consultas.observa(linhas, rota, secao)
+
+
+def observa_aquisicao(pool, segundos):
+    if METRICAS:
+        aquisicoes.observa(segundos, pool)
+
+
+class MetricasMiddleware:
+    """
+    Mede a latência de cada requisição HTTP (até o fim do corpo) e expõe o
+    escopo às consultas executadas durante ela.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def envia(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        token = _escopo_atual.set(scope)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, envia)
+        finally:
+            _escopo_atual.reset(token)
+            requisicoes.observa(time.perf_counter() - inicio, _rota(scope), scope["method"], status)
+
+
+def _metrica(nome, tipo, ajuda, valores):
+    linhas = [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}"]
+    for rotulos, valor in valores:
+        linhas.append(f"{nome}{_rotulos(rotulos.keys(), rotulos.values())} {_numero(valor)}")
+    return linhas
+
+
+def exposicao():
+    """
+    Texto do endpoint /metrics (formato de exposição 0.0.4 do Prometheus).
+    """
+    from cache import estatisticas_cache
+    from coalescencia import estatisticas_coalescencia
+    from connection import estatisticas_pool
+    from connection_async import estatisticas_pool_async
+
+    linhas = []
+    for histograma in (requisicoes, consultas, linhas_consultas, aquisicoes):
+        linhas += histograma.exposicao()
+
+    cache = estatisticas_cache()
+    linhas += _metrica("godlevel_cache_consultas_total", "counter", "Consultas ao cache de respostas",
+                       [({"resultado": chave}, cache[chave]) for chave in ("hits", "misses", "erros")])
+    linhas += _metrica("godlevel_cache_taxa_hit", "gauge", "Fração de hits do cache de respostas",
+                       [({}, cache["taxa_hit"])])
+
+    coalescencia = estatisticas_coalescencia()
+    linhas += _metrica("godlevel_coalescencia_total", "counter", "Execuções e requisições coalescidas",
+                       [({"tipo": chave}, coalescencia[chave]) for chave in ("execucoes", "coalescidas")])
+
+    pools = {"sync": estatisticas_pool(), "async": estatisticas_pool_async()}
+    for chave, tipo, ajuda in (
+        ("em_uso", "gauge", "Conexões emprestadas"),
+        ("aguardando", "gauge", "Requisições esperando uma conexão"),
+        ("timeouts", "counter", "Aquisições que estouraram o pool_timeout"),
+    ):
+        sufixo = "_total" if tipo == "counter" else ""
+        linhas += _metrica(f"godlevel_pool_{chave}{sufixo}", tipo, ajuda,
+                           [({"pool": pool}, stats[chave]) for pool, stats in pools.items() if stats])
+    return "\n".join(linhas) + "\n"
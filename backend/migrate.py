@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Aplica as migrations de backend/migrations em ordem de nome, registrando
+as já aplicadas na tabela schema_migrations.
+
+Uso (a partir de backend/):
+    python migrate.py            # aplica as pendentes
+    python migrate.py --status   # lista aplicadas/pendentes
+"""
+
+import argparse
+from pathlib import Path
+from connection import obter_conexao
+
+PASTA_MIGRATIONS = Path(__file__).resolve().parent / "migrations"
+
+
+def _migrations():
+    return sorted(PASTA_MIGRATIONS.glob("*.sql"))
+
+
+def _aplicadas(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            versao VARCHAR(200) PRIMARY KEY,
+            aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT versao FROM schema_migrations")
+    return {r[0] for r in cursor.fetchall()}
+
+
+def aplica_migrations(conn):
+    """
+    Aplica cada migration pendente na sua própria transação.
+    Retorna a lista de versões aplicadas.
+    """
+    aplicadas = []
+    with conn.cursor() as cursor:
+        ja_aplicadas = _aplicadas(cursor)
+        conn.commit()
+        for arquivo in _migrations():
+            if arquivo.name in ja_aplicadas:
+                continue
+            print(f"Aplicando {arquivo.name}...")
+            cursor.execute(arquivo.read_text(encoding="utf-8"))
+            cursor.execute("INSERT INTO schema_migrations (versao) VALUES (%s)", (arquivo.name,))
+            conn.commit()
+            aplicadas.append(arquivo.name)
+    return aplicadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aplica as migrations do backend')
+    parser.add_argument('--status', action='store_true', help='Apenas lista o estado das migrations')
+    args = parser.parse_args()
+
+    with obter_conexao() as conn:
+        if args.status:
+            with conn.cursor() as cursor:
+                ja_aplicadas = _aplicadas(cursor)
+            conn.commit()
+            for arquivo in _migrations():
+                estado = "aplicada" if arquivo.name in ja_aplicadas else "pendente"
+                print(f"  {arquivo.name}: {estado}")
+            return
+
+        aplicadas = aplica_migrations(conn)
+        print(f"✓ {len(aplicadas)} migration(s) aplicada(s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+-- Tabelas de rollup (pré-agregações) usadas pelos dashboards.
+-- Atualizadas incrementalmente por rollups.py a partir do último id processado.
+
+CREATE TABLE IF NOT EXISTS rollup_vendas_hora (
+    hora TIMESTAMP NOT NULL,             -- DATE_TRUNC('hour', sales.created_at)
+    store_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    sale_status_desc VARCHAR(100) NOT NULL,
+    pedidos INTEGER NOT NULL,
+    faturamento DECIMAL(14,2) NOT NULL,
+    PRIMARY KEY (hora, store_id, channel_id, sale_status_desc)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_itens_dia (
+    dia DATE NOT NULL,                   -- DATE(sales.created_at)
+    product_id INTEGER NOT NULL,
+    store_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    quantidade FLOAT NOT NULL,           -- SUM(quantity)
+    faturamento FLOAT NOT NULL,          -- SUM(total_price)
+    custo FLOAT NOT NULL,                -- SUM(quantity * base_price * 0.6)
+    margem_total FLOAT NOT NULL,         -- SUM(total_price - quantity * base_price * 0.6)
+    soma_margem_percentual FLOAT NOT NULL,  -- soma da margem % por linha (para a média)
+    linhas_margem INTEGER NOT NULL,         -- linhas com total_price <> 0
+    PRIMARY KEY (dia, product_id, store_id, channel_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_itens_dia_product ON rollup_itens_dia(product_id);
+
+-- Último id de origem já agregado em cada rollup
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    tabela VARCHAR(100) PRIMARY KEY,
+    ultimo_id BIGINT NOT NULL DEFAULT 0,
+    atualizado_em TIMESTAMP
+);
+
+INSERT INTO rollup_watermarks (tabela, ultimo_id) VALUES
+    ('sales', 0),
+    ('product_sales', 0)
+ON CONFLICT (tabela) DO NOTHING;
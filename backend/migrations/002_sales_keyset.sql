@@ -0,0 +1,3 @@
+-- Ordenação e paginação por cursor da lista de pedidos:
+-- ORDER BY created_at DESC, id DESC / WHERE (created_at, id) < (...)
+CREATE INDEX IF NOT EXISTS idx_sales_created_at_id ON sales(created_at, id);
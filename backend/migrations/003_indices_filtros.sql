@@ -0,0 +1,16 @@
+-- Índices para os filtros dos dashboards (filtros_sql.py).
+-- Os predicados de dia da semana e hora usam exatamente estas expressões,
+-- então o planejador pode usar os índices de expressão. Ele só os usa quando
+-- o filtro é seletivo (ex.: dia da semana e hora juntos); sozinhos, canal,
+-- dia e hora mantêm muitas vendas e o Seq Scan sai mais barato (planos.py).
+
+CREATE INDEX IF NOT EXISTS idx_sales_store_created_at ON sales(store_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_sales_channel_created_at ON sales(channel_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_sales_dow_created_at ON sales((EXTRACT(DOW FROM created_at)), created_at);
+CREATE INDEX IF NOT EXISTS idx_sales_hora_created_at ON sales((EXTRACT(HOUR FROM created_at)), created_at);
+
+-- Junção de product_sales com o conjunto de vendas já filtrado
+CREATE INDEX IF NOT EXISTS idx_product_sales_sale_id ON product_sales(sale_id);
+
+ANALYZE sales;
+ANALYZE product_sales;
@@ -0,0 +1,154 @@
+-- Particionamento mensal de `sales` por created_at.
+-- `product_sales` e `item_product_sales` são co-particionadas por
+-- `sale_created_at`, cópia do created_at da venda, então os filtros de data
+-- podam as partições das três tabelas.
+--
+-- Bancos já populados são convertidos: as tabelas originais são renomeadas,
+-- os dados copiados para as novas tabelas particionadas (mesmos ids,
+-- sequences e índices) e as originais removidas.
+--
+-- Em uma tabela particionada, a chave primária precisa incluir a coluna de
+-- partição, então `sales.id` deixa de ser referenciável sozinho: as FKs de
+-- delivery_sales, delivery_addresses, payments e coupon_sales para `sales` (e
+-- de item_item_product_sales para `item_product_sales`) são removidas. As
+-- de product_sales e item_product_sales passam a ser compostas.
+
+-- Cria as partições mensais de `inicio` até `fim` (inclusive) que ainda não
+-- existem. Usada pela migration, pelo gerador e por particoes.py.
+CREATE OR REPLACE FUNCTION cria_particoes_vendas(inicio date, fim date) RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    mes date := date_trunc('month', inicio);
+    tabela text;
+    particao text;
+    criadas integer := 0;
+BEGIN
+    WHILE mes <= fim LOOP
+        FOREACH tabela IN ARRAY ARRAY['sales', 'product_sales', 'item_product_sales'] LOOP
+            particao := format('%s_p%s', tabela, to_char(mes, 'YYYY_MM'));
+            IF to_regclass(particao) IS NULL THEN
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                    particao, tabela, mes, (mes + interval '1 month')::date
+                );
+                criadas := criadas + 1;
+            END IF;
+        END LOOP;
+        mes := mes + interval '1 month';
+    END LOOP;
+    RETURN criadas;
+END $$;
+
+DO $$
+DECLARE
+    inicio date;
+    fim date;
+    tabela text;
+    fk record;
+    indices text[] := ARRAY[]::text[];
+    indice text;
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'sales'::regclass) THEN
+        RETURN;
+    END IF;
+
+    SELECT date_trunc('month', COALESCE(MIN(created_at), now()))::date,
+           (GREATEST(MAX(created_at), now()) + interval '3 months')::date
+    INTO inicio, fim
+    FROM sales;
+
+    -- FKs que apontam para as tabelas convertidas
+    FOR fk IN
+        SELECT conrelid::regclass AS tabela, conname
+        FROM pg_constraint
+        WHERE contype = 'f'
+          AND confrelid IN ('sales'::regclass, 'product_sales'::regclass, 'item_product_sales'::regclass)
+    LOOP
+        EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', fk.tabela, fk.conname);
+    END LOOP;
+
+    FOREACH tabela IN ARRAY ARRAY['sales', 'product_sales', 'item_product_sales'] LOOP
+        -- Índices secundários (definição lida antes de renomear), recriados nas tabelas novas
+        SELECT indices || COALESCE(array_agg(indexdef), ARRAY[]::text[]) INTO indices
+        FROM pg_indexes
+        WHERE schemaname = 'public' AND tablename = tabela
+          AND indexname <> tabela || '_pkey';
+
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', tabela, tabela || '_antiga');
+        EXECUTE format('ALTER TABLE %I RENAME CONSTRAINT %I TO %I',
+                       tabela || '_antiga', tabela || '_pkey', tabela || '_antiga_pkey');
+        EXECUTE format('ALTER SEQUENCE %I OWNED BY NONE', tabela || '_id_seq');
+    END LOOP;
+
+    CREATE TABLE sales (
+        LIKE sales_antiga INCLUDING DEFAULTS,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+
+    CREATE TABLE product_sales (
+        LIKE product_sales_antiga INCLUDING DEFAULTS,
+        sale_created_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (id, sale_created_at)
+    ) PARTITION BY RANGE (sale_created_at);
+
+    CREATE TABLE item_product_sales (
+        LIKE item_product_sales_antiga INCLUDING DEFAULTS,
+        sale_created_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (id, sale_created_at)
+    ) PARTITION BY RANGE (sale_created_at);
+
+    -- Recebe linhas fora das partições mensais existentes, para que uma
+    -- inserção nunca falhe; deve ficar vazia (veja particoes.py)
+    CREATE TABLE sales_padrao PARTITION OF sales DEFAULT;
+    CREATE TABLE product_sales_padrao PARTITION OF product_sales DEFAULT;
+    CREATE TABLE item_product_sales_padrao PARTITION OF item_product_sales DEFAULT;
+
+    PERFORM cria_particoes_vendas(inicio, fim);
+
+    INSERT INTO sales SELECT * FROM sales_antiga;
+    INSERT INTO product_sales
+    SELECT ps.*, s.created_at
+    FROM product_sales_antiga ps
+    JOIN sales_antiga s ON s.id = ps.sale_id;
+    INSERT INTO item_product_sales
+    SELECT ips.*, s.created_at
+    FROM item_product_sales_antiga ips
+    JOIN product_sales_antiga ps ON ps.id = ips.product_sale_id
+    JOIN sales_antiga s ON s.id = ps.sale_id;
+
+    ALTER SEQUENCE sales_id_seq OWNED BY sales.id;
+    ALTER SEQUENCE product_sales_id_seq OWNED BY product_sales.id;
+    ALTER SEQUENCE item_product_sales_id_seq OWNED BY item_product_sales.id;
+
+    DROP TABLE item_product_sales_antiga, product_sales_antiga, sales_antiga;
+
+    FOREACH indice IN ARRAY indices LOOP
+        EXECUTE indice;
+    END LOOP;
+
+    ALTER TABLE sales
+        ADD FOREIGN KEY (store_id) REFERENCES stores(id),
+        ADD FOREIGN KEY (sub_brand_id) REFERENCES sub_brands(id),
+        ADD FOREIGN KEY (customer_id) REFERENCES customers(id),
+        ADD FOREIGN KEY (channel_id) REFERENCES channels(id);
+    ALTER TABLE product_sales
+        ADD FOREIGN KEY (sale_id, sale_created_at) REFERENCES sales(id, created_at) ON DELETE CASCADE,
+        ADD FOREIGN KEY (product_id) REFERENCES products(id);
+    ALTER TABLE item_product_sales
+        ADD FOREIGN KEY (product_sale_id, sale_created_at)
+            REFERENCES product_sales(id, sale_created_at) ON DELETE CASCADE,
+        ADD FOREIGN KEY (item_id) REFERENCES items(id),
+        ADD FOREIGN KEY (option_group_id) REFERENCES option_groups(id);
+END $$;
+
+-- Usados pelos filtros/junções dos serviços e pelo ON DELETE CASCADE
+CREATE INDEX IF NOT EXISTS idx_sales_created_at_id ON sales(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_product_sales_sale_id ON product_sales(sale_id);
+CREATE INDEX IF NOT EXISTS idx_item_product_sales_product_sale_id ON item_product_sales(product_sale_id);
+-- Descarte de meses (particoes.py): o DELETE em delivery_sales verifica o
+-- ON DELETE CASCADE de delivery_addresses linha a linha
+CREATE INDEX IF NOT EXISTS idx_delivery_addresses_delivery_sale_id ON delivery_addresses(delivery_sale_id);
+
+ANALYZE sales;
+ANALYZE product_sales;
+ANALYZE item_product_sales;
@@ -0,0 +1,33 @@
+-- Índices para os caminhos de filtro e junção dos serviços que ainda não
+-- tinham índice nas migrations anteriores. Os de `sales` por data, loja,
+-- canal, dia da semana e hora estão na 002/003, e os de junção de
+-- product_sales/item_product_sales na 003/004.
+--
+-- O índice BRIN em sales(created_at), alternativa para bancos só de
+-- inserção, é opcional: `python indices.py --brin` (veja indices.py).
+
+-- /produtos e /produtos/analitico filtram por categoria
+CREATE INDEX IF NOT EXISTS idx_products_category_id ON products(category_id);
+
+-- Filtros de loja e canal sobre os rollups (a chave primária começa
+-- pela data e não atende a esses filtros sozinhos)
+CREATE INDEX IF NOT EXISTS idx_rollup_vendas_hora_store ON rollup_vendas_hora(store_id, hora);
+CREATE INDEX IF NOT EXISTS idx_rollup_vendas_hora_channel ON rollup_vendas_hora(channel_id, hora);
+CREATE INDEX IF NOT EXISTS idx_rollup_itens_dia_store ON rollup_itens_dia(store_id, dia);
+CREATE INDEX IF NOT EXISTS idx_rollup_itens_dia_channel ON rollup_itens_dia(channel_id, dia);
+
+-- Ranking de produtos pelas tabelas brutas (antes criado só pelo gerador)
+CREATE INDEX IF NOT EXISTS idx_product_sales_product_sale ON product_sales(product_id, sale_id);
+
+-- Filhas de `sales`: junção pelo id da venda e descarte de meses
+-- (particoes.py apaga essas linhas pelo id das vendas do mês)
+CREATE INDEX IF NOT EXISTS idx_payments_sale_id ON payments(sale_id);
+CREATE INDEX IF NOT EXISTS idx_delivery_sales_sale_id ON delivery_sales(sale_id);
+CREATE INDEX IF NOT EXISTS idx_delivery_addresses_sale_id ON delivery_addresses(sale_id);
+CREATE INDEX IF NOT EXISTS idx_coupon_sales_sale_id ON coupon_sales(sale_id);
+CREATE INDEX IF NOT EXISTS idx_item_item_product_sales_item_product_sale_id
+    ON item_item_product_sales(item_product_sale_id);
+
+ANALYZE products;
+ANALYZE rollup_vendas_hora;
+ANALYZE rollup_itens_dia;
@@ -0,0 +1,10 @@
+-- Ponto seguro dos watermarks dos rollups.
+-- Ids são reservados com nextval e podem ser confirmados fora de ordem, então
+-- o watermark só avança até um ponto em que nenhuma transação ainda aberta
+-- possa confirmar um id menor: `ponto_id` é o maior id visível quando o ponto
+-- foi marcado e `ponto_transacoes` as transações (virtualxid de pg_locks)
+-- abertas naquele momento. Quando todas terminam, ids <= ponto_id são finais.
+
+ALTER TABLE rollup_watermarks
+    ADD COLUMN IF NOT EXISTS ponto_id BIGINT,
+    ADD COLUMN IF NOT EXISTS ponto_transacoes TEXT[];
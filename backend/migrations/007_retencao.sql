@@ -0,0 +1,10 @@
+-- Registro da última retenção (particoes.py --descartar-antes).
+-- Descartar meses apaga vendas que a API ainda pode ter no cache de
+-- respostas e no motor colunar: ela lê `descartado_em` periodicamente e,
+-- quando muda, esvazia o cache e recarrega o motor. Uma linha só.
+
+CREATE TABLE IF NOT EXISTS retencao (
+    unica BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (unica),
+    descartado_antes DATE NOT NULL,
+    descartado_em TIMESTAMP NOT NULL
+);
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Partições mensais de `sales`, `product_sales` e `item_product_sales`
+(migration 004). As duas últimas são particionadas por `sale_created_at`,
+cópia do created_at da venda, e os serviços filtram as datas também nessa
+coluna para que o planejador pode as partições (veja `fonte_itens`).
+
+Uso (a partir de backend/):
+    python particoes.py                        # cria as partições dos próximos meses
+    python particoes.py --meses 6              # ... até 6 meses à frente
+    python particoes.py --status               # partições e linhas na partição padrão
+    python particoes.py --descartar-antes 2024-01
+
+A retenção também apaga os meses descartados dos rollups e registra o corte
+na tabela `retencao` (migration 007), na mesma transação. A API em execução
+lê esse registro a cada `retencao_intervalo` segundos e, quando ele muda,
+esvazia o cache de respostas e recarrega o motor colunar.
+"""
+
+import argparse
+import os
+import sys
+from datetime import date
+from connection import obter_conexao
+
+# Meses à frente com partição já criada (cron/gerador)
+PARTICOES_MESES_FUTUROS = int(os.getenv('particoes_meses_futuros', 3))
+# Segundos entre as leituras da tabela `retencao` pela API (0 desativa)
+RETENCAO_INTERVALO = float(os.getenv('retencao_intervalo', 10))
+
+TABELAS = ("sales", "product_sales", "item_product_sales")
+
+# Tabelas filhas de `sales` sem a coluna de partição (FK removida pela
+# migration 004): as linhas são apagadas junto com o mês descartado
+FILHAS_SEM_PARTICAO = (
+    ("payments", "sale_id", "sales"),
+    ("delivery_addresses", "sale_id", "sales"),
+    ("delivery_sales", "sale_id", "sales"),
+    ("coupon_sales", "sale_id", "sales"),
+    ("item_item_product_sales", "item_product_sale_id", "item_product_sales"),
+)
+
+_particionada = False
+# Último `descartado_em` já aplicado pela API ("" sem retenção registrada)
+_retencao = ""
+
+DETECTA_SQL = """
+    SELECT EXISTS (
+        SELECT 1 FROM pg_partitioned_table
+        WHERE partrelid = to_regclass('product_sales')
+    )
+"""
+
+
+def _marca_particionada(resultado):
+    global _particionada
+    _particionada = bool(resultado)
+    return _particionada
+
+
+def detecta_particoes():
+    """
+    Verifica se a migration 004 (particionamento) foi aplicada.
+    """
+    with obter_conexao() as conn, conn.cursor() as cursor:
+        cursor.execute(DETECTA_SQL)
+        return _marca_particionada(cursor.fetchone()[0])
+
+
+async def detecta_particoes_async():
+    from connection_async import obter_conexao_async
+
+    async with obter_conexao_async() as conn:
+        cursor = await conn.execute(DETECTA_SQL)
+        return _marca_particionada((await cursor.fetchone())[0])
+
+
+def particionada():
+    return _particionada
+
+
+def cria_particoes(conn, meses=PARTICOES_MESES_FUTUROS):
+    """
+    Cria as partições do mês atual até `meses` à frente.
+    Retorna quantas partições foram criadas.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT cria_particoes_vendas(CURRENT_DATE, (CURRENT_DATE + make_interval(months => %s))::date)",
+            (meses,)
+        )
+        criadas = cursor.fetchone()[0]
+    conn.commit()
+    return criadas
+
+
+def lista_particoes(conn):
+    """
+    (tabela, partição, limites, linhas estimadas) de cada partição.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT pai.relname, filha.relname,
+                   pg_get_expr(filha.relpartbound, filha.oid),
+                   GREATEST(filha.reltuples, 0)::bigint
+            FROM pg_inherits i
+            JOIN pg_class pai ON pai.oid = i.inhparent
+            JOIN pg_class filha ON filha.oid = i.inhrelid
+            WHERE pai.relname = ANY(%s)
+            ORDER BY pai.relname, filha.relname
+        """, (list(TABELAS),))
+        return cursor.fetchall()
+
+
+def linhas_na_padrao(conn):
+    """
+    Linhas na partição padrão (fora de qualquer mês criado). Devem ser 0:
+    com linhas, a partição do mês correspondente não pode ser criada.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM sales_padrao")
+        return cursor.fetchone()[0]
+
+
+def _descarta(cursor, antes):
+    """
+    Retenção sem commit: partições, filhas, rollups e o registro em
+    `retencao`. Retorna a lista de meses descartados.
+    """
+    cursor.execute("SELECT to_regclass('retencao') IS NOT NULL")
+    if not cursor.fetchone()[0]:
+        raise RuntimeError("Tabela retencao ausente: rode `python migrate.py` (migration 007)")
+    # A partição padrão não é descartada: vendas antigas nela continuariam
+    # nas tabelas brutas, mas não nos rollups
+    cursor.execute("SELECT COUNT(*) FROM sales_padrao WHERE created_at < %s", (antes,))
+    if cursor.fetchone()[0]:
+        raise RuntimeError(f"A partição padrão tem vendas anteriores a {antes}: mova-as antes da retenção")
+
+    descartados = []
+    cursor.execute("""
+            SELECT filha.relname
+            FROM pg_inherits i
+            JOIN pg_class filha ON filha.oid = i.inhrelid
+            WHERE i.inhparent = 'sales'::regclass AND filha.relname ~ '^sales_p[0-9]{4}_[0-9]{2}$'
+            ORDER BY filha.relname
+        """)
+    for (particao,) in cursor.fetchall():
+        mes = particao[len("sales_p"):]
+        if date(int(mes[:4]), int(mes[5:]), 1) >= antes:
+            continue
+        for tabela, coluna, origem in FILHAS_SEM_PARTICAO:
+            cursor.execute(
+                f"DELETE FROM {tabela} t USING {origem}_p{mes} o WHERE t.{coluna} = o.id"
+            )
+        # Das folhas para a raiz, por causa das FKs compostas
+        for tabela in reversed(TABELAS):
+            cursor.execute(f"ALTER TABLE {tabela} DETACH PARTITION {tabela}_p{mes}")
+            cursor.execute(f"DROP TABLE {tabela}_p{mes}")
+        descartados.append(mes)
+    if not descartados:
+        return descartados
+
+    # Sem isso, os dashboards (que leem os rollups) seguiriam somando as
+    # vendas descartadas
+    cursor.execute("SELECT to_regclass('rollup_vendas_hora') IS NOT NULL")
+    if cursor.fetchone()[0]:
+        cursor.execute("DELETE FROM rollup_vendas_hora WHERE hora < %s", (antes,))
+        cursor.execute("DELETE FROM rollup_itens_dia WHERE dia < %s", (antes,))
+    cursor.execute("""
+        INSERT INTO retencao (descartado_antes, descartado_em) VALUES (%s, clock_timestamp())
+        ON CONFLICT (unica) DO UPDATE SET
+            descartado_antes = GREATEST(retencao.descartado_antes, EXCLUDED.descartado_antes),
+            descartado_em = EXCLUDED.descartado_em
+    """, (antes,))
+    return descartados
+
+
+def descarta_particoes(conn, antes):
+    """
+    Retenção: remove os meses anteriores a `antes` (date) com DROP da
+    partição, em vez de DELETE linha a linha. As filhas sem coluna de
+    partição são apagadas pelo id das vendas do mês, e os rollups, pela
+    data. Tudo em uma transação: ou o corte vale para todas as tabelas, ou
+    para nenhuma.
+    Retorna a lista de meses descartados.
+    """
+    try:
+        with conn.cursor() as cursor:
+            descartados = _descarta(cursor, antes)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return descartados
+
+
+def versao_retencao():
+    """
+    Última retenção já aplicada pela API ao cache e ao motor colunar ("" sem
+    retenção), para a versão dos dados do ETag.
+    """
+    return _retencao or ""
+
+
+def marca_retencao(valor):
+    global _retencao
+    _retencao = valor
+
+
+async def le_retencao_async():
+    """
+    Momento da última retenção registrada no banco ("" sem retenção).
+    """
+    from connection_async import obter_conexao_async
+
+    async with obter_conexao_async() as conn:
+        cursor = await conn.execute("SELECT to_regclass('retencao') IS NOT NULL")
+        if not (await cursor.fetchone())[0]:
+            return ""
+        cursor = await conn.execute("SELECT descartado_em::text FROM retencao")
+        linha = await cursor.fetchone()
+        return linha[0] if linha else ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gerencia as partições mensais de vendas')
+    parser.add_argument('--meses', type=int, default=PARTICOES_MESES_FUTUROS,
+                        help='Cria partições até N meses à frente')
+    parser.add_argument('--status', action='store_true', help='Lista as partições')
+    parser.add_argument('--descartar-antes', metavar='AAAA-MM',
+                        help='Remove os meses anteriores a AAAA-MM (retenção)')
+    args = parser.parse_args()
+
+    with obter_conexao() as conn:
+        if not detecta_particoes():
+            print("Tabelas não particionadas: rode `python migrate.py` (migration 004)")
+            return
+
+        if args.status:
+            for tabela, particao, limites, linhas in lista_particoes(conn):
+                print(f"  {particao:<32} {linhas:>12,}  {limites}")
+            print(f"Linhas na partição padrão: {linhas_na_padrao(conn)}")
+            return
+
+        if args.descartar_antes:
+            antes = date.fromisoformat(args.descartar_antes + "-01")
+            try:
+                descartados = descarta_particoes(conn, antes)
+            except RuntimeError as e:
+                sys.exit(f"✗ Retenção cancelada: {e}")
+            print(f"✓ {len(descartados)} mês(es) descartado(s): {', '.join(descartados) or '-'}")
+            if descartados and RETENCAO_INTERVALO > 0:
+                print(f"  A API em execução esvazia o cache e recarrega o motor colunar em até "
+                      f"{RETENCAO_INTERVALO:g}s (retencao_intervalo)")
+            elif descartados:
+                print("⚠️  retencao_intervalo=0: reinicie a API para esvaziar o cache e recarregar o motor colunar")
+
+        criadas = cria_particoes(conn, args.meses)
+        print(f"✓ {criadas} partição(ões) criada(s)")
+
+
+if __name__ == '__main__':
+    main()
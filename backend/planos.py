@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Regressão de planos: gera o SQL de cada serviço para todas as combinações
+de filtros que ele aceita, roda EXPLAIN (sem ANALYZE) e compara os tipos de
+nó e o custo estimado de cada plano com a base gravada em planos_base.json.
+
+Uma edição que transforma um Index Scan em Seq Scan em `sales` aparece
+como nó novo ("Seq Scan sales") e faz o comando terminar com código 1.
+
+Independentemente da base, toda combinação com um filtro seletivo (loja, e
+período quando ele tem menos da metade das vendas) tem de ler `sales` por
+índice: um Seq Scan em `sales` só é aceito nas partições com dias dentro do
+período (as outras foram podadas) e em relações quase vazias. Canal, dia da
+semana, hora e status sozinhos selecionam uma fração grande das vendas, e
+aí o Seq Scan é o plano certo.
+
+A base é separada por ambiente (rollups ou tabelas brutas, particionado ou
+não) e vale para o banco em que foi gerada. Use um banco semeado de forma
+reproduzível, na escala média: na pequena, os 30 dias do período são quase
+todas as vendas e o Seq Scan é o plano certo para quase tudo. `--abencoar`
+recusa esses bancos e planos com filtro seletivo sem índice.
+    python -m benchmarks.carga --semear media
+
+Uso (a partir de backend/):
+    python planos.py                   # compara com a base
+    python planos.py --abencoar        # regrava a base com os planos atuais
+    python planos.py --servico sales   # só um serviço
+    rollups=0 python planos.py         # ambiente de tabelas brutas
+"""
+
+import argparse
+import itertools
+import json
+import re
+import sys
+from datetime import date, datetime
+from pathlib import Path
+from connection import obter_conexao
+from indices import _nos, _parametros
+from particoes import detecta_particoes, particionada
+from rollups import detecta_rollups, disponiveis as rollups_disponiveis
+from services.dashboard_service import _consultas_dashboard_overview
+from services.produtos_service import _consultas_produtos, _consultas_produtos_analitico
+from services.sales_dashboard import _consultas_dashboard_sales
+from services.unidades_service import _consultas_unidades_overview
+
+ARQUIVO_BASE = Path(__file__).resolve().parent / "planos_base.json"
+
+# Aumento do custo estimado aceito antes de acusar regressão (0.5 = 50%)
+TOLERANCIA_CUSTO = 0.5
+
+# Filtros que têm de ser resolvidos por índice (ou poda de partições) em `sales`
+FILTROS_SELETIVOS = ("loja", "periodo")
+# O período só é seletivo se tiver menos que esta fração das vendas (no
+# banco semeado em uma escala pequena, os 30 dias são quase tudo)
+FRACAO_PERIODO_SELETIVO = 0.5
+# Custo estimado abaixo do qual um Seq Scan é de uma relação quase vazia
+# (ex.: partições futuras), em que ler tudo é o plano certo
+CUSTO_RELACAO_VAZIA = 100
+
+# Serviço -> (função que monta as consultas, filtros opcionais, argumentos fixos)
+SERVICOS = {
+    "overview": (_consultas_dashboard_overview, ("periodo", "loja", "canal"), {}),
+    "sales": (_consultas_dashboard_sales, ("periodo", "loja", "canal", "dia", "hora"), {}),
+    "produtos": (_consultas_produtos, ("categoria",), {"page": 1, "limit": 20}),
+    "produtos_analitico": (
+        _consultas_produtos_analitico, ("periodo", "loja", "canal", "categoria", "dia", "hora"), {}),
+    "unidades": (_consultas_unidades_overview, ("periodo", "canal", "status"), {"page": 1, "limit": 20}),
+}
+
+
+def _argumentos(filtro, p):
+    return {
+        "periodo": p["periodo"],
+        "loja": {"store_id": p["loja"]},
+        "canal": {"channel_id": p["canal"]},
+        "categoria": {"category_id": p["categoria"]},
+        "dia": {"weekday": 5},
+        "hora": {"start_hour": 18, "end_hour": 22},
+        "status": {"status": "ativa"},
+    }[filtro]
+
+
+def combinacoes(p, servicos=SERVICOS):
+    """
+    (serviço, combinação, consultas) para cada subconjunto dos filtros
+    opcionais de cada serviço, incluindo nenhum filtro.
+    """
+    for servico in servicos:
+        funcao, filtros, fixos = SERVICOS[servico]
+        for n in range(len(filtros) + 1):
+            for combinacao in itertools.combinations(filtros, n):
+                argumentos = dict(fixos)
+                for filtro in combinacao:
+                    argumentos.update(_argumentos(filtro, p))
+                yield servico, "+".join(combinacao) or "sem filtros", funcao(**argumentos)
+
+
+def _sem_particao(nome):
+    # Partições (sales_p2025_06, sales_padrao) e seus índices contam como os
+    # da tabela-pai: quantas partições entram depende do período, não do plano
+    return re.sub(r"_(p\d{4}_\d{2}|padrao)(?=_|$)", "", nome)
+
+
+def _relacao_vazia(no):
+    return no["Node Type"] == "Seq Scan" and no["Total Cost"] < CUSTO_RELACAO_VAZIA
+
+
+def resumo_plano(plano):
+    """
+    Tipos de nó distintos (com a tabela e o índice, nos nós de leitura) e
+    custo total estimado de um plano. Seq Scans de partições quase vazias
+    (as futuras) ficam de fora: não dizem nada sobre o plano.
+    """
+    nos = set()
+    for no in _nos(plano["Plan"]):
+        if _relacao_vazia(no) and _sem_particao(no["Relation Name"]) != no["Relation Name"]:
+            continue
+        descricao = no["Node Type"]
+        if "Relation Name" in no:
+            descricao += " " + _sem_particao(no["Relation Name"])
+        if "Index Name" in no:
+            descricao += f" ({_sem_particao(no['Index Name'])})"
+        nos.add(descricao)
+    return {"nos": sorted(nos), "custo": round(plano["Plan"]["Total Cost"], 2)}
+
+
+def _particao_no_periodo(relacao, periodo):
+    # sales_p2025_06: junho de 2025 tem dias dentro do período?
+    mes = re.search(r"_p(\d{4})_(\d{2})$", relacao)
+    if not mes:
+        return False
+    ano, mes = int(mes[1]), int(mes[2])
+    return (date(ano, mes, 1) <= date.fromisoformat(periodo["end_date"])
+            and date.fromisoformat(periodo["start_date"]) < date(ano + mes // 12, mes % 12 + 1, 1))
+
+
+def _seletivos(conn, p):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FILTER (WHERE created_at >= %s AND created_at < %s::date + 1), COUNT(*) FROM sales",
+            (p["periodo"]["start_date"], p["periodo"]["end_date"]))
+        no_periodo, total = cursor.fetchone()
+    if no_periodo >= total * FRACAO_PERIODO_SELETIVO:
+        return tuple(filtro for filtro in FILTROS_SELETIVOS if filtro != "periodo")
+    return FILTROS_SELETIVOS
+
+
+def leituras_sem_indice(plano, combinacao, p, seletivos=FILTROS_SELETIVOS):
+    """
+    Relações de `sales` lidas por Seq Scan numa combinação com filtro
+    seletivo, fora as quase vazias e, com o período (sem loja), as
+    partições que têm dias dentro dele: as outras têm de ter sido podadas.
+    """
+    filtros = combinacao.split("+")
+    if not any(filtro in seletivos for filtro in filtros):
+        return []
+    leituras = []
+    for no in _nos(plano["Plan"]):
+        relacao = no.get("Relation Name", "")
+        if no["Node Type"] != "Seq Scan" or _sem_particao(relacao) != "sales" or _relacao_vazia(no):
+            continue
+        if "loja" not in filtros and _particao_no_periodo(relacao, p["periodo"]):
+            continue
+        leituras.append(relacao)
+    return leituras
+
+
+def planos_atuais(conn, servicos=SERVICOS):
+    """
+    Resumo do plano de cada consulta e, por consulta, as leituras de `sales`
+    sem índice (ver `leituras_sem_indice`).
+    """
+    p = _parametros(conn)
+    seletivos = _seletivos(conn, p)
+    planos = {}
+    sem_indice = {}
+    with conn.cursor() as cursor:
+        for servico, combinacao, consultas in combinacoes(p, servicos):
+            for consulta in consultas:
+                cursor.execute("EXPLAIN (FORMAT JSON) " + consulta.sql, consulta.params or None)
+                resultado = cursor.fetchone()[0]
+                if isinstance(resultado, str):
+                    resultado = json.loads(resultado)
+                chave = f"{servico} / {combinacao} / {consulta.nome}"
+                planos[chave] = resumo_plano(resultado[0])
+                if leituras := leituras_sem_indice(resultado[0], combinacao, p, seletivos):
+                    sem_indice[chave] = leituras
+    conn.rollback()
+    return planos, sem_indice
+
+
+def ambiente():
+    return f"{'rollups' if rollups_disponiveis() else 'bruto'}, {'particionado' if particionada() else 'simples'}"
+
+
+def _info_banco(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*), current_setting('server_version') FROM sales")
+        vendas, versao = cursor.fetchone()
+    conn.rollback()
+    return {"vendas": vendas, "postgres": versao}
+
+
+def compara(atuais, base, tolerancia=TOLERANCIA_CUSTO):
+    """
+    Regressões dos planos atuais em relação à base: nós que surgiram ou
+    sumiram e custo estimado acima de (1 + tolerância) vezes o da base.
+    Retorna (regressões, chaves sem base).
+    """
+    regressoes = []
+    novas = []
+    for chave, atual in atuais.items():
+        anterior = base.get(chave)
+        if anterior is None:
+            novas.append(chave)
+            continue
+        surgiram = sorted(set(atual["nos"]) - set(anterior["nos"]))
+        sumiram = sorted(set(anterior["nos"]) - set(atual["nos"]))
+        problemas = []
+        if surgiram:
+            problemas.append("novos nós: " + ", ".join(surgiram))
+        if sumiram:
+            problemas.append("nós removidos: " + ", ".join(sumiram))
+        if atual["custo"] > anterior["custo"] * (1 + tolerancia):
+            problemas.append(f"custo {anterior['custo']:,.0f} -> {atual['custo']:,.0f}")
+        if problemas:
+            regressoes.append((chave, problemas))
+    return regressoes, novas
+
+
+def _mostra_sem_indice(sem_indice):
+    for chave, leituras in sem_indice.items():
+        print(f"✗ {chave}")
+        print(f"    filtro seletivo sem índice: Seq Scan em {', '.join(leituras)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Regressão dos planos das consultas dos serviços')
+    parser.add_argument('--abencoar', action='store_true', help='Regrava a base com os planos atuais')
+    parser.add_argument('--servico', choices=SERVICOS, action='append', help='Padrão: todos')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_CUSTO,
+                        help='Aumento de custo aceito (0.5 = 50%%)')
+    parser.add_argument('--base', default=str(ARQUIVO_BASE), help='Arquivo da base')
+    args = parser.parse_args()
+
+    servicos = args.servico or list(SERVICOS)
+    arquivo = Path(args.base)
+    base = json.loads(arquivo.read_text(encoding="utf-8")) if arquivo.exists() else {}
+
+    detecta_particoes()
+    detecta_rollups()
+    chave_ambiente = ambiente()
+    with obter_conexao() as conn:
+        atuais, sem_indice = planos_atuais(conn, servicos)
+        info = _info_banco(conn)
+        periodo_seletivo = "periodo" in _seletivos(conn, _parametros(conn))
+        conn.rollback()
+
+    if args.abencoar:
+        if sem_indice:
+            _mostra_sem_indice(sem_indice)
+            sys.exit(f"{len(sem_indice)} plano(s) com filtro seletivo sem índice: corrija antes de abençoar")
+        if not periodo_seletivo:
+            sys.exit("Os 30 dias do período têm mais da metade das vendas deste banco, então os planos não "
+                     "exercitam os índices: abençoe em um banco semeado com --semear media")
+        registro = base.setdefault(chave_ambiente, {"planos": {}})
+        # Com --servico, só as chaves desses serviços são substituídas
+        registro["planos"] = {
+            chave: plano for chave, plano in registro["planos"].items()
+            if chave.split(" / ")[0] not in servicos
+        } | atuais
+        registro.update(info, gerada_em=datetime.now().isoformat(timespec="seconds"))
+        arquivo.write_text(json.dumps(base, indent=2, ensure_ascii=False, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"✓ {len(atuais)} planos gravados em {arquivo.name} ({chave_ambiente})")
+        return
+
+    registro = base.get(chave_ambiente)
+    if registro is None:
+        _mostra_sem_indice(sem_indice)
+        sys.exit(f"Sem base para o ambiente '{chave_ambiente}': rode com --abencoar")
+    if registro.get("vendas") != info["vendas"]:
+        print(f"⚠️  Base gerada com {registro.get('vendas'):,} vendas; o banco atual tem {info['vendas']:,}. "
+              "Custos estimados de bancos diferentes não são comparáveis.")
+
+    regressoes, novas = compara(atuais, registro["planos"], args.tolerancia)
+    for chave, problemas in regressoes:
+        print(f"✗ {chave}")
+        for problema in problemas:
+            print(f"    {problema}")
+    for chave in novas:
+        print(f"?  {chave}: sem base (rode com --abencoar)")
+    _mostra_sem_indice(sem_indice)
+    print(f"\n{len(atuais)} planos ({chave_ambiente}): {len(regressoes)} regressão(ões), "
+          f"{len(sem_indice)} sem índice, {len(novas)} sem base")
+    if regressoes or sem_indice:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
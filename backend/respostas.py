@@ -0,0 +1,75 @@
+"""
+Serialização das respostas da API.
+
+`RespostaJSON` usa o orjson (opcional, `pip install orjson`) quando
+instalado, e o encoder padrão do Starlette caso contrário. As rotas dos
+dashboards devolvem a resposta já montada com `resposta()`, o que evita
+também a passada do `jsonable_encoder` do FastAPI sobre cada linha.
+
+Com `format=columnar`, as listas de objetos da resposta (séries e tabelas)
+viram objetos de arrays paralelos:
+    [{"hora": "...", "total": 3}, ...]  ->  {"hora": ["...", ...], "total": [3, ...]}
+"""
+
+import time
+from fastapi.responses import JSONResponse
+from consultas import server_timing
+
+try:
+    import orjson
+except ImportError:  # sem o orjson, usa o encoder padrão
+    orjson = None
+
+FORMATOS = "^(json|columnar)$"
+
+
+def serializa(conteudo):
+    """
+    JSON em bytes. Datas e decimais viram texto com str(), como no
+    `json.dumps(..., default=str)`.
+    """
+    if orjson is not None:
+        return orjson.dumps(conteudo, default=str, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    import json
+    return json.dumps(conteudo, default=str, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def desserializa(valor):
+    if orjson is not None:
+        return orjson.loads(valor)
+    import json
+    return json.loads(valor)
+
+
+class RespostaJSON(JSONResponse):
+    def render(self, content):
+        return serializa(content)
+
+
+def colunas(dados):
+    """
+    Converte as listas de objetos com as mesmas chaves em objetos de
+    arrays paralelos, em qualquer nível da resposta.
+    """
+    if isinstance(dados, dict):
+        return {chave: colunas(valor) for chave, valor in dados.items()}
+    if isinstance(dados, list) and dados and all(isinstance(item, dict) for item in dados):
+        chaves = list(dados[0])
+        if all(item.keys() == dados[0].keys() for item in dados):
+            return {chave: [item[chave] for item in dados] for chave in chaves}
+    return dados
+
+
+def resposta(dados, tempos=None, formato="json"):
+    """
+    Resposta de um dashboard no formato pedido, com o header `Server-Timing`
+    das seções medidas (incluindo o tempo de serialização, `json`).
+    """
+    inicio = time.perf_counter()
+    if formato == "columnar":
+        dados = colunas(dados)
+    resposta_json = RespostaJSON(dados)
+    if tempos is not None:
+        tempos["json"] = (time.perf_counter() - inicio) * 1000
+        resposta_json.headers["Server-Timing"] = server_timing(tempos)
+    return resposta_json
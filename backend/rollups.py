@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Rollups: pré-agregações de `sales` (por hora/loja/canal/status) e de
+`product_sales` (por dia/produto/loja/canal), atualizadas incrementalmente
+a partir do último id processado (watermark).
+
+Os serviços consultam os rollups no lugar das tabelas brutas sempre que os
+filtros permitem (veja `fonte_vendas` e `fonte_itens`). As linhas acima do
+watermark, ainda não agregadas, entram na consulta direto da tabela bruta,
+então um rollup atrasado nunca devolve números desatualizados.
+
+O watermark só avança até um ponto seguro: ids são reservados com nextval
+e podem ser confirmados fora de ordem, então um id só é agregado depois que
+todas as transações abertas no momento em que ele ficou visível terminaram
+(migration 006).
+
+Uso (a partir de backend/):
+    python rollups.py                 # processa as linhas novas e sai
+    python rollups.py --intervalo 60  # atualiza a cada 60s
+    python rollups.py --rebuild       # reagrega tudo até o watermark atual
+"""
+
+import argparse
+import os
+import time
+from connection import obter_conexao
+from particoes import particionada
+
+ROLLUPS = os.getenv('rollups', '1') != '0'
+# Intervalo (s) do job de atualização dentro da API; 0 desativa. Sem o job,
+# a parte não agregada (lida da tabela bruta) cresce a cada venda nova
+ROLLUPS_INTERVALO = float(os.getenv('rollups_intervalo', 60))
+# Máximo de linhas de origem processadas por transação
+ROLLUPS_LOTE = int(os.getenv('rollups_lote', 200000))
+
+# Expressões de cada fonte de dados. Rollups usam o alias `s`, como `sales`,
+# para que os mesmos filtros (s.store_id, s.channel_id) se apliquem às duas.
+FONTE_VENDAS = {
+    "tabela": "sales s",
+    "data": "s.created_at",
+    "pedidos": "COUNT(*)",
+    "faturamento": "SUM(s.total_amount)",
+    "cancelados": "SUM(CASE WHEN s.sale_status_desc = 'CANCELLED' THEN 1 ELSE 0 END)",
+}
+
+FONTE_ROLLUP_VENDAS = {
+    "data": "s.hora",
+    "pedidos": "SUM(s.pedidos)",
+    "faturamento": "SUM(s.faturamento)",
+    "cancelados": "SUM(CASE WHEN s.sale_status_desc = 'CANCELLED' THEN s.pedidos ELSE 0 END)",
+}
+
+FONTE_ITENS = {
+    "tabela": "product_sales ps JOIN sales s ON ps.sale_id = s.id",
+    "data": "s.created_at",
+    "dia": "DATE(s.created_at)",
+    "produto": "ps.product_id",
+    "qtde": "SUM(ps.quantity)",
+    "faturamento": "SUM(ps.total_price)",
+    "custo": "SUM(ps.quantity * ps.base_price * 0.6)",
+    "margem_total": "SUM(ps.total_price - ps.quantity * ps.base_price * 0.6)",
+    "soma_margem_percentual": "SUM((ps.total_price - ps.quantity * ps.base_price * 0.6) / NULLIF(ps.total_price,0) * 100)",
+    "linhas_margem": "COUNT(NULLIF(ps.total_price, 0))",
+}
+
+# Com as tabelas particionadas (migration 004), a junção inclui a coluna de
+# partição e os filtros de data também se aplicam a `ps.sale_created_at`
+FONTE_ITENS_PARTICIONADA = {
+    **FONTE_ITENS,
+    "tabela": "product_sales ps JOIN sales s ON ps.sale_id = s.id AND ps.sale_created_at = s.created_at",
+    "particao": "ps.sale_created_at",
+}
+
+FONTE_ROLLUP_ITENS = {
+    "data": "s.dia",
+    "dia": "s.dia",
+    "produto": "s.product_id",
+    "qtde": "SUM(s.quantidade)",
+    "faturamento": "SUM(s.faturamento)",
+    "custo": "SUM(s.custo)",
+    "margem_total": "SUM(s.margem_total)",
+    "soma_margem_percentual": "SUM(s.soma_margem_percentual)",
+    "linhas_margem": "SUM(s.linhas_margem)",
+}
+
+# Rollup + cauda: as linhas acima do watermark vêm da tabela bruta. O limite
+# exato é a subconsulta ao watermark; o literal `{dica}` (último watermark
+# lido pela API, nunca maior que o do banco, que só cresce) é redundante e
+# existe para o planner estimar uma cauda pequena e usar o índice de id.
+ROLLUP_VENDAS_SQL = """(
+        SELECT hora, store_id, channel_id, sale_status_desc, pedidos, faturamento
+        FROM rollup_vendas_hora
+        UNION ALL
+        SELECT DATE_TRUNC('hour', created_at), store_id, channel_id, sale_status_desc, 1, total_amount
+        FROM sales
+        WHERE id > {dica}
+          AND id > (SELECT ultimo_id FROM rollup_watermarks WHERE tabela = 'sales')
+    ) s"""
+
+ROLLUP_ITENS_SQL = """(
+        SELECT dia, product_id, store_id, channel_id, quantidade, faturamento, custo,
+               margem_total, soma_margem_percentual, linhas_margem
+        FROM rollup_itens_dia
+        UNION ALL
+        SELECT DATE(s.created_at), ps.product_id, s.store_id, s.channel_id,
+               ps.quantity, ps.total_price,
+               ps.quantity * ps.base_price * 0.6,
+               ps.total_price - ps.quantity * ps.base_price * 0.6,
+               COALESCE((ps.total_price - ps.quantity * ps.base_price * 0.6) / NULLIF(ps.total_price,0) * 100, 0),
+               CASE WHEN ps.total_price <> 0 THEN 1 ELSE 0 END
+        FROM {juncao}
+        WHERE ps.id > {dica}
+          AND ps.id > (SELECT ultimo_id FROM rollup_watermarks WHERE tabela = 'product_sales')
+    ) s"""
+
+_disponiveis = False
+_watermarks = {}
+
+DETECTA_SQL = """
+    SELECT COUNT(*) = 2 AND COALESCE(MIN(w.ultimo_id), 0) > 0
+    FROM rollup_watermarks w
+    WHERE to_regclass('rollup_vendas_hora') IS NOT NULL
+      AND to_regclass('rollup_itens_dia') IS NOT NULL
+      AND w.tabela IN ('sales', 'product_sales')
+"""
+
+WATERMARKS_SQL = "SELECT tabela, ultimo_id FROM rollup_watermarks"
+
+
+def _marca_disponiveis(resultado, watermarks=()):
+    global _disponiveis, _watermarks
+    _watermarks = dict(watermarks)
+    _disponiveis = ROLLUPS and bool(resultado)
+    return _disponiveis
+
+
+def detecta_rollups():
+    """
+    Verifica se os rollups existem e já foram populados.
+    """
+    if not ROLLUPS:
+        return _marca_disponiveis(False)
+    with obter_conexao() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('rollup_watermarks') IS NOT NULL")
+        if not cursor.fetchone()[0]:
+            return _marca_disponiveis(False)
+        cursor.execute(DETECTA_SQL)
+        resultado = cursor.fetchone()[0]
+        cursor.execute(WATERMARKS_SQL)
+        return _marca_disponiveis(resultado, cursor.fetchall())
+
+
+async def detecta_rollups_async():
+    from connection_async import obter_conexao_async
+
+    if not ROLLUPS:
+        return _marca_disponiveis(False)
+    async with obter_conexao_async() as conn:
+        cursor = await conn.execute("SELECT to_regclass('rollup_watermarks') IS NOT NULL")
+        if not (await cursor.fetchone())[0]:
+            return _marca_disponiveis(False)
+        cursor = await conn.execute(DETECTA_SQL)
+        resultado = (await cursor.fetchone())[0]
+        cursor = await conn.execute(WATERMARKS_SQL)
+        return _marca_disponiveis(resultado, await cursor.fetchall())
+
+
+def disponiveis():
+    return _disponiveis
+
+
+def fonte_vendas():
+    """
+    Fonte das agregações sobre `sales`. Todos os filtros das rotas
+    (data, loja, canal, dia da semana, hora) têm granularidade de hora,
+    então o rollup atende qualquer combinação.
+    """
+    if not _disponiveis:
+        return FONTE_VENDAS
+    return {**FONTE_ROLLUP_VENDAS, "tabela": ROLLUP_VENDAS_SQL.format(dica=_watermarks.get("sales", 0))}
+
+
+def fonte_itens(start_hour=None, end_hour=None):
+    """
+    Fonte das agregações sobre `product_sales`. O rollup é diário,
+    então filtros por hora exigem a tabela bruta.
+    """
+    bruta = FONTE_ITENS_PARTICIONADA if particionada() else FONTE_ITENS
+    if _disponiveis and start_hour is None and end_hour is None:
+        return {**FONTE_ROLLUP_ITENS, "tabela": ROLLUP_ITENS_SQL.format(
+            juncao=bruta["tabela"], dica=_watermarks.get("product_sales", 0))}
+    return bruta
+
+
+# Atualização incremental
+ATUALIZA_VENDAS_SQL = """
+    INSERT INTO rollup_vendas_hora AS r (
+        hora, store_id, channel_id, sale_status_desc, pedidos, faturamento
+    )
+    SELECT
+        DATE_TRUNC('hour', s.created_at),
+        s.store_id, s.channel_id, s.sale_status_desc,
+        COUNT(*), SUM(s.total_amount)
+    FROM sales s
+    WHERE s.id > %s AND s.id <= %s
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (hora, store_id, channel_id, sale_status_desc) DO UPDATE SET
+        pedidos = r.pedidos + EXCLUDED.pedidos,
+        faturamento = r.faturamento + EXCLUDED.faturamento
+"""
+
+ATUALIZA_ITENS_SQL = """
+    INSERT INTO rollup_itens_dia AS r (
+        dia, product_id, store_id, channel_id,
+        quantidade, faturamento, custo, margem_total,
+        soma_margem_percentual, linhas_margem
+    )
+    SELECT
+        DATE(s.created_at), ps.product_id, s.store_id, s.channel_id,
+        SUM(ps.quantity),
+        SUM(ps.total_price),
+        SUM(ps.quantity * ps.base_price * 0.6),
+        SUM(ps.total_price - ps.quantity * ps.base_price * 0.6),
+        COALESCE(SUM((ps.total_price - ps.quantity * ps.base_price * 0.6) / NULLIF(ps.total_price,0) * 100), 0),
+        COUNT(NULLIF(ps.total_price, 0))
+    FROM product_sales ps
+    JOIN sales s ON ps.sale_id = s.id
+    WHERE ps.id > %s AND ps.id <= %s
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (dia, product_id, store_id, channel_id) DO UPDATE SET
+        quantidade = r.quantidade + EXCLUDED.quantidade,
+        faturamento = r.faturamento + EXCLUDED.faturamento,
+        custo = r.custo + EXCLUDED.custo,
+        margem_total = r.margem_total + EXCLUDED.margem_total,
+        soma_margem_percentual = r.soma_margem_percentual + EXCLUDED.soma_margem_percentual,
+        linhas_margem = r.linhas_margem + EXCLUDED.linhas_margem
+"""
+
+ROLLUPS_ORIGEM = [
+    ("sales", ATUALIZA_VENDAS_SQL),
+    ("product_sales", ATUALIZA_ITENS_SQL),
+]
+
+# Transações abertas agora (exceto a própria), pelo lock que cada transação
+# mantém sobre o seu virtualxid do início ao fim, mesmo sem escrever nada
+TRANSACOES_ABERTAS_SQL = """
+    SELECT array_agg(virtualxid)
+    FROM pg_locks
+    WHERE locktype = 'virtualxid' AND granted AND pid <> pg_backend_pid()
+"""
+
+AINDA_ABERTAS_SQL = """
+    SELECT EXISTS (
+        SELECT 1 FROM pg_locks
+        WHERE locktype = 'virtualxid' AND granted AND virtualxid = ANY(%s)
+    )
+"""
+
+
+def _ponto_seguro(cursor, tabela, de):
+    """
+    Maior id até o qual o watermark pode avançar (ou `de`, se nenhum).
+
+    O ponto guarda o maior id visível e as transações abertas quando ele
+    foi marcado, lidos nessa ordem: um id menor ainda não visível só pode
+    ser de uma delas, porque ids são reservados em ordem e inseridos pela
+    transação que os reservou (serial e generate_data.py). Quando todas
+    terminam, os ids até o ponto são finais. Um ponto já alcançado é
+    substituído por um novo, que vale a partir da próxima execução em que
+    as transações dele tiverem terminado (ou já nesta, se não havia outras).
+    """
+    cursor.execute(
+        "SELECT ponto_id, ponto_transacoes FROM rollup_watermarks WHERE tabela = %s", (tabela,))
+    ponto, transacoes = cursor.fetchone()
+    if ponto is None or ponto <= de:
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {tabela}")
+        ponto = cursor.fetchone()[0]
+        cursor.execute(TRANSACOES_ABERTAS_SQL)
+        transacoes = cursor.fetchone()[0]
+        cursor.execute(
+            "UPDATE rollup_watermarks SET ponto_id = %s, ponto_transacoes = %s WHERE tabela = %s",
+            (ponto, transacoes, tabela)
+        )
+    if transacoes:
+        cursor.execute(AINDA_ABERTAS_SQL, (transacoes,))
+        if cursor.fetchone()[0]:
+            return de
+    return ponto
+
+
+def _atualiza_tabela(conn, tabela, atualiza_sql):
+    """
+    Agrega um lote de linhas de `tabela` entre o watermark e o ponto seguro.
+    O watermark é travado (FOR UPDATE), então execuções concorrentes
+    do job não contam a mesma linha duas vezes.
+    Retorna quantas linhas de origem foram processadas.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT ultimo_id FROM rollup_watermarks WHERE tabela = %s FOR UPDATE",
+            (tabela,)
+        )
+        de = cursor.fetchone()[0]
+        ate = min(_ponto_seguro(cursor, tabela, de), de + ROLLUPS_LOTE)
+        if ate <= de:
+            # Grava o ponto novo, se houver
+            conn.commit()
+            return 0
+
+        cursor.execute(atualiza_sql, (de, ate))
+        cursor.execute("""
+            UPDATE rollup_watermarks
+            SET ultimo_id = %s, atualizado_em = CURRENT_TIMESTAMP
+            WHERE tabela = %s
+        """, (ate, tabela))
+    conn.commit()
+    return ate - de
+
+
+def atualiza_rollups(conn):
+    """
+    Processa as linhas entre o último watermark e o ponto seguro, em lotes.
+    Linhas acima do ponto ficam para uma próxima execução; até lá, as
+    consultas as leem da tabela bruta.
+    Retorna um dicionário tabela -> ids processados.
+    """
+    processadas = {}
+    for tabela, atualiza_sql in ROLLUPS_ORIGEM:
+        total = 0
+        while True:
+            lote = _atualiza_tabela(conn, tabela, atualiza_sql)
+            if not lote:
+                break
+            total += lote
+        processadas[tabela] = total
+    return processadas
+
+
+def recria_rollups(conn):
+    """
+    Reagrega tudo até os watermarks atuais em uma única transação (as
+    consultas esperam o TRUNCATE e veem o rollup completo) e depois segue
+    com a atualização incremental. Os watermarks nunca recuam.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT tabela, ultimo_id FROM rollup_watermarks FOR UPDATE")
+        ultimos = dict(cursor.fetchall())
+        cursor.execute("TRUNCATE rollup_vendas_hora, rollup_itens_dia")
+        for tabela, atualiza_sql in ROLLUPS_ORIGEM:
+            cursor.execute(atualiza_sql, (0, ultimos.get(tabela, 0)))
+    conn.commit()
+    return atualiza_rollups(conn)
+
+
+def atualiza_rollups_pool():
+    """
+    Atualização usando uma conexão do pool (job periódico da API).
+    """
+    with obter_conexao() as conn:
+        processadas = atualiza_rollups(conn)
+    # Relê disponibilidade e watermarks (dica de tamanho da cauda)
+    detecta_rollups()
+    return processadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Atualiza as tabelas de rollup dos dashboards')
+    parser.add_argument('--intervalo', type=float, default=0,
+                        help='Repete a atualização a cada N segundos (0 = uma vez)')
+    parser.add_argument('--rebuild', action='store_true', help='Reagrega tudo até o watermark atual')
+    args = parser.parse_args()
+
+    with obter_conexao() as conn:
+        if args.rebuild:
+            inicio = time.perf_counter()
+            processadas = recria_rollups(conn)
+            print(f"✓ Rollups recriados em {time.perf_counter() - inicio:.1f}s: {processadas}")
+
+        while True:
+            inicio = time.perf_counter()
+            processadas = atualiza_rollups(conn)
+            print(f"✓ Rollups atualizados em {time.perf_counter() - inicio:.2f}s: {processadas}")
+            if not args.intervalo:
+                break
+            time.sleep(args.intervalo)
+
+
+if __name__ == '__main__':
+    main()
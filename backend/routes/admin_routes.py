@@ -0,0 +1,102 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from autenticacao import exige_admin
+from cache import estatisticas_cache, limpa_cache
+from colunar import disponivel, estatisticas_colunar, recarrega_colunar
+from coalescencia import estatisticas_coalescencia
+from consultas_lentas import CONSULTAS_LENTAS_MS, le_entradas, resumo
+from connection import estatisticas_pool
+from connection_async import estatisticas_pool_async
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(exige_admin)])
+
+@router.get("/pool")
+def pool_stats():
+    """
+    Estatísticas dos pools de conexões (síncrono e assíncrono): conexões
+    em uso, requisições aguardando e latência de aquisição.
+    """
+    return {
+        "sync": estatisticas_pool(),
+        "async": estatisticas_pool_async(),
+    }
+
+
+@router.get("/cache")
+def cache_stats():
+    """
+    Hits, misses e ocupação do cache de respostas dos dashboards.
+    """
+    return estatisticas_cache()
+
+
+@router.delete("/cache")
+async def cache_clear():
+    """
+    Esvazia o cache de respostas (ex.: após uma carga retroativa de dados).
+    """
+    await limpa_cache()
+    return estatisticas_cache()
+
+
+@router.get("/coalescencia")
+def coalescencia_stats():
+    """
+    Requisições idênticas e concorrentes que reaproveitaram uma execução
+    em andamento, em vez de disparar as próprias consultas.
+    """
+    return estatisticas_coalescencia()
+
+
+@router.get("/colunar")
+def colunar_stats():
+    """
+    Linhas, memória (total e por milhão de linhas) e última carga do motor
+    colunar em memória.
+    """
+    return estatisticas_colunar()
+
+
+@router.post("/colunar/recarga")
+async def colunar_reload():
+    """
+    Recarrega o motor colunar do zero (ex.: após uma carga retroativa ou
+    alterações em vendas já carregadas). Responde 409 se outra recarga
+    já estiver em andamento.
+    """
+    if not disponivel():
+        raise HTTPException(status_code=409, detail="Motor colunar desativado (colunar=1)")
+    if await asyncio.to_thread(recarrega_colunar, False) is None:
+        raise HTTPException(status_code=409, detail="Recarga do motor colunar já em andamento")
+    return estatisticas_colunar()
+
+
+@router.get("/consultas-lentas")
+def consultas_lentas(
+    limite: int = Query(100, ge=1, le=5000),
+    rota: str = Query(None),                   # ex.: /dashboard/sales
+    secao: str = Query(None),                  # ex.: agregados, pedidos
+    forma: str = Query(None),                  # hash do SQL normalizado
+    desde: str = Query(None),                  # momento ISO 8601 (UTC)
+    planos: bool = Query(False),
+    parametros: bool = Query(False)
+):
+    """
+    Consultas dos serviços que passaram de `consultas_lentas_ms`, da mais
+    recente para a mais antiga, e um resumo por rota, seção e forma do SQL
+    (cada combinação de filtros gera uma forma). Os planos de EXPLAIN só
+    vêm com `planos=true` e os valores dos parâmetros (lojas, datas,
+    cursores) só com `parametros=true`.
+    """
+    entradas = le_entradas(limite, rota, secao, forma, desde)
+    agrupadas = resumo(entradas)
+    if not parametros:
+        agrupadas = [{k: v for k, v in g.items() if k != "exemplo_params"} for g in agrupadas]
+        entradas = [{k: v for k, v in e.items() if k != "params"} for e in entradas]
+    if not planos:
+        entradas = [{k: v for k, v in e.items() if k != "plano"} | {"com_plano": "plano" in e} for e in entradas]
+    return {
+        "limite_ms": CONSULTAS_LENTAS_MS,
+        "resumo": agrupadas,
+        "entradas": entradas,
+    }
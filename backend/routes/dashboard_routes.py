@@ -1,17 +1,23 @@
-from fastapi import APIRouter, Query
-from services.dashboard_service import get_dashboard_overview
+from fastapi import APIRouter, Request, Query
+from consultas import mede_secoes
+from condicional import responde_dashboard
+from respostas import FORMATOS
+from services.dashboard_service import get_dashboard_overview_async
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
 @router.get("/overview")
-def dashboard_overview(
+async def dashboard_overview(
+    request: Request,
     start_date: str = Query(None),
     end_date: str = Query(None),
     store_id: int = Query(None),
-    channel_id: int = Query(None)
+    channel_id: int = Query(None),
+    formato: str = Query("json", alias="format", pattern=FORMATOS)
 ):
     """
     Retorna as métricas principais do dashboard geral.
     """
-    data = get_dashboard_overview(start_date, end_date, store_id, channel_id)
-    return data
+    with mede_secoes() as tempos:
+        filtros = dict(start_date=start_date, end_date=end_date, store_id=store_id, channel_id=channel_id)
+        return await responde_dashboard(request, "overview", filtros, lambda: get_dashboard_overview_async(**filtros), tempos, formato)
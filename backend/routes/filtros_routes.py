@@ -1,34 +1,25 @@
-from fastapi import APIRouter
-from connection import conecta
+from fastapi import APIRouter, Depends
+from connection_async import get_conexao_async
 
 router = APIRouter(prefix="/filtros", tags=["Filtros"])
 
 @router.get("/lojas")
-def listar_lojas():
-    conn = conecta()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name FROM stores ORDER BY name;")
-    lojas = [{"id": r[0], "nome": r[1]} for r in cursor.fetchall()]
-    cursor.close()
-    conn.close()
+async def listar_lojas(conn=Depends(get_conexao_async)):
+    async with conn.cursor() as cursor:
+        await cursor.execute("SELECT id, name FROM stores ORDER BY name;")
+        lojas = [{"id": r[0], "nome": r[1]} for r in await cursor.fetchall()]
     return lojas
 
 @router.get("/canais")
-def listar_canais():
-    conn = conecta()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name FROM channels ORDER BY name;")
-    canais = [{"id": r[0], "nome": r[1]} for r in cursor.fetchall()]
-    cursor.close()
-    conn.close()
+async def listar_canais(conn=Depends(get_conexao_async)):
+    async with conn.cursor() as cursor:
+        await cursor.execute("SELECT id, name FROM channels ORDER BY name;")
+        canais = [{"id": r[0], "nome": r[1]} for r in await cursor.fetchall()]
     return canais
 
 @router.get("/categorias")
-def listar_categorias():
-    conn = conecta()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name FROM categories ORDER BY name;")
-    categorias = [{"id": r[0], "nome": r[1]} for r in cursor.fetchall()]
-    cursor.close()
-    conn.close()
+async def listar_categorias(conn=Depends(get_conexao_async)):
+    async with conn.cursor() as cursor:
+        await cursor.execute("SELECT id, name FROM categories ORDER BY name;")
+        categorias = [{"id": r[0], "nome": r[1]} for r in await cursor.fetchall()]
     return categorias
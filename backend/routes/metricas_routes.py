@@ -0,0 +1,15 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from metricas import METRICAS, exposicao
+
+router = APIRouter(tags=["Métricas"])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Métricas no formato de texto do Prometheus: latência por rota, duração
+    e linhas por consulta, espera por conexão e contadores do cache.
+    """
+    if not METRICAS:
+        raise HTTPException(status_code=404, detail="Métricas desativadas (metricas=1)")
+    return PlainTextResponse(exposicao(), media_type="text/plain; version=0.0.4; charset=utf-8")
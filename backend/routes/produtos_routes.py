@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Request, Query, HTTPException
 from pydantic import BaseModel
 from typing import Optional
-from services.produtos_service import get_produtos, get_produtos_analitico
+from services.produtos_service import get_produtos_async, get_produtos_analitico_async
+from consultas import mede_secoes
+from condicional import responde_dashboard
+from respostas import FORMATOS
 
 router = APIRouter(prefix="/produtos", tags=["Produtos"])
 
@@ -15,7 +18,7 @@ class ProdutoCreate(BaseModel):
 
 
 @router.get("/")
-def listar_produtos(
+async def listar_produtos(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1),
     category_id: Optional[int] = Query(None, alias="category_id")
@@ -23,10 +26,11 @@ def listar_produtos(
     """
     Lista produtos com paginação e filtro opcional por categoria.
     """
-    return get_produtos(page, limit, category_id)
+    return await get_produtos_async(page, limit, category_id)
 
 @router.get("/analitico")
-def listar_produtos_analitico(
+async def listar_produtos_analitico(
+    request: Request,
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1),
     start_date: Optional[str] = None,
@@ -36,20 +40,23 @@ def listar_produtos_analitico(
     category_id: Optional[int] = None,
     weekday: Optional[int] = None,
     start_hour: Optional[int] = None,
-    end_hour: Optional[int] = None
+    end_hour: Optional[int] = None,
+    formato: str = Query("json", alias="format", pattern=FORMATOS)
 ):
     """
     Retorna informações analíticas dos produtos.
     """
-    return get_produtos_analitico(
-        page=page,
-        limit=limit,
-        start_date=start_date,
-        end_date=end_date,
-        store_id=store_id,
-        channel_id=channel_id,
-        category_id=category_id,
-        weekday=weekday,
-        start_hour=start_hour,
-        end_hour=end_hour
-    )
\ No newline at end of file
+    with mede_secoes() as tempos:
+        filtros = dict(
+            page=page,
+            limit=limit,
+            start_date=start_date,
+            end_date=end_date,
+            store_id=store_id,
+            channel_id=channel_id,
+            category_id=category_id,
+            weekday=weekday,
+            start_hour=start_hour,
+            end_hour=end_hour
+        )
+        return await responde_dashboard(request, "produtos_analitico", filtros, lambda: get_produtos_analitico_async(**filtros), tempos, formato)
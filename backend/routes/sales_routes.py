@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Query
-from services.sales_dashboard import get_dashboard_sales
+from fastapi import APIRouter, Request, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from consultas import mede_secoes
+from condicional import responde_dashboard
+from exportacao import FORMATOS_EXPORTACAO, TIPOS, csv_pedidos, parquet_disponivel, parquet_pedidos
+from respostas import FORMATOS
+from services.sales_dashboard import consulta_exportacao_pedidos, get_dashboard_sales_async
 
 router = APIRouter(prefix="/dashboard", tags=["Sales Dashboard"])
 
 @router.get("/sales")
-def sales_dashboard(
+async def sales_dashboard(
+    request: Request,
     start_date: str = Query(None),
     end_date: str = Query(None),
     store_id: int = Query(None),
@@ -13,20 +19,69 @@ def sales_dashboard(
     start_hour: int = Query(None, ge=0, le=23), # 0–23
     end_hour: int = Query(None, ge=0, le=23),   # 0–23
     page: int = Query(1, ge=1),
-    limit: int = Query(20, ge=1, le=200)
+    limit: int = Query(20, ge=1, le=200),
+    cursor: str = Query(None),                  # next_cursor da página anterior
+    total_exato: bool = Query(False),
+    formato: str = Query("json", alias="format", pattern=FORMATOS)  # json | columnar
 ):
     """
     Retorna informações de vendas, faturamento e listagem paginada de pedidos.
+    A lista aceita page/limit ou paginação por cursor: envie o `next_cursor`
+    da resposta anterior em `cursor` (page é ignorado nesse caso).
     """
-    data = get_dashboard_sales(
-        start_date=start_date,
-        end_date=end_date,
-        store_id=store_id,
-        channel_id=channel_id,
-        weekday=weekday,
-        start_hour=start_hour,
-        end_hour=end_hour,
-        page=page,
-        limit=limit
-    )
-    return data
+    with mede_secoes() as tempos:
+        filtros = dict(
+            start_date=start_date,
+            end_date=end_date,
+            store_id=store_id,
+            channel_id=channel_id,
+            weekday=weekday,
+            start_hour=start_hour,
+            end_hour=end_hour,
+            page=page,
+            limit=limit,
+            cursor=cursor,
+            total_exato=total_exato or None
+        )
+        try:
+            return await responde_dashboard(request, "sales", filtros, lambda: get_dashboard_sales_async(**filtros), tempos, formato)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/sales/export")
+async def sales_export(
+    start_date: str = Query(None),
+    end_date: str = Query(None),
+    store_id: int = Query(None),
+    channel_id: int = Query(None),
+    weekday: int = Query(None, ge=0, le=6),     # 0=Domingo ... 6=Sábado
+    start_hour: int = Query(None, ge=0, le=23), # 0–23
+    end_hour: int = Query(None, ge=0, le=23),   # 0–23
+    formato: str = Query("csv", alias="format", pattern=FORMATOS_EXPORTACAO)  # csv | parquet
+):
+    """
+    Exporta todos os pedidos dos filtros de /dashboard/sales, em streaming.
+    O arquivo é gerado à medida que os lotes são lidos do banco, então o
+    download começa imediatamente e pode ser cancelado a qualquer momento.
+    """
+    if formato == "parquet" and not parquet_disponivel():
+        raise HTTPException(status_code=501, detail="Exportação em Parquet requer o pyarrow")
+    # Monta a consulta antes de a resposta começar: depois do primeiro byte
+    # um filtro inválido não pode mais virar 400
+    try:
+        consulta = consulta_exportacao_pedidos(
+            start_date=start_date,
+            end_date=end_date,
+            store_id=store_id,
+            channel_id=channel_id,
+            weekday=weekday,
+            start_hour=start_hour,
+            end_hour=end_hour
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    gerador = csv_pedidos(consulta) if formato == "csv" else parquet_pedidos(consulta)
+    return StreamingResponse(gerador, media_type=TIPOS[formato], headers={
+        "Content-Disposition": f'attachment; filename="pedidos.{formato}"',
+    })
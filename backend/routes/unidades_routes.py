@@ -1,19 +1,28 @@
-from fastapi import APIRouter, Query
-from services.unidades_service import get_unidades_overview
+from fastapi import APIRouter, Request, Query
+from consultas import mede_secoes
+from condicional import responde_dashboard
+from respostas import FORMATOS
+from services.unidades_service import get_unidades_overview_async
 
 router = APIRouter(prefix="/units", tags=["Unidades"])
 
 @router.get("/overview")
-def unidades_overview(
+async def unidades_overview(
+    request: Request,
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1),
     start_date: str = Query(None),
     end_date: str = Query(None),
     status: str = Query(None),
-    channel_id: int = Query(None)
+    channel_id: int = Query(None),
+    formato: str = Query("json", alias="format", pattern=FORMATOS)
 ):
     """
     Retorna visão geral das unidades com KPIs, tabela paginada e filtros.
     """
-    data = get_unidades_overview(page, limit, start_date, end_date, status, channel_id)
-    return data
+    with mede_secoes() as tempos:
+        filtros = dict(
+            page=page, limit=limit, start_date=start_date, end_date=end_date,
+            status=status, channel_id=channel_id
+        )
+        return await responde_dashboard(request, "unidades", filtros, lambda: get_unidades_overview_async(**filtros), tempos, formato)
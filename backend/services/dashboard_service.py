@@ -1,111 +1,109 @@
-from connection import conecta
+import colunar
+from consultas import Consulta, executa_consultas, executa_consultas_async, separa_secoes
+from filtros_sql import filtros_vendas, where
+from rollups import fonte_itens, fonte_vendas
 
-def get_dashboard_overview(start_date=None, end_date=None, store_id=None, channel_id=None):
-    conn = conecta()
-    cursor = conn.cursor()
+def _consultas_dashboard_overview(start_date=None, end_date=None, store_id=None, channel_id=None):
+    vendas = fonte_vendas()
+    itens = fonte_itens()
+    data = vendas["data"]
+
+    # Mesmos filtros sobre a coluna de data de cada fonte (e, nos itens,
+    # também sobre a coluna de partição, quando houver)
+    filtros_agregados, params = filtros_vendas(data, start_date, end_date, store_id, channel_id)
+    filtros_itens, params_itens = filtros_vendas(
+        itens["data"], start_date, end_date, store_id, channel_id,
+        data_particao=itens.get("particao")
+    )
+    params = tuple(params)
+
+    # KPIs, tendência diária e faturamento por loja em uma única varredura
+    agregados_sql = f"""
+        SELECT
+            CASE
+                WHEN GROUPING(DATE({data})) = 0 THEN 'dia'
+                WHEN GROUPING(st.name) = 0 THEN 'loja'
+                ELSE 'total'
+            END AS secao,
+            DATE({data}) AS data,
+            st.name AS loja,
+            COALESCE({vendas['pedidos']}, 0)::int AS total_pedidos,
+            COALESCE({vendas['faturamento']}, 0)::numeric AS faturamento,
+            COALESCE(ROUND({vendas['faturamento']}::numeric / NULLIF({vendas['pedidos']}, 0), 2), 0) AS ticket_medio,
+            COALESCE(ROUND(
+                {vendas['cancelados']}::numeric * 100.0 / NULLIF({vendas['pedidos']}, 0),
+            2), 0) AS taxa_cancelamento
+        FROM {vendas['tabela']}
+        JOIN stores st ON s.store_id = st.id
+        {where(filtros_agregados)}
+        GROUP BY GROUPING SETS ((), (DATE({data})), (st.name));
+    """
 
-    try:
-        filtros = []
-        params = []
+    # Top produtos
+    top_produtos_sql = f"""
+        SELECT
+            p.name AS produto,
+            {itens['qtde']}::int AS quantidade,
+            COALESCE({itens['faturamento']}, 0)::numeric AS receita
+        FROM {itens['tabela']}
+        JOIN products p ON {itens['produto']} = p.id
+        {where(filtros_itens)}
+        GROUP BY p.name
+        ORDER BY receita DESC
+        LIMIT 5;
+    """
 
-        # Filtros dinâmicos
-        if start_date and end_date:
-            filtros.append("s.created_at BETWEEN %s AND %s")
-            params.append(f"{start_date} 00:00:00")
-            params.append(f"{end_date} 23:59:59")
+    return [
+        Consulta("agregados", agregados_sql, params),
+        Consulta("top_produtos", top_produtos_sql, tuple(params_itens)),
+    ]
 
-        if store_id:
-            filtros.append("s.store_id = %s")
-            params.append(store_id)
 
-        if channel_id:
-            filtros.append("s.channel_id = %s")
-            params.append(channel_id)
+def _monta_dashboard_overview(resultados):
+    # Colunas: data, loja, total_pedidos, faturamento, ticket_medio, taxa_cancelamento
+    secoes = separa_secoes(resultados["agregados"])
+    kpis_row = secoes["total"][0]
+    kpis = {
+        "total_pedidos": int(kpis_row[2]),
+        "faturamento_total": float(kpis_row[3]),
+        "ticket_medio": float(kpis_row[4]),
+        "taxa_cancelamento": float(kpis_row[5]),
+    }
 
-        where_clause = "WHERE " + " AND ".join(filtros) if filtros else ""
+    tendencia = [
+        {"data": str(r[0]), "faturamento": float(r[3])}
+        for r in sorted(secoes.get("dia", []), key=lambda r: r[0])
+    ]
 
-        # KPIs principais
-        kpis_sql = f"""
-            SELECT
-                COUNT(*)::int AS total_pedidos,
-                COALESCE(SUM(s.total_amount), 0)::numeric AS faturamento_total,
-                COALESCE(ROUND(AVG(s.total_amount)::numeric, 2), 0) AS ticket_medio,
-                COALESCE(ROUND(
-                    SUM(CASE WHEN s.sale_status_desc = 'CANCELLED' THEN 1 ELSE 0 END)::numeric * 100.0 / NULLIF(COUNT(*), 0),
-                2), 0) AS taxa_cancelamento
-            FROM sales s
-            {where_clause};
-        """
-        cursor.execute(kpis_sql, tuple(params))
-        kpis_row = cursor.fetchone()
-        kpis = {
-            "total_pedidos": int(kpis_row[0]),
-            "faturamento_total": float(kpis_row[1]),
-            "ticket_medio": float(kpis_row[2]),
-            "taxa_cancelamento": float(kpis_row[3]),
-        }
+    top_produtos = [
+        {"produto": r[0], "quantidade": int(r[1]), "receita": float(r[2])}
+        for r in resultados["top_produtos"]
+    ]
 
-        # Tendência de faturamento diário
-        tendencia_sql = f"""
-            SELECT 
-                DATE(s.created_at) AS data, 
-                COALESCE(SUM(s.total_amount), 0)::numeric AS faturamento
-            FROM sales s
-            {where_clause}
-            GROUP BY DATE(s.created_at)
-            ORDER BY data;
-        """
-        cursor.execute(tendencia_sql, tuple(params))
-        tendencia_rows = cursor.fetchall()
-        tendencia = [
-            {"data": str(r[0]), "faturamento": float(r[1])} for r in tendencia_rows
-        ]
+    faturamento_lojas = [
+        {"loja": r[1], "receita": float(r[3])}
+        for r in sorted(secoes.get("loja", []), key=lambda r: r[3], reverse=True)
+    ]
 
-        # Top produtos
-        top_produtos_sql = f"""
-            SELECT 
-                p.name AS produto,
-                SUM(ps.quantity)::int AS quantidade,
-                COALESCE(SUM(ps.total_price), 0)::numeric AS receita
-            FROM product_sales ps
-            JOIN products p ON ps.product_id = p.id
-            JOIN sales s ON ps.sale_id = s.id
-            {where_clause}
-            GROUP BY p.name
-            ORDER BY receita DESC
-            LIMIT 5;
-        """
-        cursor.execute(top_produtos_sql, tuple(params))
-        top_produtos_rows = cursor.fetchall()
-        top_produtos = [
-            {"produto": r[0], "quantidade": int(r[1]), "receita": float(r[2])}
-            for r in top_produtos_rows
-        ]
+    return {
+        "kpis": kpis,
+        "tendencia": tendencia,
+        "top_produtos": top_produtos,
+        "faturamento_lojas": faturamento_lojas,
+    }
 
-        # Faturamento por loja
-        faturamento_lojas_sql = f"""
-            SELECT 
-                st.name AS loja,
-                COALESCE(SUM(s.total_amount), 0)::numeric AS receita
-            FROM sales s
-            JOIN stores st ON s.store_id = st.id
-            {where_clause}
-            GROUP BY st.name
-            ORDER BY receita DESC;
-        """
-        cursor.execute(faturamento_lojas_sql, tuple(params))
-        faturamento_lojas_rows = cursor.fetchall()
-        faturamento_lojas = [
-            {"loja": r[0], "receita": float(r[1])} for r in faturamento_lojas_rows
-        ]
 
-        return {
-            "kpis": kpis,
-            "tendencia": tendencia,
-            "top_produtos": top_produtos,
-            "faturamento_lojas": faturamento_lojas,
-        }
+def get_dashboard_overview(start_date=None, end_date=None, store_id=None, channel_id=None):
+    consultas = _consultas_dashboard_overview(start_date, end_date, store_id, channel_id)
+    resultados = colunar.resultados_overview(start_date, end_date, store_id, channel_id)
+    resultados.update(executa_consultas(colunar.pendentes(consultas, resultados)))
+    return _monta_dashboard_overview(resultados)
+
 
-    finally:
-        cursor.close()
-        conn.close()
+async def get_dashboard_overview_async(start_date=None, end_date=None, store_id=None, channel_id=None):
+    consultas = _consultas_dashboard_overview(start_date, end_date, store_id, channel_id)
+    resultados = await colunar.resultados_async(
+        colunar.resultados_overview, start_date, end_date, store_id, channel_id
+    )
+    resultados.update(await executa_consultas_async(colunar.pendentes(consultas, resultados)))
+    return _monta_dashboard_overview(resultados)
@@ -1,13 +1,8 @@
-from connection import conecta
-
-def get_produtos(page, limit, category_id=None):
-    """
-    Retorna lista de produtos, opcionalmente filtrando por category_id.
-    Paginação aplicada via page e limit.
-    """
-    conn = conecta()
-    cursor = conn.cursor()
+from consultas import Consulta, executa_consultas, executa_consultas_async, separa_secoes
+from filtros_sql import filtros_vendas, where
+from rollups import fonte_itens
 
+def _consultas_produtos(page, limit, category_id=None):
     offset = (page - 1) * limit
     filtros = []
 
@@ -29,147 +24,134 @@ def get_produtos(page, limit, category_id=None):
         LIMIT {limit} OFFSET {offset}
     """
 
-    cursor.execute(query)
-    resultados = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    return [Consulta("produtos", query)]
 
+
+def _monta_produtos(resultados):
     # Mapeamento dos resultados em dicionário
     produtos = [
         {"id": r[0], "produto": r[1], "categoria": r[2] or "-"}
-        for r in resultados
+        for r in resultados["produtos"]
     ]
 
     return produtos
 
 
-def get_produtos_analitico(page: int = 1, limit: int = 20, start_date=None, end_date=None,
-                           store_id=None, channel_id=None, category_id=None,
-                           weekday=None, start_hour=None, end_hour=None):
-    
+def get_produtos(page, limit, category_id=None):
     """
-    Retorna uma visão analítica de produtos, com KPIs, faturamento, margem, 
-    produtos mais vendidos, lucrativos e evolução de vendas.
-    Aceita múltiplos filtros dinâmicos e aplica paginação.
+    Retorna lista de produtos, opcionalmente filtrando por category_id.
+    Paginação aplicada via page e limit.
     """
-    conn = conecta()
-    cursor = conn.cursor()
+    return _monta_produtos(executa_consultas(_consultas_produtos(page, limit, category_id)))
 
-    offset = (page - 1) * limit
-    filtros = []
-    params = []
-
-    # Filtros dinâmicos
-    if start_date:
-        filtros.append("s.created_at::date >= %s")
-        params.append(start_date)
-    if end_date:
-        filtros.append("s.created_at::date <= %s")
-        params.append(end_date)
-    if store_id:
-        filtros.append("s.store_id = %s")
-        params.append(store_id)
-    if channel_id:
-        filtros.append("s.channel_id = %s")
-        params.append(channel_id)
+
+async def get_produtos_async(page, limit, category_id=None):
+    return _monta_produtos(await executa_consultas_async(_consultas_produtos(page, limit, category_id)))
+
+
+def _consultas_produtos_analitico(page: int = 1, limit: int = 20, start_date=None, end_date=None,
+                                  store_id=None, channel_id=None, category_id=None,
+                                  weekday=None, start_hour=None, end_hour=None):
+    # O rollup diário atende todos os filtros, exceto os de hora
+    fonte = fonte_itens(start_hour, end_hour)
+    filtros, params = filtros_vendas(
+        fonte["data"], start_date, end_date, store_id, channel_id,
+        weekday, start_hour, end_hour, hora_final_inclusiva=False,
+        data_particao=fonte.get("particao")
+    )
+    where_clause = where(filtros)
+
+    # A categoria é filtrada depois da pré-agregação, junto com `products`
+    filtro_categoria = ""
     if category_id:
-        filtros.append("p.category_id = %s")
+        filtro_categoria = "WHERE p.category_id = %s"
         params.append(category_id)
-    if weekday is not None:
-        filtros.append("EXTRACT(DOW FROM s.created_at) = %s")
-        params.append(weekday)
-    if start_hour is not None:
-        filtros.append("EXTRACT(HOUR FROM s.created_at) >= %s")
-        params.append(start_hour)
-    if end_hour is not None:
-        filtros.append("EXTRACT(HOUR FROM s.created_at) < %s")
-        params.append(end_hour)
-    where_clause = "WHERE " + " AND ".join(filtros) if filtros else ""
-
-    # Dados agregados por produto 
-    query_principal = f"""
+    params = tuple(params)
+
+    # Pré-agrega por produto e dia (reduz as linhas antes do join com
+    # `products`); os grouping sets montam produtos, KPIs, mais
+    # vendido/lucrativo, mix por categoria e evolução em uma única consulta
+    query_agregados = f"""
+        WITH itens AS (
+            SELECT
+                {fonte['produto']} AS product_id,
+                {fonte['dia']} AS dia,
+                {fonte['qtde']} AS qtde,
+                {fonte['faturamento']} AS faturamento,
+                {fonte['custo']} AS custo,
+                {fonte['margem_total']} AS margem_total,
+                {fonte['soma_margem_percentual']} AS soma_margem_percentual,
+                {fonte['linhas_margem']} AS linhas_margem
+            FROM {fonte['tabela']}
+            {where_clause}
+            GROUP BY 1, 2
+        )
         SELECT
+            CASE
+                WHEN GROUPING(p.id) = 0 THEN 'produto'
+                WHEN GROUPING(p.name) = 0 THEN 'nome'
+                WHEN GROUPING(c.name) = 0 THEN 'categoria'
+                WHEN GROUPING(i.dia) = 0 THEN 'dia'
+                ELSE 'total'
+            END AS secao,
             p.id,
             p.name AS produto,
             c.name AS categoria,
-            SUM(ps.quantity) AS qtde,
-            SUM(ps.total_price) AS faturamento,
-            COALESCE(SUM(ps.quantity * ps.base_price * 0.6), 0) AS custo,
-            ((SUM(ps.total_price) - SUM(ps.quantity * ps.base_price * 0.6)) /
-            NULLIF(SUM(ps.total_price),0) * 100) AS margem_percentual,
-            SUM(ps.total_price - ps.quantity * ps.base_price * 0.6) AS margem_total
-        FROM product_sales ps
-        JOIN sales s ON ps.sale_id = s.id
-        JOIN products p ON ps.product_id = p.id
+            i.dia AS data,
+            SUM(i.qtde) AS qtde,
+            SUM(i.faturamento) AS faturamento,
+            COALESCE(SUM(i.custo), 0) AS custo,
+            ((SUM(i.faturamento) - SUM(i.custo)) /
+            NULLIF(SUM(i.faturamento),0) * 100) AS margem_percentual,
+            SUM(i.margem_total) AS margem_total,
+            SUM(i.soma_margem_percentual) / NULLIF(SUM(i.linhas_margem), 0) AS margem_media
+        FROM itens i
+        JOIN products p ON i.product_id = p.id
         LEFT JOIN categories c ON p.category_id = c.id
-        {where_clause}
-        GROUP BY p.id, p.name, c.name
-        ORDER BY faturamento DESC
-        LIMIT %s OFFSET %s
+        {filtro_categoria}
+        GROUP BY GROUPING SETS (
+            (),
+            (p.id, p.name, c.name),
+            (p.name),
+            (c.name),
+            (i.dia)
+        )
     """
 
-    params_main = params + [limit, offset]
-    cursor.execute(query_principal, params_main)
-    produtos = cursor.fetchall()
+    return [Consulta("agregados", query_agregados, params)]
+
 
+def _monta_produtos_analitico(resultados, page, limit):
+    # Colunas: id, produto, categoria, data, qtde, faturamento, custo,
+    #          margem_percentual, margem_total, margem_media
+    secoes = separa_secoes(resultados["agregados"])
+    offset = (page - 1) * limit
+
+    # Paginação da lista de produtos, ordenada por faturamento
+    por_faturamento = sorted(secoes.get("produto", []), key=lambda r: r[5] or 0, reverse=True)
     produtos_list = [
         {
             "id": r[0],
             "produto": r[1],
             "categoria": r[2] or "-",
-            "qtde": int(r[3] or 0),
-            "faturamento": float(r[4] or 0),
-            "custo": float(r[5] or 0),
-            "margem_percentual": round(float(r[6] or 0), 2),
-            "margem_total": float(r[7] or 0)
+            "qtde": int(r[4] or 0),
+            "faturamento": float(r[5] or 0),
+            "custo": float(r[6] or 0),
+            "margem_percentual": round(float(r[7] or 0), 2),
+            "margem_total": float(r[8] or 0)
         }
-        for r in produtos
+        for r in por_faturamento[offset:offset + limit]
     ]
 
-    # KPIs gerais
-    query_kpis = f"""
-        SELECT
-            SUM(ps.quantity) AS total_itens,
-            SUM(ps.total_price) AS faturamento_total,
-            AVG(
-                (ps.total_price - ps.quantity * ps.base_price * 0.6) /
-                NULLIF(ps.total_price,0) * 100
-            ) AS margem_media
-        FROM product_sales ps
-        JOIN sales s ON ps.sale_id = s.id
-        JOIN products p ON ps.product_id = p.id
-        {where_clause}
-    """
-    cursor.execute(query_kpis, params)
-    total_itens, faturamento_total, margem_media = cursor.fetchone()
-
-    # Produto mais vendido 
-    cursor.execute(f"""
-        SELECT p.name
-        FROM product_sales ps
-        JOIN sales s ON ps.sale_id = s.id
-        JOIN products p ON ps.product_id = p.id
-        {where_clause}
-        GROUP BY p.name
-        ORDER BY SUM(ps.quantity) DESC
-        LIMIT 1
-    """, params)
-    mais_vendido = cursor.fetchone()
-    produto_mais_vendido = mais_vendido[0] if mais_vendido else "-"
-
-    # Produto mais lucrativo 
-    cursor.execute(f"""
-        SELECT p.name
-        FROM product_sales ps
-        JOIN sales s ON ps.sale_id = s.id
-        JOIN products p ON ps.product_id = p.id
-        {where_clause}
-        GROUP BY p.name
-        ORDER BY SUM(ps.total_price - ps.quantity * ps.base_price * 0.6) DESC
-        LIMIT 1
-    """, params)
-    mais_lucrativo = cursor.fetchone()
-    produto_mais_lucrativo = mais_lucrativo[0] if mais_lucrativo else "-"
+    total = secoes["total"][0]
+    total_itens, faturamento_total, margem_media = total[4], total[5], total[9]
+
+    nomes = secoes.get("nome", [])
+    mais_vendido = max(nomes, key=lambda r: r[4], default=None)
+    produto_mais_vendido = mais_vendido[1] if mais_vendido else "-"
+
+    mais_lucrativo = max(nomes, key=lambda r: r[8], default=None)
+    produto_mais_lucrativo = mais_lucrativo[1] if mais_lucrativo else "-"
 
     kpis = {
         "total_itens": int(total_itens or 0),
@@ -179,48 +161,21 @@ def get_produtos_analitico(page: int = 1, limit: int = 20, start_date=None, end_
         "produto_mais_lucrativo": produto_mais_lucrativo
     }
 
-    # Top 10 mais vendidos 
+    # Top 10 mais vendidos
     top_vendidos = sorted(produtos_list, key=lambda x: x["qtde"], reverse=True)[:10]
 
-
-    # Mix por categoria
-    cursor.execute(f"""
-        SELECT c.name, SUM(ps.total_price)
-        FROM product_sales ps
-        JOIN sales s ON ps.sale_id = s.id
-        JOIN products p ON ps.product_id = p.id
-        LEFT JOIN categories c ON p.category_id = c.id
-        {where_clause}
-        GROUP BY c.name
-    """, params)
-    mix_raw = cursor.fetchall()
-    total_fat = sum([r[1] or 0 for r in mix_raw]) or 1
+    mix_raw = secoes.get("categoria", [])
+    total_fat = sum([r[5] or 0 for r in mix_raw]) or 1
     mix_categorias = [
-        {"categoria": r[0] or "-", "percentual": round((r[1] or 0) / total_fat * 100, 2)}
+        {"categoria": r[2] or "-", "percentual": round((r[5] or 0) / total_fat * 100, 2)}
         for r in mix_raw
     ]
 
-    # Evolução de vendas
-    cursor.execute(f"""
-        SELECT
-            DATE(s.created_at) AS data,
-            SUM(ps.total_price) AS valor
-        FROM product_sales ps
-        JOIN sales s ON ps.sale_id = s.id
-        JOIN products p ON ps.product_id = p.id
-        {where_clause}
-        GROUP BY DATE(s.created_at)
-        ORDER BY data
-    """, params)
-    evolucao_raw = cursor.fetchall()
     evolucao_vendas = [
-        {"data": str(r[0]).split('.')[0] if r[0] else None, "valor": float(r[1] or 0)}
-        for r in evolucao_raw
+        {"data": str(r[3]).split('.')[0] if r[3] else None, "valor": float(r[5] or 0)}
+        for r in sorted(secoes.get("dia", []), key=lambda r: r[3])
     ]
 
-    cursor.close()
-    conn.close()
-
     return {
         "pagina": page,
         "limit": limit,
@@ -230,3 +185,28 @@ def get_produtos_analitico(page: int = 1, limit: int = 20, start_date=None, end_
         "mix_categorias": mix_categorias,
         "evolucao_vendas": evolucao_vendas
     }
+
+
+def get_produtos_analitico(page: int = 1, limit: int = 20, start_date=None, end_date=None,
+                           store_id=None, channel_id=None, category_id=None,
+                           weekday=None, start_hour=None, end_hour=None):
+    """
+    Retorna uma visão analítica de produtos, com KPIs, faturamento, margem,
+    produtos mais vendidos, lucrativos e evolução de vendas.
+    Aceita múltiplos filtros dinâmicos e aplica paginação.
+    """
+    consultas = _consultas_produtos_analitico(
+        page, limit, start_date, end_date, store_id, channel_id,
+        category_id, weekday, start_hour, end_hour
+    )
+    return _monta_produtos_analitico(executa_consultas(consultas), page, limit)
+
+
+async def get_produtos_analitico_async(page: int = 1, limit: int = 20, start_date=None, end_date=None,
+                                       store_id=None, channel_id=None, category_id=None,
+                                       weekday=None, start_hour=None, end_hour=None):
+    consultas = _consultas_produtos_analitico(
+        page, limit, start_date, end_date, store_id, channel_id,
+        category_id, weekday, start_hour, end_hour
+    )
+    return _monta_produtos_analitico(await executa_consultas_async(consultas), page, limit)
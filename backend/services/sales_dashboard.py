@@ -1,196 +1,273 @@
-from connection import conecta
+import colunar
+from consultas import Consulta, executa_consultas, executa_consultas_async, separa_secoes
+from filtros_sql import filtros_vendas, where
+from rollups import fonte_vendas
+import base64
+import json
 import math
+from datetime import datetime
 
-def get_dashboard_sales(
+
+def codifica_cursor(created_at, sale_id):
+    """
+    Cursor opaco com a posição (created_at, id) do último pedido da página.
+    """
+    posicao = json.dumps([created_at.isoformat(), sale_id])
+    return base64.urlsafe_b64encode(posicao.encode()).decode().rstrip("=")
+
+
+def decodifica_cursor(cursor):
+    """
+    (created_at, id) de um cursor de `codifica_cursor`. Qualquer outro valor,
+    inclusive uma data que não seja ISO, vira ValueError (400 na rota).
+    """
+    try:
+        posicao = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, sale_id = json.loads(posicao)
+        return datetime.fromisoformat(created_at), int(sale_id)
+    except (ValueError, TypeError):
+        raise ValueError("cursor inválido")
+
+
+def _sql_pedidos(where_sql, paginacao=""):
+    """
+    Lista de pedidos, do mais recente para o mais antigo. Colunas: id,
+    created_at, cliente, loja, canal, valor, status.
+    """
+    return f"""
+        SELECT
+            s.id,
+            s.created_at,
+            COALESCE(NULLIF(TRIM(c.customer_name), ''), 'Cliente não identificado') AS cliente,
+            COALESCE(st.name, '') AS loja,
+            COALESCE(ch.name, '') AS canal,
+            COALESCE(s.total_amount, 0)::numeric AS valor,
+            COALESCE(s.sale_status_desc, '') AS status
+        FROM sales s
+        LEFT JOIN customers c ON s.customer_id = c.id
+        LEFT JOIN stores st ON s.store_id = st.id
+        LEFT JOIN channels ch ON s.channel_id = ch.id
+        {where_sql}
+        ORDER BY s.created_at DESC, s.id DESC
+        {paginacao};
+    """
+
+
+def consulta_exportacao_pedidos(
+    start_date=None, end_date=None,
+    store_id=None, channel_id=None,
+    weekday=None, start_hour=None, end_hour=None
+):
+    """
+    Todos os pedidos dos filtros de /dashboard/sales, sem paginação (para
+    leitura em lotes por um cursor no servidor).
+    """
+    filtros, params = filtros_vendas(
+        "s.created_at", start_date, end_date, store_id, channel_id, weekday, start_hour, end_hour
+    )
+    return Consulta("exportacao", _sql_pedidos(where(filtros)), tuple(params))
+
+
+def _consultas_dashboard_sales(
     start_date=None, end_date=None,
     store_id=None, channel_id=None,
     weekday=None, start_hour=None, end_hour=None,
-    page=1, limit=20
+    page=1, limit=20, cursor=None, total_exato=False
 ):
-    conn = conecta()
-    cursor = conn.cursor()
+    offset = (page - 1) * limit
 
-    try:
-        
-        # Filtros dinâmicos
-        filtros = []
-        params = []
-
-        if start_date and end_date:
-            filtros.append("s.created_at BETWEEN %s AND %s")
-            params += [f"{start_date} 00:00:00", f"{end_date} 23:59:59"]
-
-        if store_id:
-            filtros.append("s.store_id = %s")
-            params.append(store_id)
-
-        if channel_id:
-            filtros.append("s.channel_id = %s")
-            params.append(channel_id)
-
-        if weekday is not None:
-            filtros.append("EXTRACT(DOW FROM s.created_at) = %s")
-            params.append(weekday)
-
-        if start_hour is not None:
-            filtros.append("EXTRACT(HOUR FROM s.created_at) >= %s")
-            params.append(start_hour)
-
-        if end_hour is not None:
-            filtros.append("EXTRACT(HOUR FROM s.created_at) <= %s")
-            params.append(end_hour)
-
-        where_clause = f"WHERE {' AND '.join(filtros)}" if filtros else ""
-
-        # KPIs principais
-        kpis_sql = f"""
-            SELECT
-                COUNT(*)::int AS total_pedidos,
-                COALESCE(SUM(s.total_amount), 0)::numeric AS faturamento_total,
-                COALESCE(ROUND(AVG(s.total_amount)::numeric, 2), 0) AS ticket_medio,
-                COALESCE(ROUND(
-                    SUM(CASE WHEN s.sale_status_desc = 'CANCELLED' THEN 1 ELSE 0 END)::numeric * 100.0 / NULLIF(COUNT(*), 0),
-                2), 0) AS taxa_cancelamento
-            FROM sales s
-            {where_clause};
-        """
-        cursor.execute(kpis_sql, tuple(params))
-        total_pedidos, faturamento_total, ticket_medio, taxa_cancelamento = cursor.fetchone()
-
-        kpis = {
-            "total_pedidos": int(total_pedidos or 0),
-            "faturamento_total": float(faturamento_total or 0),
-            "ticket_medio": float(ticket_medio or 0),
-            "taxa_cancelamento": float(taxa_cancelamento or 0),
+    # Agregados vêm do rollup por hora quando disponível; a lista de pedidos
+    # sempre consulta `sales`. Os filtros são os mesmos, sobre a coluna de
+    # data de cada fonte
+    fonte = fonte_vendas()
+    data = fonte["data"]
+    filtros_agregados, params = filtros_vendas(
+        data, start_date, end_date, store_id, channel_id, weekday, start_hour, end_hour
+    )
+    filtros, _ = filtros_vendas(
+        "s.created_at", start_date, end_date, store_id, channel_id, weekday, start_hour, end_hour
+    )
+    params = tuple(params)
+    where_agregados = where(filtros_agregados)
+    where_pedidos = where(filtros)
+
+    # Paginação por cursor (keyset): continua depois do último pedido da
+    # página anterior, sem OFFSET; sem cursor, mantém page/limit
+    filtros_pagina = list(filtros)
+    params_pagina = params
+    paginacao = "LIMIT %s OFFSET %s"
+    params_limite = (limit + 1, offset)
+    if cursor:
+        # `created_at <= ...` repete o limite da comparação de linha de forma
+        # que o planejador consegue usar para podar partições mais recentes
+        created_at, sale_id = decodifica_cursor(cursor)
+        filtros_pagina.append("s.created_at <= %s AND (s.created_at, s.id) < (%s, %s)")
+        params_pagina = params + (created_at, created_at, sale_id)
+        paginacao = "LIMIT %s"
+        params_limite = (limit + 1,)
+    where_pagina = where(filtros_pagina)
+
+    # KPIs, faturamento diário, canais, dia da semana e hora em uma única
+    # varredura; cada grouping set vira uma seção da resposta
+    agregados_sql = f"""
+        SELECT
+            CASE
+                WHEN GROUPING(DATE({data})) = 0 THEN 'dia'
+                WHEN GROUPING(ch.name) = 0 THEN 'canal'
+                WHEN GROUPING(TO_CHAR({data}, 'Day')) = 0 THEN 'semana'
+                WHEN GROUPING(DATE_TRUNC('hour', {data})) = 0 THEN 'hora'
+                ELSE 'total'
+            END AS secao,
+            DATE({data}) AS data,
+            ch.name AS canal,
+            TO_CHAR({data}, 'Day') AS dia_semana,
+            TO_CHAR({data}, 'D')::int AS ordem_semana,
+            DATE_TRUNC('hour', {data}) AS hora,
+            COALESCE({fonte['pedidos']}, 0)::int AS total_pedidos,
+            COALESCE({fonte['faturamento']}, 0)::numeric AS faturamento,
+            COALESCE(ROUND({fonte['faturamento']}::numeric / NULLIF({fonte['pedidos']}, 0), 2), 0) AS ticket_medio,
+            COALESCE(ROUND(
+                {fonte['cancelados']}::numeric * 100.0 / NULLIF({fonte['pedidos']}, 0),
+            2), 0) AS taxa_cancelamento
+        FROM {fonte['tabela']}
+        LEFT JOIN channels ch ON s.channel_id = ch.id
+        {where_agregados}
+        GROUP BY GROUPING SETS (
+            (),
+            (DATE({data})),
+            (ch.name),
+            (TO_CHAR({data}, 'Day'), TO_CHAR({data}, 'D')::int),
+            (DATE_TRUNC('hour', {data}))
+        );
+    """
+
+    # Lista de pedidos
+    pedidos_sql = _sql_pedidos(where_pagina, paginacao)
+
+    consultas = [
+        Consulta("agregados", agregados_sql, params),
+        Consulta("pedidos", pedidos_sql, params_pagina + params_limite),
+    ]
+
+    # O total padrão vem da linha de totais dos agregados (rollup, quando
+    # disponível, e portanto atualizado até o último refresh); a contagem
+    # exata sobre `sales` é opcional
+    if total_exato:
+        consultas.append(Consulta("contagem", f"SELECT COUNT(*) FROM sales s {where_pedidos}", params, "one"))
+
+    return consultas
+
+
+def _monta_dashboard_sales(resultados, page=1, limit=20):
+    # Colunas: data, canal, dia_semana, ordem_semana, hora,
+    #          total_pedidos, faturamento, ticket_medio, taxa_cancelamento
+    secoes = separa_secoes(resultados["agregados"])
+    total = secoes["total"][0]
+
+    kpis = {
+        "total_pedidos": int(total[5] or 0),
+        "faturamento_total": float(total[6] or 0),
+        "ticket_medio": float(total[7] or 0),
+        "taxa_cancelamento": float(total[8] or 0),
+    }
+
+    faturamento_diario = [
+        {"data": str(r[0]), "faturamento": float(r[6])}
+        for r in sorted(secoes.get("dia", []), key=lambda r: r[0])
+    ]
+
+    vendas_por_canal = [
+        {"canal": r[1] or "Desconhecido", "total": int(r[5])}
+        for r in sorted(secoes.get("canal", []), key=lambda r: r[5], reverse=True)
+    ]
+
+    if "contagem" in resultados:
+        total_registros = int(resultados["contagem"][0])
+    else:
+        total_registros = int(total[5] or 0)
+    total_paginas = math.ceil(total_registros / limit) if limit else 1
+
+    pedidos = [
+        {
+            "id": int(r[0]),
+            "data": str(r[1]).split('.')[0] if r[1] else None,
+            "cliente": r[2],
+            "loja": r[3],
+            "canal": r[4],
+            "valor": float(r[5]),
+            "status": r[6],
         }
+        for r in resultados["pedidos"][:limit]
+    ]
 
-        # Faturamento diário (timeseries)
-        tendencia_sql = f"""
-            SELECT
-                DATE(s.created_at) AS data,
-                COALESCE(SUM(s.total_amount), 0)::numeric AS faturamento
-            FROM sales s
-            {where_clause}
-            GROUP BY DATE(s.created_at)
-            ORDER BY data;
-        """
-        cursor.execute(tendencia_sql, tuple(params))
-        faturamento_diario = [
-            {"data": str(r[0]), "faturamento": float(r[1])} for r in cursor.fetchall()
-        ]
-
-        # Vendas por canal
-        canais_sql = f"""
-            SELECT
-                COALESCE(ch.name, 'Desconhecido') AS canal,
-                COUNT(*)::int AS total
-            FROM sales s
-            LEFT JOIN channels ch ON s.channel_id = ch.id
-            {where_clause}
-            GROUP BY ch.name
-            ORDER BY total DESC;
-        """
-        cursor.execute(canais_sql, tuple(params))
-        vendas_por_canal = [
-            {"canal": canal, "total": int(total)}
-            for canal, total in cursor.fetchall()
-        ]
-
-        # Paginação
-        count_sql = f"SELECT COUNT(*) FROM sales s {where_clause};"
-        cursor.execute(count_sql, tuple(params))
-        total_registros = cursor.fetchone()[0]
-        total_paginas = math.ceil(total_registros / limit) if limit else 1
-        offset = (page - 1) * limit
-
-        # Lista de pedidos
-        pedidos_sql = f"""
-            SELECT
-                s.id,
-                s.created_at,
-                COALESCE(NULLIF(TRIM(c.customer_name), ''), 'Cliente não identificado') AS cliente,
-                COALESCE(st.name, '') AS loja,
-                COALESCE(ch.name, '') AS canal,
-                COALESCE(s.total_amount, 0)::numeric AS valor,
-                COALESCE(s.sale_status_desc, '') AS status
-            FROM sales s
-            LEFT JOIN customers c ON s.customer_id = c.id
-            LEFT JOIN stores st ON s.store_id = st.id
-            LEFT JOIN channels ch ON s.channel_id = ch.id
-            {where_clause}
-            ORDER BY s.created_at DESC
-            LIMIT %s OFFSET %s;
-        """
-        cursor.execute(pedidos_sql, tuple(params) + (limit, offset))
-        pedidos = [
-            {
-                "id": int(r[0]),
-                "data": str(r[1]).split('.')[0] if r[1] else None,
-                "cliente": r[2],
-                "loja": r[3],
-                "canal": r[4],
-                "valor": float(r[5]),
-                "status": r[6],
-            }
-            for r in cursor.fetchall()
-        ]
-
-        # Vendas por dia da semana
-        semana_sql = f"""
-            SELECT 
-                TO_CHAR(s.created_at, 'Day') AS dia_semana,
-                TO_CHAR(s.created_at, 'D')::int AS ordem_semana,
-                COUNT(*)::int AS total_pedidos,
-                COALESCE(SUM(s.total_amount), 0)::numeric AS faturamento
-            FROM sales s
-            {where_clause}
-            GROUP BY dia_semana, ordem_semana
-            ORDER BY ordem_semana;
-        """
-        cursor.execute(semana_sql, tuple(params))
-        vendas_por_dia = [
-            {
-                "dia": r[0].strip(),
-                "total": int(r[2]),
-                "faturamento": float(r[3])
-            }
-            for r in cursor.fetchall()
-        ]
-
-        # Vendas por hora
-        hora_sql = f"""
-            SELECT 
-                DATE_TRUNC('hour', s.created_at) AS hora,
-                COUNT(*)::int AS total,
-                COALESCE(SUM(s.total_amount), 0)::numeric AS faturamento
-            FROM sales s
-            {where_clause}
-            GROUP BY 1
-            ORDER BY hora;
-        """
-        cursor.execute(hora_sql, tuple(params))
-        vendas_por_hora = [
-            {
-                "hora": str(r[0]).split('.')[0] if r[0] else None,
-                "total": int(r[1]),
-                "faturamento": float(r[2]),
-            }
-            for r in cursor.fetchall()
-        ]
-
-        # Retorno final
-        return {
-            "kpis": kpis,
-            "faturamento_diario": faturamento_diario,
-            "vendas_por_canal": vendas_por_canal,
-            "pedidos": pedidos,
-            "pagina": page,
-            "total_paginas": total_paginas,
-            "total_registros": total_registros,
-            "vendas_por_dia_semana": vendas_por_dia,
-            "vendas_por_horario": vendas_por_hora,
+    # Uma linha a mais que o limite indica que há próxima página
+    linhas = resultados["pedidos"]
+    next_cursor = codifica_cursor(linhas[limit - 1][1], linhas[limit - 1][0]) if len(linhas) > limit else None
+
+    vendas_por_dia = [
+        {
+            "dia": r[2].strip(),
+            "total": int(r[5]),
+            "faturamento": float(r[6])
+        }
+        for r in sorted(secoes.get("semana", []), key=lambda r: r[3])
+    ]
+
+    vendas_por_hora = [
+        {
+            "hora": str(r[4]).split('.')[0] if r[4] else None,
+            "total": int(r[5]),
+            "faturamento": float(r[6]),
         }
+        for r in sorted(secoes.get("hora", []), key=lambda r: r[4])
+    ]
+
+    # Retorno final
+    return {
+        "kpis": kpis,
+        "faturamento_diario": faturamento_diario,
+        "vendas_por_canal": vendas_por_canal,
+        "pedidos": pedidos,
+        "next_cursor": next_cursor,
+        "pagina": page,
+        "total_paginas": total_paginas,
+        "total_registros": total_registros,
+        "vendas_por_dia_semana": vendas_por_dia,
+        "vendas_por_horario": vendas_por_hora,
+    }
+
 
-    finally:
-        cursor.close()
-        conn.close()
+def get_dashboard_sales(
+    start_date=None, end_date=None,
+    store_id=None, channel_id=None,
+    weekday=None, start_hour=None, end_hour=None,
+    page=1, limit=20, cursor=None, total_exato=False
+):
+    consultas = _consultas_dashboard_sales(
+        start_date, end_date, store_id, channel_id,
+        weekday, start_hour, end_hour, page, limit, cursor, total_exato
+    )
+    # Agregados do motor colunar, quando carregado; os pedidos vêm do banco
+    resultados = colunar.resultados_sales(
+        start_date, end_date, store_id, channel_id, weekday, start_hour, end_hour, total_exato
+    )
+    resultados.update(executa_consultas(colunar.pendentes(consultas, resultados)))
+    return _monta_dashboard_sales(resultados, page, limit)
+
+
+async def get_dashboard_sales_async(
+    start_date=None, end_date=None,
+    store_id=None, channel_id=None,
+    weekday=None, start_hour=None, end_hour=None,
+    page=1, limit=20, cursor=None, total_exato=False
+):
+    consultas = _consultas_dashboard_sales(
+        start_date, end_date, store_id, channel_id,
+        weekday, start_hour, end_hour, page, limit, cursor, total_exato
+    )
+    resultados = await colunar.resultados_async(
+        colunar.resultados_sales,
+        start_date, end_date, store_id, channel_id, weekday, start_hour, end_hour, total_exato
+    )
+    resultados.update(await executa_consultas_async(colunar.pendentes(consultas, resultados)))
+    return _monta_dashboard_sales(resultados, page, limit)
@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Os módulos do backend são importados como no uvicorn: a partir de backend/
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture(scope="session")
+def banco():
+    """
+    Conexão do pool com o banco configurado no .env; pula o teste se ele
+    não estiver acessível ou não tiver vendas.
+    """
+    from psycopg2 import OperationalError
+    from connection import obter_conexao
+
+    try:
+        with obter_conexao() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT MIN(created_at)::date, MAX(created_at)::date FROM sales")
+                inicio, fim = cursor.fetchone()
+            conn.rollback()
+    except OperationalError as e:
+        pytest.skip(f"banco indisponível: {e}")
+    if inicio is None:
+        pytest.skip("banco sem vendas: rode python -m benchmarks.carga --semear media")
+    return inicio, fim
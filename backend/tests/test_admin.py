@@ -0,0 +1,108 @@
+"""
+Rotas /admin: desligadas sem `admin_token`, 401 sem o token correto (o
+DELETE /admin/cache não esvazia o cache), 409 para uma recarga do motor
+colunar no meio de outra e sem os valores dos parâmetros nas consultas
+lentas, salvo `parametros=true`.
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import autenticacao
+import cache
+import colunar
+from main import app
+from routes import admin_routes
+
+TOKEN = "segredo-de-teste"
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    monkeypatch.setattr(autenticacao, "ADMIN_TOKEN", TOKEN)
+    return TestClient(app)
+
+
+def test_rotas_admin_desligadas_sem_token_configurado(monkeypatch):
+    monkeypatch.setattr(autenticacao, "ADMIN_TOKEN", "")
+    cliente = TestClient(app)
+    assert cliente.get("/admin/cache").status_code == 404
+    assert cliente.get("/admin/cache", headers={"Authorization": "Bearer "}).status_code == 404
+
+
+@pytest.mark.parametrize("metodo, rota", [
+    ("get", "/admin/pool"),
+    ("get", "/admin/cache"),
+    ("delete", "/admin/cache"),
+    ("get", "/admin/coalescencia"),
+    ("get", "/admin/colunar"),
+    ("post", "/admin/colunar/recarga"),
+    ("get", "/admin/consultas-lentas"),
+])
+@pytest.mark.parametrize("cabecalho", [None, "Bearer errado", TOKEN, f"Basic {TOKEN}"])
+def test_rotas_admin_exigem_token(cliente, metodo, rota, cabecalho):
+    headers = {"Authorization": cabecalho} if cabecalho else {}
+    resposta = getattr(cliente, metodo)(rota, headers=headers)
+    assert resposta.status_code == 401
+    assert resposta.headers["www-authenticate"] == "Bearer"
+
+
+def test_rota_admin_com_token(cliente):
+    resposta = cliente.get("/admin/cache", headers={"Authorization": f"Bearer {TOKEN}"})
+    assert resposta.status_code == 200
+
+
+def test_limpeza_do_cache_exige_token(cliente):
+    if cache.CACHE_BACKEND != "memoria":
+        pytest.skip("o teste usa o cache em memória")
+
+    async def calcula():
+        return {"total": 1}
+
+    asyncio.run(cache.em_cache("teste_admin", {"store_id": 1}, calcula))
+    assert cache.estatisticas_cache()["itens"] >= 1
+
+    assert cliente.delete("/admin/cache").status_code == 401
+    assert cliente.delete("/admin/cache", headers={"Authorization": "Bearer errado"}).status_code == 401
+    assert cache.estatisticas_cache()["itens"] >= 1
+
+    resposta = cliente.delete("/admin/cache", headers={"Authorization": f"Bearer {TOKEN}"})
+    assert resposta.status_code == 200
+    assert resposta.json()["itens"] == 0
+
+
+def test_recarga_colunar_concorrente_responde_409(cliente, monkeypatch):
+    recargas = []
+    monkeypatch.setattr(admin_routes, "disponivel", lambda: True)
+    monkeypatch.setattr(colunar, "atualiza_colunar_pool", lambda recarregar=False: recargas.append(recarregar) or (0, 0))
+    headers = {"Authorization": f"Bearer {TOKEN}"}
+
+    with colunar._recarga_lock:
+        resposta = cliente.post("/admin/colunar/recarga", headers=headers)
+        assert resposta.status_code == 409
+        assert resposta.json()["detail"] == "Recarga do motor colunar já em andamento"
+        assert colunar.estatisticas_colunar()["recarregando"]
+    assert recargas == []
+
+    assert cliente.post("/admin/colunar/recarga", headers=headers).status_code == 200
+    assert recargas == [True]
+    assert not colunar.estatisticas_colunar()["recarregando"]
+
+
+def test_consultas_lentas_omitem_parametros(cliente, monkeypatch):
+    entrada = {
+        "momento": "2025-01-01T00:00:00.000+00:00", "rota": "/dashboard/sales", "secao": "pedidos",
+        "forma": "abc", "duracao_ms": 900.0, "linhas": 20, "sql": "SELECT ...", "params": [7, "2025-01-01"],
+    }
+    monkeypatch.setattr(admin_routes, "le_entradas", lambda *args: [dict(entrada)])
+    headers = {"Authorization": f"Bearer {TOKEN}"}
+
+    corpo = cliente.get("/admin/consultas-lentas", headers=headers).json()
+    assert "params" not in corpo["entradas"][0]
+    assert "exemplo_params" not in corpo["resumo"][0]
+
+    corpo = cliente.get("/admin/consultas-lentas", params={"parametros": "true"}, headers=headers).json()
+    assert corpo["entradas"][0]["params"] == [7, "2025-01-01"]
+    assert corpo["resumo"][0]["exemplo_params"] == [7, "2025-01-01"]
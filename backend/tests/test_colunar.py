@@ -0,0 +1,94 @@
+"""
+O motor colunar tem de devolver o mesmo que as consultas SQL que ele
+substitui, para toda combinação de filtros dos serviços.
+
+Requer numpy e um banco semeado (python -m benchmarks.carga --semear
+pequena); sem eles, os testes são pulados. Rode a partir de backend/:
+    python -m pytest tests
+"""
+
+import itertools
+import json
+from datetime import timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import colunar
+from particoes import detecta_particoes
+from rollups import detecta_rollups
+from services.dashboard_service import get_dashboard_overview
+from services.sales_dashboard import get_dashboard_sales
+from services.unidades_service import get_unidades_overview
+
+
+def _normaliza(valor):
+    # Empates não têm ordem definida no SQL e somas em float8 variam no
+    # último dígito conforme a ordem em que as linhas são somadas
+    if isinstance(valor, float):
+        return float(f"{valor:.12g}")
+    if isinstance(valor, dict):
+        return {chave: _normaliza(v) for chave, v in valor.items()}
+    if isinstance(valor, list):
+        return sorted((_normaliza(v) for v in valor), key=lambda v: json.dumps(v, sort_keys=True, default=str))
+    return valor
+
+
+def _periodos(inicio, fim):
+    return [
+        {},
+        {"start_date": str(fim - timedelta(days=9)), "end_date": str(fim)},
+        {"start_date": str(inicio), "end_date": str(inicio + timedelta(days=60))},
+        {"start_date": str(fim), "end_date": str(fim)},
+        {"start_date": str(fim + timedelta(days=365)), "end_date": str(fim + timedelta(days=366))},
+    ]
+
+
+def _casos(inicio, fim):
+    periodos = _periodos(inicio, fim)
+    for periodo, loja, canal in itertools.product(periodos, (None, 1, 7), (None, 2)):
+        yield get_dashboard_overview, dict(periodo, store_id=loja, channel_id=canal)
+    for periodo, loja, canal, dia, horas in itertools.product(
+            periodos, (None, 3), (None, 1), (None, 5), ((None, None), (11, 14))):
+        yield get_dashboard_sales, dict(periodo, store_id=loja, channel_id=canal, weekday=dia,
+                                        start_hour=horas[0], end_hour=horas[1], total_exato=True)
+    for periodo, status, canal, pagina in itertools.product(periodos, (None, "ativa", "inativa"), (None, 3), (1, 2)):
+        yield get_unidades_overview, dict(periodo, page=pagina, limit=20, status=status, channel_id=canal)
+
+
+@pytest.fixture(scope="module")
+def carregado(banco):
+    detecta_particoes()
+    detecta_rollups()
+    colunar.recarrega_colunar()
+    yield banco
+    colunar._dados = None
+
+
+def _sem_colunar(funcao, argumentos):
+    dados = colunar._dados
+    colunar._dados = None
+    try:
+        return funcao(**argumentos)
+    finally:
+        colunar._dados = dados
+
+
+def test_colunar_igual_sql(carregado):
+    diferencas = []
+    for funcao, argumentos in _casos(*carregado):
+        resultado = funcao(**argumentos)
+        esperado = _sem_colunar(funcao, argumentos)
+        if _normaliza(resultado) != _normaliza(esperado):
+            diferencas.append(f"{funcao.__name__}({argumentos})")
+    assert not diferencas, "\n".join(diferencas)
+
+
+def test_itens_sem_venda_carregada():
+    ids_vendas = np.array([10, 20, 30], dtype=np.int32)
+    vendas_dos_itens = np.array([20, 15, 30, 35, 10], dtype=np.int32)
+    posicoes, encontrados = colunar._posicoes(ids_vendas, vendas_dos_itens)
+    # 15 e 35 não estão carregadas: não podem cair na venda 20 nem além do fim
+    assert encontrados.tolist() == [True, False, True, False, True]
+    assert posicoes[encontrados].tolist() == [1, 2, 0]
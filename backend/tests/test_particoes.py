@@ -0,0 +1,52 @@
+"""
+A retenção (particoes.py --descartar-antes) tira os meses descartados das
+tabelas brutas e dos rollups juntos: depois dela, os dashboards dão o mesmo
+resultado pelas duas fontes.
+
+Roda sobre um banco particionado e com rollups, com ao menos dois meses de
+vendas. A retenção é feita numa transação desfeita no fim do teste.
+"""
+
+from datetime import date
+
+import pytest
+
+import rollups
+from connection import obter_conexao
+from particoes import _descarta, detecta_particoes
+from services.dashboard_service import _consultas_dashboard_overview
+
+
+def _resultados(cursor):
+    resultados = {}
+    for consulta in _consultas_dashboard_overview():
+        cursor.execute(consulta.sql, consulta.params or None)
+        linhas = cursor.fetchall()
+        if consulta.nome == "top_produtos":
+            # Receita do rollup é FLOAT; empates podem trocar a ordem
+            linhas = [(round(float(receita), 2), quantidade) for _, quantidade, receita in linhas]
+        resultados[consulta.nome] = sorted(linhas, key=repr)
+    return resultados
+
+
+def test_retencao_tira_os_meses_dos_rollups(banco, monkeypatch):
+    inicio, fim = banco
+    antes = date(inicio.year + inicio.month // 12, inicio.month % 12 + 1, 1)
+    if not detecta_particoes():
+        pytest.skip("tabelas não particionadas (migration 004)")
+    monkeypatch.setattr(rollups, "ROLLUPS", True)
+    if not rollups.detecta_rollups():
+        pytest.skip("rollups não populados")
+    if antes > fim:
+        pytest.skip("o banco tem um mês só de vendas")
+
+    with obter_conexao() as conn, conn.cursor() as cursor:
+        try:
+            assert _descarta(cursor, antes)
+            com_rollups = _resultados(cursor)
+            rollups._marca_disponiveis(False)
+            brutas = _resultados(cursor)
+        finally:
+            conn.rollback()
+            rollups.detecta_rollups()
+    assert com_rollups == brutas
@@ -0,0 +1,103 @@
+"""
+Toda combinação de filtros que as rotas aceitam, com um filtro seletivo
+(loja ou período), lê `sales` por índice ou pela poda de partições; dia da
+semana e hora juntos usam os índices de expressão da migration 003. Vale
+para os dois ambientes: rollups e tabelas brutas.
+
+Também confere o resultado de um período com só uma das datas: filtros_sql
+aplica `start_date` ou `end_date` sozinhos (antes, o período só valia com
+as duas).
+
+Os planos dependem do volume: use um banco semeado na escala média
+(python -m benchmarks.carga --semear media). Sem banco, o teste é pulado.
+"""
+
+from datetime import timedelta
+
+import pytest
+
+import planos
+import rollups
+from connection import obter_conexao
+from particoes import detecta_particoes
+from services.dashboard_service import get_dashboard_overview
+from services.sales_dashboard import get_dashboard_sales
+from services.unidades_service import get_unidades_overview
+
+# Consultas cujo plano lê `sales` pelo índice de expressão (DOW ou HOUR) no
+# banco de escala média, com e sem rollups
+COM_INDICE_EXPRESSAO = [
+    ("sales / dia+hora / pedidos", "dow"),
+    ("produtos_analitico / dia+hora / agregados", "dow"),
+    ("produtos_analitico / canal+hora / agregados", "hour"),
+]
+
+
+@pytest.fixture
+def ambiente(monkeypatch, request):
+    monkeypatch.setattr(rollups, "ROLLUPS", request.param)
+    detecta_particoes()
+    rollups.detecta_rollups()
+    yield
+    monkeypatch.undo()
+    rollups.detecta_rollups()
+
+
+def _indices_expressao(conn, campo):
+    # idx_sales_dow_created_at e, com as tabelas particionadas, os índices
+    # das partições (sales_pAAAA_MM_extract_created_at_idx, ..._idx1), com
+    # o nome que o resumo do plano mostra
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname FROM pg_indexes WHERE tablename ~ '^sales' AND indexdef ILIKE %s",
+            (f"%(EXTRACT({campo} FROM created_at), created_at)%",))
+        nomes = {planos._sem_particao(nome) for (nome,) in cursor.fetchall()}
+    conn.rollback()
+    return nomes
+
+
+@pytest.mark.parametrize("ambiente", [True, False], ids=["rollups", "bruto"], indirect=True)
+def test_filtros_seletivos_usam_indice(banco, ambiente):
+    with obter_conexao() as conn:
+        _, sem_indice = planos.planos_atuais(conn)
+    assert not sem_indice, "\n".join(f"{chave}: Seq Scan em {', '.join(leituras)}"
+                                     for chave, leituras in sem_indice.items())
+
+
+@pytest.mark.parametrize("ambiente", [True, False], ids=["rollups", "bruto"], indirect=True)
+def test_dia_e_hora_usam_indices_de_expressao(banco, ambiente):
+    with obter_conexao() as conn:
+        indices = {campo: _indices_expressao(conn, campo) for campo in ("dow", "hour")}
+        atuais, _ = planos.planos_atuais(conn, ("sales", "produtos_analitico"))
+    assert all(indices.values()), "índices da migration 003 ausentes: rode python migrate.py"
+    for chave, campo in COM_INDICE_EXPRESSAO:
+        nos = atuais[chave]["nos"]
+        assert any(no.endswith(f"({indice})") for no in nos for indice in indices[campo]), f"{chave}: {nos}"
+
+
+@pytest.mark.parametrize("ambiente", [True, False], ids=["rollups", "bruto"], indirect=True)
+def test_periodo_com_uma_so_data(banco, ambiente):
+    inicio, fim = banco
+    limites = [
+        ({"start_date": str(fim - timedelta(days=20))}, "created_at >= %s", fim - timedelta(days=20)),
+        ({"end_date": str(inicio + timedelta(days=20))}, "created_at < %s", inicio + timedelta(days=21)),
+    ]
+    with obter_conexao() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM sales")
+            (total,) = cursor.fetchone()
+            esperados = []
+            for _, predicado, data in limites:
+                cursor.execute(f"SELECT COUNT(*), COALESCE(SUM(total_amount), 0) FROM sales WHERE {predicado}",
+                               (data,))
+                esperados.append(cursor.fetchone())
+        conn.rollback()
+
+    for (periodo, _, _), (pedidos, faturamento) in zip(limites, esperados):
+        assert 0 < pedidos < total, periodo
+        overview = get_dashboard_overview(**periodo)["kpis"]
+        sales = get_dashboard_sales(**periodo, limit=1, total_exato=True)
+        unidades = get_unidades_overview(page=1, limit=1, **periodo)["kpis"]
+        assert overview["total_pedidos"] == sales["kpis"]["total_pedidos"] == sales["total_registros"] == pedidos
+        for kpis in (overview, sales["kpis"], unidades):
+            assert kpis["faturamento_total"] == pytest.approx(float(faturamento), abs=0.01), periodo
@@ -0,0 +1,43 @@
+"""
+Cursor da paginação de pedidos de /dashboard/sales: um cursor que não veio
+de `codifica_cursor` é recusado com 400, antes de chegar ao banco.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from services.sales_dashboard import codifica_cursor, decodifica_cursor
+
+
+def _cursor(posicao):
+    return base64.urlsafe_b64encode(json.dumps(posicao).encode()).decode().rstrip("=")
+
+
+def test_cursor_ida_e_volta():
+    created_at = datetime(2025, 6, 15, 23, 56, 48, 120000)
+    assert decodifica_cursor(codifica_cursor(created_at, 42)) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", [
+    "WyJ4eCIsMV0",                       # ["xx", 1]: data inválida
+    _cursor(["2025-06-15T23:56:48", "x"]),
+    _cursor([None, 1]),
+    _cursor(["2025-06-15T23:56:48"]),
+    _cursor(5),
+    "não é base64",
+])
+def test_cursor_malformado(cursor):
+    with pytest.raises(ValueError, match="cursor inválido"):
+        decodifica_cursor(cursor)
+
+
+def test_cursor_malformado_responde_400(banco):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    resposta = TestClient(app).get("/dashboard/sales", params={"cursor": "WyJ4eCIsMV0"})
+    assert resposta.status_code == 400
+    assert resposta.json()["detail"] == "cursor inválido"
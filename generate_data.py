@@ -4,14 +4,36 @@ God Level Coder Challenge - Data Generator
 Generates realistic restaurant data based on Arcca's actual models
 """
 
+import gzip
+import io
+import json
+import os
 import random
+import re
+import tempfile
 import argparse
+import multiprocessing
+import time
 from datetime import datetime, timedelta
+from collections import deque
 from decimal import Decimal
+from itertools import accumulate
 import psycopg2
-from psycopg2.extras import execute_batch
+from psycopg2.extras import execute_batch, execute_values
 from faker import Faker
 
+try:
+    import numpy as np
+except ImportError:  # the vectorized engine is optional
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # only needed for --export-format parquet
+    pa = None
+
 fake = Faker('pt_BR')
 
 # Configurations
@@ -308,91 +330,409 @@ def generate_customers(conn, num_customers=10000):
     return customer_ids
 
 
-def generate_sales(conn, stores, channels, products, items, option_groups, customers, months=6):
+def day_multiplier(current_date, ctx):
+    """Weekday pattern plus the anomaly week and the promo day"""
+    day_mult = WEEKDAY_MULT[current_date.weekday()]
+    
+    # Anomaly: bad week
+    if ctx['anomaly_week'] <= current_date < ctx['anomaly_week'] + timedelta(days=7):
+        day_mult *= 0.7
+    
+    # Anomaly: promo day
+    if current_date.date() == ctx['promo_day'].date():
+        day_mult *= 3.0
+    
+    return day_mult
+
+
+def generate_day_sales(day_index, current_date, ctx):
+    """Generate one day of sales.
+
+    The RNGs are reseeded from (seed, day_index) before each day, so a day's
+    sales depend only on the run seed - not on worker count or scheduling.
+    """
+    day_seed = f"{ctx['seed']}:{day_index}"
+    random.seed(day_seed)
+    fake.seed_instance(day_seed)
+    
+    stores, channels, customers = ctx['stores'], ctx['channels'], ctx['customers']
+    
+    daily_sales = int(random.gauss(2700, 400) * day_multiplier(current_date, ctx))
+    
+    # Cumulative weights are computed once; random.choices would rebuild
+    # them from `weights` on every call (same draws either way)
+    hour_cum_weights = list(accumulate(get_hour_weight(h) * 100 for h in range(24)))
+    channel_cum_weights = list(accumulate(c['weight'] for c in channels))
+    product_cum_weights = list(accumulate(p['popularity'] for p in ctx['products']))
+    
+    sales = []
+    
+    for _ in range(daily_sales):
+        # Hour distribution
+        hour = random.choices(range(24), cum_weights=hour_cum_weights)[0]
+        
+        sale_time = current_date.replace(
+            hour=hour,
+            minute=random.randint(0, 59),
+            second=random.randint(0, 59)
+        )
+        
+        # Select entities
+        store_id = random.choice(stores)
+        channel = random.choices(channels, cum_weights=channel_cum_weights)[0]
+        customer_id = random.choice(customers) if random.random() > 0.3 else None
+        
+        # Generate sale
+        sales.append(generate_single_sale(
+            sale_time, store_id, channel, customer_id,
+            ctx['products'], ctx['items'], ctx['option_groups'],
+            product_cum_weights
+        ))
+    
+    return sales
+
+
+# ---------------------------------------------------------------------------
+# Vectorized engine (NumPy)
+#
+# Draws a whole day at once: one array per attribute instead of one dict per
+# sale. Faker strings come from pools built once per run. Output is a
+# columnar batch (table -> column -> array) in the same format
+# load_rows receives from the row-by-row engine.
+# ---------------------------------------------------------------------------
+
+FAKER_POOL_SIZE = 5000
+
+
+def build_faker_pools(size=FAKER_POOL_SIZE):
+    """Precompute Faker strings (uses the run-seeded `fake`)"""
+    return {
+        'name': np.array([fake.name() for _ in range(size)], dtype=object),
+        'phone': np.array([fake.phone_number() for _ in range(size)], dtype=object),
+        'street': np.array([fake.street_name() for _ in range(size)], dtype=object),
+        'neighborhood': np.array([fake.bairro() for _ in range(size)], dtype=object),
+        'city': np.array([fake.city() for _ in range(size)], dtype=object),
+        'state': np.array([fake.estado_sigla() for _ in range(size)], dtype=object),
+        'postal_code': np.array([fake.postcode() for _ in range(size)], dtype=object),
+    }
+
+
+def build_numpy_tables(ctx):
+    """Lookup arrays shared by every day (built once per process)"""
+    products, items, channels = ctx['products'], ctx['items'], ctx['channels']
+    popularity = np.array([p['popularity'] for p in products])
+    hour_weights = np.array([get_hour_weight(h) for h in range(24)])
+    channel_weights = np.array([c['weight'] for c in channels])
+    return {
+        'product_ids': np.array([p['id'] for p in products]),
+        'product_prices': np.array([p['base_price'] for p in products]),
+        'product_custom': np.array([p['has_customization'] for p in products]),
+        'product_p': popularity / popularity.sum(),
+        'item_ids': np.array([i['id'] for i in items]),
+        'item_prices': np.array([i['price'] for i in items]),
+        'option_groups': np.array(ctx['option_groups']),
+        'hour_p': hour_weights / hour_weights.sum(),
+        'channel_ids': np.array([c['id'] for c in channels]),
+        'channel_delivery': np.array([c['type'] == 'D' for c in channels]),
+        'channel_presencial': np.array([c['type'] == 'P' for c in channels]),
+        'channel_p': channel_weights / channel_weights.sum(),
+        'stores': np.array(ctx['stores']),
+        'customers': np.array(ctx['customers']),
+        'payment_type_ids': np.array([ctx['payment_type_ids'].get(t) for t in PAYMENT_TYPES_LIST]),
+    }
+
+
+def _choice_or_none(rng, values, mask):
+    """Object array with a random pick from `values` where mask, else None"""
+    out = np.full(mask.shape, None, dtype=object)
+    out[mask] = np.asarray(values, dtype=object)[rng.integers(0, len(values), mask.sum())]
+    return out
+
+
+def generate_day_columns(day_index, current_date, ctx):
+    """Generate one day of sales as a columnar batch (vectorized).
+
+    Same distributions as generate_day_sales/generate_single_sale; the RNG
+    is seeded from (seed, day_index), so days are reproducible and
+    independent of worker scheduling.
+    """
+    t = ctx['numpy_tables']
+    pools = ctx['faker_pools']
+    rng = np.random.default_rng([ctx['seed'], day_index])
+    
+    n = max(0, int(rng.normal(2700, 400) * day_multiplier(current_date, ctx)))
+    sale_idx = np.arange(n)
+    
+    # Time, store, channel, customer
+    day_start = np.datetime64(current_date.replace(hour=0, minute=0, second=0), 'us')
+    seconds = (rng.choice(24, n, p=t['hour_p']) * 3600
+               + rng.integers(0, 60, n) * 60 + rng.integers(0, 60, n))
+    created_at = day_start + seconds.astype('timedelta64[s]')
+    store_id = rng.choice(t['stores'], n)
+    channel = rng.choice(len(t['channel_ids']), n, p=t['channel_p'])
+    is_delivery = t['channel_delivery'][channel]
+    has_customer = rng.random(n) > 0.3
+    customer_id = np.where(has_customer, rng.choice(t['customers'], n), None)
+    customer_name = np.where(has_customer, None, pools['name'][rng.integers(0, len(pools['name']), n)])
+    
+    # Products: 1-5 per sale, weighted by popularity
+    num_products = np.clip(rng.exponential(2.0, n).astype(int) + 1, 1, 5)
+    product_sale = np.repeat(sale_idx, num_products)
+    p = len(product_sale)
+    product = rng.choice(len(t['product_ids']), p, p=t['product_p'])
+    qty = rng.integers(1, 4, p)
+    base_price = t['product_prices'][product]
+    
+    # Items/complements (60% of customizable products)
+    customized = t['product_custom'][product] & (rng.random(p) > 0.4)
+    num_items = np.where(customized, rng.integers(1, 5, p), 0)
+    item_product = np.repeat(np.arange(p), num_items)
+    i = len(item_product)
+    item = rng.integers(0, len(t['item_ids']), i)
+    item_price = t['item_prices'][item]
+    has_option = rng.random(i) > 0.5
+    option_group = np.where(has_option, rng.choice(t['option_groups'], i), None)
+    additions = np.bincount(item_product, weights=item_price, minlength=p)
+    
+    product_total = (base_price + additions) * qty
+    total_items_value = np.bincount(product_sale, weights=product_total, minlength=n)
+    
+    # Discounts, increases, fees
+    has_discount = rng.random(n) < 0.2
+    discount = np.where(has_discount, np.round(total_items_value * rng.uniform(0.05, 0.30, n), 2), 0.0)
+    discount_reason = _choice_or_none(rng, DISCOUNT_REASONS, has_discount)
+    has_increase = rng.random(n) < 0.05
+    increase = np.where(has_increase, np.round(total_items_value * rng.uniform(0.02, 0.10, n), 2), 0.0)
+    delivery_fee = np.where(is_delivery, rng.choice([5.0, 7.0, 9.0, 12.0, 15.0], n), 0.0)
+    service_tax = np.where(rng.random(n) < 0.3, np.round(total_items_value * 0.10, 2), 0.0)
+    
+    # Status and totals
+    completed = rng.random(n) >= STATUS_WEIGHTS[1]
+    status = np.where(completed, 'COMPLETED', 'CANCELLED').astype(object)
+    total_amount = total_items_value - discount + increase + delivery_fee + service_tax
+    value_paid = np.where(completed, total_amount, 0.0)
+    production_sec = np.where(completed, rng.integers(300, 2401, n), None)
+    delivery_sec = np.where(is_delivery & completed, rng.integers(600, 3601, n), None)
+    people_qty = np.where(t['channel_presencial'][channel], rng.integers(1, 9, n), None)
+    
+    # Delivery details (completed delivery orders)
+    delivery_sale = sale_idx[is_delivery & completed]
+    d = len(delivery_sale)
+    d_fee = delivery_fee[delivery_sale]
+    has_complement = rng.random(d) > 0.5
+    complement = np.full(d, None, dtype=object)
+    complement[has_complement] = np.array(
+        ['Apto 101', 'Casa', 'Bloco A', 'Fundos', None, None], dtype=object
+    )[rng.integers(0, 6, has_complement.sum())]
+    pick = lambda pool: pools[pool][rng.integers(0, len(pools[pool]), d)]
+    
+    # Payments: 85% single, 15% split in two
+    paid_sale = sale_idx[completed]
+    split = rng.random(len(paid_sale)) < 0.15
+    single_sale = paid_sale[~split]
+    split_sale = paid_sale[split]
+    split_value = np.round(value_paid[split_sale] * rng.uniform(0.3, 0.7, len(split_sale)), 2)
+    payment_sale = np.concatenate([single_sale, split_sale, split_sale])
+    payment_type = np.concatenate([
+        t['payment_type_ids'][rng.integers(0, len(PAYMENT_TYPES_LIST), len(single_sale))],
+        t['payment_type_ids'][rng.integers(0, 3, len(split_sale))],
+        t['payment_type_ids'][rng.integers(0, len(PAYMENT_TYPES_LIST), len(split_sale))],
+    ])
+    payment_value = np.concatenate([
+        value_paid[single_sale], split_value, value_paid[split_sale] - split_value
+    ])
+    payment_order = np.argsort(payment_sale, kind='stable')
+    
+    return {
+        'sales': {
+            'id': sale_idx, 'store_id': store_id, 'customer_id': customer_id,
+            'channel_id': t['channel_ids'][channel], 'customer_name': customer_name,
+            'created_at': created_at, 'sale_status_desc': status,
+            'total_amount_items': total_items_value, 'total_discount': discount,
+            'total_increase': increase, 'delivery_fee': delivery_fee,
+            'service_tax_fee': service_tax, 'total_amount': total_amount,
+            'value_paid': value_paid, 'production_seconds': production_sec,
+            'delivery_seconds': delivery_sec, 'discount_reason': discount_reason,
+            'people_quantity': people_qty, 'origin': np.full(n, 'POS', dtype=object),
+        },
+        'product_sales': {
+            'id': np.arange(p), 'sale_id': product_sale,
+            'product_id': t['product_ids'][product], 'quantity': qty,
+            'base_price': base_price, 'total_price': product_total,
+        },
+        'item_product_sales': {
+            'product_sale_id': item_product, 'item_id': t['item_ids'][item],
+            'option_group_id': option_group, 'quantity': np.ones(i, dtype=int),
+            'additional_price': item_price, 'price': item_price,
+            'amount': np.ones(i, dtype=int),
+        },
+        'delivery_sales': {
+            'id': np.arange(d), 'sale_id': delivery_sale,
+            'courier_name': pick('name'), 'courier_phone': pick('phone'),
+            'courier_type': np.array(COURIER_TYPES, dtype=object)[rng.integers(0, len(COURIER_TYPES), d)],
+            'delivery_type': np.array(DELIVERY_TYPES, dtype=object)[rng.integers(0, len(DELIVERY_TYPES), d)],
+            'status': np.full(d, 'DELIVERED', dtype=object),
+            'delivery_fee': d_fee, 'courier_fee': np.round(d_fee * 0.6, 2),
+        },
+        'delivery_addresses': {
+            'sale_id': delivery_sale, 'delivery_sale_id': np.arange(d),
+            'street': pick('street'), 'number': rng.integers(10, 10000, d).astype(str).astype(object),
+            'complement': complement, 'neighborhood': pick('neighborhood'),
+            'city': pick('city'), 'state': pick('state'), 'postal_code': pick('postal_code'),
+            # Ensure coordinates are within valid range for Brazil
+            'latitude': np.clip(-23.5 + rng.uniform(-10, 5, d), -33.0, -5.0),
+            'longitude': np.clip(-46.6 + rng.uniform(-10, 10, d), -74.0, -34.0),
+        },
+        'payments': {
+            'sale_id': payment_sale[payment_order],
+            'payment_type_id': payment_type[payment_order],
+            'value': payment_value[payment_order],
+        },
+    }
+
+
+# Worker processes receive the shared context once, at startup
+_worker_ctx = None
+
+
+def _init_worker(ctx):
+    global _worker_ctx
+    _worker_ctx = ctx
+    if ctx['engine'] == 'numpy':
+        _worker_ctx = dict(ctx, numpy_tables=build_numpy_tables(ctx))
+
+
+def _generate_day_worker(task):
+    """Generate a day as a columnar batch (IDs are batch-local)"""
+    day_index, current_date = task
+    if _worker_ctx['engine'] == 'numpy':
+        batch = generate_day_columns(day_index, current_date, _worker_ctx)
+        return len(batch['sales']['id']), batch
+    sales = generate_day_sales(day_index, current_date, _worker_ctx)
+    return len(sales), rows_to_columns(build_copy_rows(sales, _worker_ctx['payment_type_ids']))
+
+
+# Loader processes write whole days, each on its own connection
+_loader_ctx = None
+
+
+def _init_loader(db_url, write, partitioned):
+    global _loader_ctx
+    _loader_ctx = {'conn': get_db_connection(db_url), 'write': write, 'partitioned': partitioned}
+
+
+def _load_day_worker(task):
+    """Write a day with the IDs the coordinator reserved for it; returns load stats"""
+    batch, ids = task
+    conn = _loader_ctx['conn']
+    stats = {}
+    load_rows(conn.cursor(), batch, stats, _loader_ctx['write'], _loader_ctx['partitioned'], ids)
+    conn.commit()
+    return stats
+
+
+def _merge_load_stats(stats, day_stats):
+    for table, (rows, seconds) in day_stats.items():
+        table_stats = stats.setdefault(table, [0, 0.0])
+        table_stats[0] += rows
+        table_stats[1] += seconds
+
+
+def generate_sales(conn, stores, channels, products, items, option_groups, customers, months=6,
+                   loader='copy', workers=1, seed=0, end_date=None, engine='python', db_url=None):
     """Generate sales with realistic patterns"""
-    print(f"Generating sales for {months} months...")
+    print(f"Generating sales for {months} months ({engine} engine, {loader} loader, {workers} worker(s))...")
     
     cursor = conn.cursor()
-    start_date = datetime.now() - timedelta(days=30 * months)
-    end_date = datetime.now()
+    end_date = end_date or datetime.now()
+    start_date = end_date - timedelta(days=30 * months)
     
     # Anomalies
     anomaly_week = start_date + timedelta(days=random.randint(30, 60))
     promo_day = start_date + timedelta(days=random.randint(90, 120))
     
+    days = []
     current_date = start_date
+    while current_date <= end_date:
+        days.append(current_date)
+        current_date += timedelta(days=1)
+    
+    ctx = {
+        'seed': seed, 'engine': engine,
+        'stores': stores, 'channels': channels, 'customers': customers,
+        'products': products, 'items': items, 'option_groups': option_groups,
+        'anomaly_week': anomaly_week, 'promo_day': promo_day,
+        'payment_type_ids': load_payment_type_ids(cursor),
+        'faker_pools': build_faker_pools() if engine == 'numpy' else None,
+    }
+    
+    load_stats = {}
+    write = copy_rows if loader == 'copy' else insert_rows
+    partitioned = detect_partitioning(cursor)
+    if partitioned:
+        # Whole range plus a few months ahead, for live mode and the POS
+        created = ensure_partitions(cursor, start_date, end_date + timedelta(days=92))
+        conn.commit()
+        print(f"  Partitioned tables: {created} partition(s) created")
+    
     total_sales = 0
-    batch_size = 500
+    started = time.perf_counter()
+    pool = loaders = None
+    pending = deque()
     
-    while current_date <= end_date:
-        weekday = current_date.weekday()
-        day_mult = WEEKDAY_MULT[weekday]
-        
-        # Anomaly: bad week
-        if anomaly_week <= current_date < anomaly_week + timedelta(days=7):
-            day_mult *= 0.7
-        
-        # Anomaly: promo day
-        if current_date.date() == promo_day.date():
-            day_mult *= 3.0
-        
-        daily_sales = int(random.gauss(2700, 400) * day_mult)
-        
-        sales_batch = []
-        
-        for _ in range(daily_sales):
-            # Hour distribution
-            hour_weights = [get_hour_weight(h) * 100 for h in range(24)]
-            hour = random.choices(range(24), weights=hour_weights)[0]
-            
-            sale_time = current_date.replace(
-                hour=hour,
-                minute=random.randint(0, 59),
-                second=random.randint(0, 59)
-            )
-            
-            # Select entities
-            store_id = random.choice(stores)
-            channel = random.choices(channels, weights=[c['weight'] for c in channels])[0]
-            customer_id = random.choice(customers) if random.random() > 0.3 else None
-            
-            # Generate sale
-            sale_data = generate_single_sale(
-                sale_time, store_id, channel, customer_id, 
-                products, items, option_groups
-            )
-            
-            sales_batch.append(sale_data)
-            
-            if len(sales_batch) >= batch_size:
-                insert_sales_batch(cursor, sales_batch, items, option_groups)
-                total_sales += len(sales_batch)
-                sales_batch = []
+    # Workers generate days in parallel and loader processes write them, each
+    # on its own connection. The coordinator only reserves every table's IDs,
+    # in day order, so IDs are deterministic whatever the load order
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(ctx,))
+        results = pool.imap(_generate_day_worker, enumerate(days))
+        loaders = multiprocessing.Pool(workers, initializer=_init_loader, initargs=(db_url, write, partitioned))
+    else:
+        _init_worker(ctx)
+        results = map(_generate_day_worker, enumerate(days))
+    
+    try:
+        for current_date, (day_count, batch) in zip(days, results):
+            if loaders:
+                ids = allocate_batch_ids(cursor, batch)
                 conn.commit()
-        
-        # Insert remaining
-        if sales_batch:
-            insert_sales_batch(cursor, sales_batch, items, option_groups)
-            total_sales += len(sales_batch)
-            conn.commit()
-        
-        current_date += timedelta(days=1)
-        
-        if current_date.day == 1:
-            print(f"  → {current_date.strftime('%B %Y')}: {total_sales:,} sales")
+                pending.append(loaders.apply_async(_load_day_worker, ((batch, ids),)))
+                # Bounded, so generated days don't pile up waiting for a loader
+                while len(pending) > 2 * workers:
+                    _merge_load_stats(load_stats, pending.popleft().get())
+            else:
+                load_rows(cursor, batch, load_stats, write, partitioned)
+                conn.commit()
+            total_sales += day_count
+            
+            if (current_date + timedelta(days=1)).day == 1:
+                print(f"  → {(current_date + timedelta(days=1)).strftime('%B %Y')}: {total_sales:,} sales")
+        while pending:
+            _merge_load_stats(load_stats, pending.popleft().get())
+    finally:
+        for p in (pool, loaders):
+            if p:
+                p.terminate()
+                p.join()
     
-    print(f"✓ {total_sales:,} total sales generated")
+    elapsed = time.perf_counter() - started
+    print(f"✓ {total_sales:,} total sales generated in {elapsed:.1f}s ({total_sales / elapsed:,.0f} sales/s)")
+    if load_stats:
+        print_load_stats(load_stats)
     return total_sales
 
 
-def generate_single_sale(sale_time, store_id, channel, customer_id, products, items, option_groups):
+def generate_single_sale(sale_time, store_id, channel, customer_id, products, items, option_groups,
+                         product_cum_weights=None):
     """Generate a single sale with all related data"""
     
     # Select 1-5 products
     num_products = min(5, max(1, int(random.expovariate(0.5)) + 1))
+    if product_cum_weights is None:
+        product_cum_weights = list(accumulate(p['popularity'] for p in products))
     selected_products = random.choices(
         products,
-        weights=[p['popularity'] for p in products],
+        cum_weights=product_cum_weights,
         k=num_products
     )
     
@@ -532,137 +872,693 @@ def generate_single_sale(sale_time, store_id, channel, customer_id, products, it
     }
 
 
-def insert_sales_batch(cursor, sales_batch, items, option_groups):
-    """Insert batch of sales with all related data"""
-    
-    # Insert sales
-    sales_data = [(
-        s['store_id'], s['customer_id'], s['channel_id'],
-        s['customer_name'], s['created_at'], s['status'],
-        Decimal(str(s['total_items_value'])),
-        Decimal(str(s['discount'])),
-        Decimal(str(s['increase'])),
-        Decimal(str(s['delivery_fee'])),
-        Decimal(str(s['service_tax'])),
-        Decimal(str(s['total_amount'])),
-        Decimal(str(s['value_paid'])),
-        s['production_sec'], s['delivery_sec'],
-        s['discount_reason'], s['people_qty'], 'POS'
-    ) for s in sales_batch]
-    
-    execute_batch(cursor, """
-        INSERT INTO sales (
-            store_id, customer_id, channel_id, customer_name,
-            created_at, sale_status_desc,
-            total_amount_items, total_discount, total_increase,
-            delivery_fee, service_tax_fee, total_amount, value_paid,
-            production_seconds, delivery_seconds,
-            discount_reason, people_quantity, origin
-        ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-    """, sales_data, page_size=500)
-    
-    # Get inserted sale IDs
+# ---------------------------------------------------------------------------
+# Loaders
+#
+# Every table is streamed with COPY FROM STDIN (or, with --loader insert, one
+# multi-row INSERT per table). Parent IDs (sales, product_sales,
+# delivery_sales) are pre-allocated from their sequences in a single round
+# trip, so child rows can reference them without RETURNING and concurrent
+# writers never collide.
+# ---------------------------------------------------------------------------
+
+def load_payment_type_ids(cursor):
+    """Map payment type description -> id (loaded once)"""
+    cursor.execute("SELECT description, id FROM payment_types WHERE brand_id = %s", (BRAND_ID,))
+    return dict(cursor.fetchall())
+
+
+def allocate_ids(cursor, table, count):
+    """Reserve `count` IDs from the table's serial sequence.
+
+    Only the bounds come back when the IDs are contiguous (no concurrent
+    nextval got in between), which is the usual case.
+    """
+    if count == 0:
+        return []
+    # The sequence is resolved once (subquery), not once per ID
     cursor.execute("""
-        SELECT id FROM sales 
-        ORDER BY id DESC 
-        LIMIT %s
-    """, (len(sales_batch),))
-    sale_ids = [row[0] for row in cursor.fetchall()]
-    sale_ids.reverse()
-    
-    # Insert product_sales and related data
-    for sale_id, sale in zip(sale_ids, sales_batch):
-        for prod_data in sale['products']:
-            cursor.execute("""
-                INSERT INTO product_sales (
-                    sale_id, product_id, quantity, base_price, total_price
-                ) VALUES (%s,%s,%s,%s,%s) RETURNING id
-            """, (
-                sale_id, prod_data['product_id'],
+        SELECT min(id), max(id),
+               CASE WHEN max(id) - min(id) + 1 <> count(*) THEN array_agg(id ORDER BY id) END
+        FROM (
+            SELECT nextval((SELECT pg_get_serial_sequence(%s, 'id'))::regclass) AS id
+            FROM generate_series(1, %s)
+        ) reserved
+    """, (table, count))
+    first, last, scattered = cursor.fetchone()
+    return scattered or range(first, last + 1)
+
+
+def _batch_len(table_batch, table):
+    return len(table_batch[COPY_COLUMNS[table][0]])
+
+
+def allocate_batch_ids(cursor, batch, tables=None):
+    """Reserve IDs for every row of the batch's `tables` (default: all)"""
+    return {
+        table: allocate_ids(cursor, table, _batch_len(batch[table], table))
+        for table in tables or COPY_COLUMNS
+    }
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return (str(value)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r'))
+
+
+def copy_rows(cursor, table, columns, rows, stats=None):
+    """Stream rows into `table` with COPY FROM STDIN (text format)"""
+    if not rows:
+        return
+    started = time.perf_counter()
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(v) for v in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+    _record_load(stats, table, len(rows), started)
+
+
+def insert_rows(cursor, table, columns, rows, stats=None):
+    """Insert rows into `table` with a single multi-row INSERT"""
+    if not rows:
+        return
+    started = time.perf_counter()
+    execute_values(
+        cursor, f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s",
+        rows, page_size=len(rows)
+    )
+    _record_load(stats, table, len(rows), started)
+
+
+def _record_load(stats, table, rows, started):
+    if stats is not None:
+        table_stats = stats.setdefault(table, [0, 0.0])
+        table_stats[0] += rows
+        table_stats[1] += time.perf_counter() - started
+
+
+COPY_COLUMNS = {
+    'sales': (
+        'id', 'store_id', 'customer_id', 'channel_id', 'customer_name',
+        'created_at', 'sale_status_desc',
+        'total_amount_items', 'total_discount', 'total_increase',
+        'delivery_fee', 'service_tax_fee', 'total_amount', 'value_paid',
+        'production_seconds', 'delivery_seconds',
+        'discount_reason', 'people_quantity', 'origin'
+    ),
+    'product_sales': (
+        'id', 'sale_id', 'product_id', 'quantity', 'base_price', 'total_price'
+    ),
+    'item_product_sales': (
+        'product_sale_id', 'item_id', 'option_group_id',
+        'quantity', 'additional_price', 'price', 'amount'
+    ),
+    'delivery_sales': (
+        'id', 'sale_id', 'courier_name', 'courier_phone', 'courier_type',
+        'delivery_type', 'status', 'delivery_fee', 'courier_fee'
+    ),
+    'delivery_addresses': (
+        'sale_id', 'delivery_sale_id', 'street', 'number', 'complement',
+        'neighborhood', 'city', 'state', 'postal_code', 'latitude', 'longitude'
+    ),
+    'payments': (
+        'sale_id', 'payment_type_id', 'value'
+    ),
+}
+
+
+def build_copy_rows(sales_batch, payment_type_ids):
+    """Flatten a batch of sales into rows per table (COPY_COLUMNS order).
+
+    Sales, product_sales and delivery_sales IDs are batch-local indexes;
+    load_rows replaces them with IDs allocated from the sequences.
+    This runs without a database connection, so workers can do it.
+    """
+    rows = {table: [] for table in COPY_COLUMNS}
+    
+    for sale_idx, s in enumerate(sales_batch):
+        rows['sales'].append((
+            sale_idx, s['store_id'], s['customer_id'], s['channel_id'],
+            s['customer_name'], s['created_at'], s['status'],
+            Decimal(str(s['total_items_value'])),
+            Decimal(str(s['discount'])),
+            Decimal(str(s['increase'])),
+            Decimal(str(s['delivery_fee'])),
+            Decimal(str(s['service_tax'])),
+            Decimal(str(s['total_amount'])),
+            Decimal(str(s['value_paid'])),
+            s['production_sec'], s['delivery_sec'],
+            s['discount_reason'], s['people_qty'], 'POS'
+        ))
+        
+        for prod_data in s['products']:
+            product_idx = len(rows['product_sales'])
+            rows['product_sales'].append((
+                product_idx, sale_idx, prod_data['product_id'],
                 prod_data['quantity'], prod_data['base_price'],
                 prod_data['total_price']
             ))
-            product_sale_id = cursor.fetchone()[0]
-            
-            # Insert items for this product
             for item_data in prod_data['items']:
-                cursor.execute("""
-                    INSERT INTO item_product_sales (
-                        product_sale_id, item_id, option_group_id,
-                        quantity, additional_price, price, amount
-                    ) VALUES (%s,%s,%s,%s,%s,%s,%s)
-                """, (
-                    product_sale_id, item_data['item_id'],
+                rows['item_product_sales'].append((
+                    product_idx, item_data['item_id'],
                     item_data['option_group_id'],
                     item_data['quantity'], item_data['additional_price'],
                     item_data['price'], 1
                 ))
         
-        # Insert delivery data
-        if sale['delivery']:
-            d = sale['delivery']
-            cursor.execute("""
-                INSERT INTO delivery_sales (
-                    sale_id, courier_name, courier_phone, courier_type,
-                    delivery_type, status, delivery_fee, courier_fee
-                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s) RETURNING id
-            """, (
-                sale_id, d['courier_name'], d['courier_phone'],
+        if s['delivery']:
+            d = s['delivery']
+            delivery_idx = len(rows['delivery_sales'])
+            rows['delivery_sales'].append((
+                delivery_idx, sale_idx, d['courier_name'], d['courier_phone'],
                 d['courier_type'], d['delivery_type'], d['status'],
                 d['delivery_fee'], d['courier_fee']
             ))
-            delivery_sale_id = cursor.fetchone()[0]
-            
             addr = d['address']
             # Ensure coordinates are within valid range for Brazil
-            lat = max(-33.0, min(-5.0, addr['latitude']))
-            long = max(-74.0, min(-34.0, addr['longitude']))
-            
-            cursor.execute("""
-                INSERT INTO delivery_addresses (
-                    sale_id, delivery_sale_id, street, number, complement,
-                    neighborhood, city, state, postal_code, latitude, longitude
-                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            """, (
-                sale_id, delivery_sale_id, addr['street'], addr['number'],
+            rows['delivery_addresses'].append((
+                sale_idx, delivery_idx, addr['street'], addr['number'],
                 addr['complement'], addr['neighborhood'], addr['city'],
-                addr['state'], addr['postal_code'], lat, long
+                addr['state'], addr['postal_code'],
+                max(-33.0, min(-5.0, addr['latitude'])),
+                max(-74.0, min(-34.0, addr['longitude']))
             ))
         
-        # Insert payments
-        for payment in sale['payments']:
-            cursor.execute(
-                "SELECT id FROM payment_types WHERE description = %s LIMIT 1",
-                (payment['type'],)
-            )
-            result = cursor.fetchone()
-            if result:
-                cursor.execute("""
-                    INSERT INTO payments (sale_id, payment_type_id, value)
-                    VALUES (%s,%s,%s)
-                """, (sale_id, result[0], Decimal(str(payment['value']))))
+        for payment in s['payments']:
+            payment_type_id = payment_type_ids.get(payment['type'])
+            if payment_type_id:
+                rows['payments'].append((
+                    sale_idx, payment_type_id, Decimal(str(payment['value']))
+                ))
+    
+    return rows
+
+
+# Columns holding batch-local IDs -> table whose allocated IDs replace them
+ID_COLUMNS = {
+    'sale_id': 'sales',
+    'product_sale_id': 'product_sales',
+    'delivery_sale_id': 'delivery_sales',
+}
+
+
+def rows_to_columns(rows):
+    """Turn build_copy_rows output into a columnar batch (table -> column -> values)"""
+    return {
+        table: dict(zip(columns, list(zip(*rows[table])) or [()] * len(columns)))
+        for table, columns in COPY_COLUMNS.items()
+    }
+
+
+def _remap_ids(ids, local):
+    # NumPy batches are remapped with fancy indexing, python lists per value
+    if np is not None and isinstance(local, np.ndarray):
+        return np.asarray(ids, dtype=np.int64)[local]
+    return [ids[i] for i in local]
+
+
+# With the backend's partitioning migration, product_sales and
+# item_product_sales carry the sale's created_at as their partition key
+PARTITION_COLUMNS = {
+    'product_sales': ('sale_created_at', 'sale_id', 'sales', 'created_at'),
+    'item_product_sales': ('sale_created_at', 'product_sale_id', 'product_sales', 'sale_created_at'),
+}
+
+
+def detect_partitioning(cursor):
+    """True when sales are range-partitioned (backend migration 004)"""
+    cursor.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table
+            WHERE partrelid = to_regclass('product_sales')
+        )
+    """)
+    return cursor.fetchone()[0]
+
+
+def ensure_partitions(cursor, start, end):
+    """Create the monthly partitions covering [start, end] that are missing"""
+    cursor.execute("SELECT cria_particoes_vendas(%s, %s)", (start.date(), end.date()))
+    return cursor.fetchone()[0]
+
+
+def _take(values, local):
+    # Parent value for each batch-local index (NumPy or python sequences)
+    if np is not None and isinstance(local, np.ndarray):
+        return np.asarray(values)[local]
+    return [values[i] for i in local]
+
+
+def load_rows(cursor, batch, stats=None, write=copy_rows, partitioned=False, ids=None):
+    """Write every table of a columnar batch with real IDs.
+
+    `ids` (from allocate_batch_ids) may be reserved beforehand on another
+    connection; by default only the referenced tables' IDs are allocated
+    here and the others come from the column defaults. `write` is copy_rows
+    (COPY) or insert_rows (multi-row INSERT); either way a batch takes a
+    fixed number of round trips.
+    """
+    ids = ids or allocate_batch_ids(cursor, batch, set(ID_COLUMNS.values()))
+    
+    # Parents first (dict order), so foreign keys are satisfied
+    for table, columns in COPY_COLUMNS.items():
+        table_batch = batch[table]
+        if partitioned and table in PARTITION_COLUMNS:
+            column, parent_column, parent, parent_source = PARTITION_COLUMNS[table]
+            table_batch = dict(table_batch)
+            table_batch[column] = _take(batch[parent][parent_source], table_batch[parent_column])
+            # Children look up the value computed for their parent
+            batch = dict(batch, **{table: table_batch})
+            columns = columns + (column,)
+        values = []
+        for column in columns:
+            column_values = table_batch[column]
+            target = table if column == 'id' else ID_COLUMNS.get(column)
+            if target:
+                column_values = _remap_ids(ids[target], column_values)
+            if hasattr(column_values, 'tolist'):
+                column_values = column_values.tolist()
+            values.append(column_values)
+        if 'id' not in columns and table in ids:
+            # Tables without batch-local IDs get the reserved ones, if any
+            columns = ('id',) + columns
+            values.insert(0, ids[table])
+        write(cursor, table, columns, list(zip(*values)), stats)
+
+
+def copy_sales_batch(cursor, sales_batch, payment_type_ids, stats=None):
+    """Insert batch of sales with all related data using COPY"""
+    load_rows(cursor, rows_to_columns(build_copy_rows(sales_batch, payment_type_ids)), stats)
+
+
+def insert_sales_batch(cursor, sales_batch, payment_type_ids, stats=None):
+    """Insert batch of sales with all related data using multi-row INSERTs"""
+    load_rows(
+        cursor, rows_to_columns(build_copy_rows(sales_batch, payment_type_ids)), stats,
+        write=insert_rows
+    )
+
+
+def print_load_stats(stats):
+    """Rows/second per table"""
+    print("  Load throughput:")
+    for table, (rows, seconds) in stats.items():
+        rate = rows / seconds if seconds else 0
+        print(f"    {table:<20} {rows:>12,} rows  {seconds:>7.1f}s  {rate:>12,.0f} rows/s")
+
+
+# ---------------------------------------------------------------------------
+# Live mode
+#
+# Keeps inserting sales "now" into an already populated database, following
+# the same hourly/weekday shape, so dashboards can be benchmarked while
+# writes are happening. Product prices, popularity and customization are not
+# stored in the catalog tables, so they are estimated from recent sales.
+# ---------------------------------------------------------------------------
+
+LIVE_SAMPLE_SALES = 50000  # recent sales used to estimate prices/popularity
+
+
+def load_catalog(conn):
+    """Load stores, channels, products, items, option groups and customers from the database"""
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT id FROM stores WHERE is_active ORDER BY id")
+    stores = [row[0] for row in cursor.fetchall()]
+    
+    weights = {name: weight for name, _, weight, _ in CHANNELS}
+    cursor.execute("SELECT id, name, type FROM channels ORDER BY id")
+    channels = [
+        {'id': ch_id, 'name': name, 'type': ch_type, 'weight': weights.get(name, 0.05)}
+        for ch_id, name, ch_type in cursor.fetchall()
+    ]
+    
+    cursor.execute("""
+        WITH recent AS (
+            SELECT ps.id, ps.product_id, ps.base_price
+            FROM product_sales ps
+            WHERE ps.sale_id > (SELECT COALESCE(MAX(id), 0) - %s FROM sales)
+        ),
+        customized AS (
+            SELECT DISTINCT r.product_id
+            FROM item_product_sales ips
+            JOIN recent r ON r.id = ips.product_sale_id
+        )
+        SELECT p.id, p.name, AVG(r.base_price), COUNT(r.id),
+               p.id IN (SELECT product_id FROM customized)
+        FROM products p
+        LEFT JOIN recent r ON r.product_id = p.id
+        GROUP BY p.id, p.name
+        ORDER BY p.id
+    """, (LIVE_SAMPLE_SALES,))
+    products = [
+        {
+            'id': product_id,
+            'name': name,
+            'base_price': round(float(price), 2) if price is not None else round(random.uniform(15, 120), 2),
+            'popularity': max(count, 1),
+            'has_customization': customized,
+        }
+        for product_id, name, price, count, customized in cursor.fetchall()
+    ]
+    
+    cursor.execute("""
+        SELECT i.id, i.name, AVG(ips.additional_price)
+        FROM items i
+        LEFT JOIN item_product_sales ips ON ips.item_id = i.id
+            AND ips.product_sale_id > (SELECT COALESCE(MAX(id), 0) - %s FROM product_sales)
+        GROUP BY i.id, i.name
+        ORDER BY i.id
+    """, (LIVE_SAMPLE_SALES,))
+    items = [
+        {'id': item_id, 'name': name,
+         'price': round(float(price), 2) if price is not None else round(random.uniform(2, 15), 2)}
+        for item_id, name, price in cursor.fetchall()
+    ]
+    
+    cursor.execute("SELECT id FROM option_groups ORDER BY id")
+    option_groups = [row[0] for row in cursor.fetchall()]
+    
+    cursor.execute("SELECT id FROM customers")
+    customers = [row[0] for row in cursor.fetchall()]
+    
+    conn.commit()
+    if not (stores and channels and products and items):
+        raise RuntimeError("--live needs a populated database; run a backfill first")
+    return stores, channels, products, items, option_groups, customers
+
+
+def live_rate(rate, moment, burst_every=0, burst_seconds=0, burst_mult=3.0):
+    """Target sales/s at `moment`: `rate` shaped by HOURLY_WEIGHTS and WEEKDAY_MULT.
+
+    Both factors are normalized to mean 1, so `rate` is the average over a
+    week. During a burst (the first `burst_seconds` of every `burst_every`
+    seconds) the rate is multiplied by `burst_mult`, like the promo day.
+    """
+    hour_factor = get_hour_weight(moment.hour) / (sum(get_hour_weight(h) for h in range(24)) / 24)
+    weekday_factor = WEEKDAY_MULT[moment.weekday()] / (sum(WEEKDAY_MULT) / 7)
+    target = rate * hour_factor * weekday_factor
+    if burst_every and moment.timestamp() % burst_every < burst_seconds:
+        target *= burst_mult
+    return target
+
+
+def run_live(conn, rate, duration=0, loader='copy', tick=1.0, burst_every=0,
+             burst_seconds=30, burst_mult=3.0, report_every=10.0):
+    """Insert sales continuously at live_rate() until `duration` seconds (0 = Ctrl+C)"""
+    stores, channels, products, items, option_groups, customers = load_catalog(conn)
+    cursor = conn.cursor()
+    payment_type_ids = load_payment_type_ids(cursor)
+    write = copy_rows if loader == 'copy' else insert_rows
+    partitioned = detect_partitioning(cursor)
+    if partitioned:
+        ensure_partitions(cursor, datetime.now(), datetime.now() + timedelta(days=62))
+        conn.commit()
+    
+    channel_cum_weights = list(accumulate(c['weight'] for c in channels))
+    product_cum_weights = list(accumulate(p['popularity'] for p in products))
+    
+    print(f"Live mode: ~{rate:g} sales/s on average ({loader} loader, {tick:g}s ticks"
+          + (f", x{burst_mult:g} bursts of {burst_seconds:g}s every {burst_every:g}s"
+             if burst_every else "") + "). Ctrl+C to stop.")
+    
+    started = time.monotonic()
+    next_tick = started
+    window = {'sales': 0, 'target': 0.0, 'lag': [], 'behind': 0.0}
+    window_started = started
+    total_sales = 0
+    carry = 0.0  # fractional sales carried to the next tick
+    
+    try:
+        while not duration or time.monotonic() - started < duration:
+            now = datetime.now()
+            tick_started = time.monotonic()
+            current_rate = live_rate(rate, now, burst_every, burst_seconds, burst_mult)
+            target = current_rate * tick + carry
+            count = int(target)
+            carry = target - count
+            
+            sales = []
+            for _ in range(count):
+                # Spread the tick's sales over the previous `tick` seconds
+                sale_time = now - timedelta(seconds=random.uniform(0, tick))
+                channel = random.choices(channels, cum_weights=channel_cum_weights)[0]
+                customer_id = random.choice(customers) if customers and random.random() > 0.3 else None
+                sales.append(generate_single_sale(
+                    sale_time, random.choice(stores), channel, customer_id,
+                    products, items, option_groups, product_cum_weights
+                ))
+            
+            if sales:
+                load_rows(cursor, rows_to_columns(build_copy_rows(sales, payment_type_ids)),
+                          write=write, partitioned=partitioned)
+                conn.commit()
+                # Lag: from the tick's timestamp until its sales are committed
+                window['lag'].append((datetime.now() - now).total_seconds())
+            
+            total_sales += count
+            window['sales'] += count
+            
+            # Fixed schedule: when a tick overruns, the next one starts right
+            # away and the delay is reported as "behind"
+            next_tick += tick
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                window['behind'] = -delay
+            # Target over wall-clock time, so an overloaded writer shows up
+            # as achieved < target
+            window['target'] += current_rate * (time.monotonic() - tick_started)
+            
+            if time.monotonic() - window_started >= report_every:
+                elapsed = time.monotonic() - window_started
+                lags = sorted(window['lag']) or [0.0]
+                print(f"  {datetime.now():%H:%M:%S}  {window['sales'] / elapsed:8.1f} sales/s "
+                      f"(target {window['target'] / elapsed:8.1f})  "
+                      f"lag p50 {lags[len(lags) // 2] * 1000:6.0f}ms  max {lags[-1] * 1000:6.0f}ms  "
+                      f"behind {window['behind']:5.1f}s  total {total_sales:,}")
+                window = {'sales': 0, 'target': 0.0, 'lag': [], 'behind': 0.0}
+                window_started = time.monotonic()
+                if partitioned:
+                    # Long runs cross month boundaries
+                    ensure_partitions(cursor, datetime.now(), datetime.now() + timedelta(days=62))
+                    conn.commit()
+    except KeyboardInterrupt:
+        pass
+    
+    elapsed = time.monotonic() - started
+    print(f"✓ {total_sales:,} live sales inserted in {elapsed:.1f}s ({total_sales / elapsed:,.1f} sales/s)")
+    return total_sales
+
+
+# ---------------------------------------------------------------------------
+# Dataset export / restore
+#
+# Exports every table of database-schema.sql to compressed files (gzip CSV
+# or zstd Parquet) plus a manifest, so a generated dataset can be versioned
+# and bulk-loaded into a fresh database with COPY instead of re-generated.
+# ---------------------------------------------------------------------------
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database-schema.sql')
+MANIFEST_FILE = 'manifest.json'
+EXPORT_EXTENSIONS = {'csv': '.csv.gz', 'parquet': '.parquet'}
+
+
+def schema_tables():
+    """Tables of database-schema.sql in creation (foreign key) order"""
+    with open(SCHEMA_FILE) as f:
+        return re.findall(r'CREATE TABLE (?:IF NOT EXISTS )?(\w+)', f.read(), re.IGNORECASE)
+
+
+def _arrow_types(cursor, table):
+    """Arrow type per column, so Parquet files keep the PostgreSQL types"""
+    cursor.execute("""
+        SELECT column_name, data_type, numeric_precision, numeric_scale
+        FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s
+        ORDER BY ordinal_position
+    """, (table,))
+    types = {}
+    for column, data_type, precision, scale in cursor.fetchall():
+        if data_type in ('integer', 'smallint'):
+            types[column] = pa.int32()
+        elif data_type == 'bigint':
+            types[column] = pa.int64()
+        elif data_type == 'numeric' and precision:
+            types[column] = pa.decimal128(precision, scale)
+        elif data_type in ('double precision', 'real'):
+            types[column] = pa.float64()
+        elif data_type == 'boolean':
+            types[column] = pa.bool_()
+        elif data_type == 'date':
+            types[column] = pa.date32()
+        elif data_type == 'timestamp without time zone':
+            types[column] = pa.timestamp('us')
+        else:
+            types[column] = pa.string()
+    return types
+
+
+def _export_parquet(cursor, table, path):
+    # COPY to a temporary CSV, then convert it in streaming batches
+    with tempfile.TemporaryFile() as tmp:
+        cursor.copy_expert(f"COPY (SELECT * FROM {table}) TO STDOUT WITH (FORMAT csv, HEADER)", tmp)
+        tmp.seek(0)
+        reader = pa_csv.open_csv(tmp, convert_options=pa_csv.ConvertOptions(
+            column_types=_arrow_types(cursor, table),
+            true_values=['t'], false_values=['f'], null_values=[''],
+            strings_can_be_null=True, quoted_strings_can_be_null=False,
+        ))
+        with pq.ParquetWriter(path, reader.schema, compression='zstd') as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+
+
+def export_dataset(conn, output_dir, fmt='csv', metadata=None):
+    """Write every schema table to `output_dir` and a manifest with row counts"""
+    if fmt == 'parquet' and pa is None:
+        raise RuntimeError("--export-format parquet requires pyarrow (pip install pyarrow)")
+    print(f"Exporting dataset to {output_dir} ({fmt})...")
+    os.makedirs(output_dir, exist_ok=True)
+    cursor = conn.cursor()
+    cursor.execute("SELECT MIN(created_at), MAX(created_at) FROM sales")
+    first_sale, last_sale = cursor.fetchone()
+    manifest = {
+        'format': fmt,
+        'exported_at': datetime.now().isoformat(timespec='seconds'),
+        'generator': metadata or {},
+        # Partitioned datasets carry sale_created_at in product_sales and
+        # item_product_sales, and need partitions for the whole range
+        'partitioned': detect_partitioning(cursor),
+        'sales_range': [d.isoformat() if d else None for d in (first_sale, last_sale)],
+        'tables': {},
+    }
+    
+    for table in schema_tables():
+        started = time.perf_counter()
+        filename = table + EXPORT_EXTENSIONS[fmt]
+        path = os.path.join(output_dir, filename)
+        if fmt == 'parquet':
+            _export_parquet(cursor, table, path)
+        else:
+            with gzip.open(path, 'wt', compresslevel=6) as f:
+                cursor.copy_expert(f"COPY (SELECT * FROM {table}) TO STDOUT WITH (FORMAT csv, HEADER)", f)
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        rows = cursor.fetchone()[0]
+        manifest['tables'][table] = {'file': filename, 'rows': rows}
+        print(f"  {table:<25} {rows:>12,} rows  {os.path.getsize(path) / 1e6:>8.1f} MB  "
+              f"{time.perf_counter() - started:>6.1f}s")
+    
+    conn.commit()
+    with open(os.path.join(output_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"✓ Dataset exported to {output_dir}")
+
+
+def _restore_parquet(cursor, table, path):
+    # Each record batch is rendered back to CSV and streamed with COPY
+    parquet = pq.ParquetFile(path)
+    columns = ', '.join(parquet.schema_arrow.names)
+    for batch in parquet.iter_batches(batch_size=100000):
+        buffer = io.BytesIO()
+        pa_csv.write_csv(batch, buffer, pa_csv.WriteOptions(include_header=False))
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def restore_dataset(conn, input_dir):
+    """Bulk-load an exported dataset into an empty database (schema is created if missing)"""
+    with open(os.path.join(input_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    fmt = manifest['format']
+    if fmt == 'parquet' and pa is None:
+        raise RuntimeError("Restoring a parquet dataset requires pyarrow (pip install pyarrow)")
+    print(f"Restoring dataset from {input_dir} ({fmt})...")
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT to_regclass('public.sales')")
+    if cursor.fetchone()[0] is None:
+        with open(SCHEMA_FILE) as f:
+            cursor.execute(f.read())
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM sales)")
+    if cursor.fetchone()[0]:
+        raise RuntimeError("--restore needs an empty database")
+    partitioned = detect_partitioning(cursor)
+    if manifest.get('partitioned', False) != partitioned:
+        raise RuntimeError(
+            "The dataset was exported from a partitioned database: run backend/migrate.py before --restore"
+            if not partitioned else
+            "The dataset was exported from an unpartitioned database, but this one is partitioned"
+        )
+    first_sale, last_sale = manifest.get('sales_range') or (None, None)
+    if partitioned and first_sale:
+        ensure_partitions(cursor, datetime.fromisoformat(first_sale), datetime.fromisoformat(last_sale))
+    
+    started = time.perf_counter()
+    # The manifest keeps schema order, so foreign keys are satisfied
+    for table, info in manifest['tables'].items():
+        table_started = time.perf_counter()
+        path = os.path.join(input_dir, info['file'])
+        if fmt == 'parquet':
+            _restore_parquet(cursor, table, path)
+        else:
+            with gzip.open(path, 'rt') as f:
+                cursor.copy_expert(f"COPY {table} FROM STDIN WITH (FORMAT csv, HEADER)", f)
+        # Explicit IDs were loaded: move the sequence past them
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {table}",
+            (table,)
+        )
+        conn.commit()
+        elapsed = time.perf_counter() - table_started
+        rate = info['rows'] / elapsed if elapsed else 0
+        print(f"  {table:<25} {info['rows']:>12,} rows  {elapsed:>6.1f}s  {rate:>12,.0f} rows/s")
+    
+    create_indexes(conn)
+    cursor.execute("ANALYZE")
+    conn.commit()
+    print(f"✓ Dataset restored in {time.perf_counter() - started:.1f}s")
 
 
 def create_indexes(conn):
-    """Create performance indexes"""
+    """Create performance indexes.
+
+    The full set used by the dashboards is managed by the backend migrations
+    (`python backend/migrate.py`). Each index is committed on its own, so one
+    failure does not discard the others.
+    """
     print("Creating indexes...")
     cursor = conn.cursor()
-    
+
     # Additional indexes
     indexes = [
         "CREATE INDEX IF NOT EXISTS idx_sales_date_status ON sales(DATE(created_at), sale_status_desc)",
         "CREATE INDEX IF NOT EXISTS idx_product_sales_product_sale ON product_sales(product_id, sale_id)",
     ]
-    
+
+    failed = 0
     for idx in indexes:
         try:
             cursor.execute(idx)
-        except:
-            pass
-    
-    
-    conn.commit()
-    print("✓ Indexes created")
+            conn.commit()
+        except psycopg2.Error as e:
+            conn.rollback()
+            failed += 1
+            print(f"⚠️  Could not create index ({idx}): {(e.pgerror or str(e)).strip()}")
+
+    print("✓ Indexes created" + (f" ({failed} failed)" if failed else ""))
 
 
 def main():
@@ -674,17 +1570,70 @@ def main():
     parser.add_argument('--items', type=int, default=200, help='Number of items/complements')
     parser.add_argument('--customers', type=int, default=10000, help='Number of customers')
     parser.add_argument('--months', type=int, default=6, help='Months of sales data')
+    parser.add_argument('--loader', choices=['copy', 'insert'], default='copy',
+                       help='Bulk COPY (default) or multi-row INSERT')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Processes generating sales in parallel (one day per task)')
+    parser.add_argument('--seed', type=int, default=None,
+                       help='Random seed; the same seed (and --end-date) reproduces the same data')
+    parser.add_argument('--end-date', type=datetime.fromisoformat, default=None,
+                       help='Last day of sales (YYYY-MM-DD, default: now)')
+    parser.add_argument('--live', action='store_true',
+                       help='Keep inserting current sales into an already populated database')
+    parser.add_argument('--rate', type=float, default=5.0,
+                       help='Live mode: average sales/s, shaped by hour and weekday')
+    parser.add_argument('--duration', type=float, default=0,
+                       help='Live mode: seconds to run (default: until Ctrl+C)')
+    parser.add_argument('--burst-every', type=float, default=0,
+                       help='Live mode: seconds between bursts (default: no bursts)')
+    parser.add_argument('--burst-seconds', type=float, default=30,
+                       help='Live mode: length of each burst in seconds')
+    parser.add_argument('--burst-mult', type=float, default=3.0,
+                       help='Live mode: rate multiplier during bursts (promo day is 3x)')
+    parser.add_argument('--export', metavar='DIR', default=None,
+                       help='After generating, export every table to DIR (plus manifest.json)')
+    parser.add_argument('--export-format', choices=['csv', 'parquet'], default='csv',
+                       help='Export as gzip CSV (default) or zstd Parquet (requires pyarrow)')
+    parser.add_argument('--restore', metavar='DIR', default=None,
+                       help='Bulk-load a dataset exported with --export into an empty database')
+    parser.add_argument('--engine', choices=['numpy', 'python'], default='numpy' if np is not None else 'python',
+                       help='Vectorized NumPy day generation (default when installed) or per-sale Python')
     
     args = parser.parse_args()
     
     print("=" * 70)
     print("God Level Coder Challenge - Data Generator")
     print("=" * 70)
-    print(f"Generating {args.months} months of restaurant operational data...")
+    if args.restore:
+        print(f"Restoring {args.restore}...")
+    elif args.live:
+        print("Simulating live traffic...")
+    else:
+        print(f"Generating {args.months} months of restaurant operational data...")
+    
+    seed = args.seed if args.seed is not None else random.randrange(2**31)
+    random.seed(seed)
+    fake.seed_instance(seed)
+    print(f"Seed: {seed}")
     print()
     
     conn = get_db_connection(args.db_url)
     
+    if args.restore:
+        try:
+            restore_dataset(conn, args.restore)
+        finally:
+            conn.close()
+        return
+    
+    if args.live:
+        try:
+            run_live(conn, args.rate, args.duration, args.loader, burst_every=args.burst_every,
+                     burst_seconds=args.burst_seconds, burst_mult=args.burst_mult)
+        finally:
+            conn.close()
+        return
+    
     try:
         sub_brand_ids, channels = setup_base_data(conn)
         stores = generate_stores(conn, sub_brand_ids, args.stores)
@@ -695,11 +1644,20 @@ def main():
         
         total_sales = generate_sales(
             conn, stores, channels, products, items, 
-            option_groups, customers, args.months
+            option_groups, customers, args.months, args.loader,
+            args.workers, seed, args.end_date, args.engine, args.db_url
         )
         
         create_indexes(conn)
         
+        if args.export:
+            export_dataset(conn, args.export, args.export_format, {
+                'seed': seed, 'months': args.months, 'stores': args.stores,
+                'products': args.products, 'items': args.items,
+                'customers': args.customers, 'engine': args.engine,
+                'end_date': args.end_date.isoformat() if args.end_date else None,
+            })
+        
         # Final stats
         cursor = conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM sales")